@@ -1,85 +1,576 @@
 """
-Скрипт для тестування продуктивності MLM системи.
+Набір бенчмарків продуктивності MLM системи.
 
-Генерує фейкових партнерів і тестує як швидко система рахує комісії.
-За замовчуванням тестує на 50 тисячах партнерів.
+Для кожної форми дерева (utils/generators.py) і кожного розміру повторює
+повний конвеєр main.py кілька разів після розігріву і окремо вимірює фази:
 
-Запуск - python benchmark_test.py --n 50000
+- parse - потокове читання вхідного JSON (iter_partners)
+- build - перенумерація id і колонки MLMTree, без перевірки циклів
+- cycle_check - обхід у ширину з побудовою CSR (MLMTree._check_for_cycles)
+- compute - розрахунок комісій обраним калькулятором
+- serialize - потоковий запис комісій у файл (--format json, compact, csv, binary)
+
+Час build і cycle_check береться з подій, які MLMTree сам надсилає через
+utils.benchmark.phase.
+
+Для кожної фази крім часу звітується пропускна здатність - рядків
+(партнерів) за секунду за медіаною.
+
+Результати пишуться в JSON файл, який можна порівняти з базовим.
+
+Запуск:
+    python benchmark_test.py run --sizes 10000 1000000 --shapes chain random --output temp/benchmark.json
+    python benchmark_test.py compare baseline.json temp/benchmark.json --threshold 0.1
+
+Команда queries порівнює запити аналітиків через models/tree_index.py (дохід
+піддерева, "A в мережі B", найнижчий спільний спонсор) з наївним обходом
+дерева на кожен запит:
+    python benchmark_test.py queries --sizes 100000 --shapes random powerlaw --queries 1000
+
+Команда sqlite міряє завантаження партнерів у SQLite (utils/sqlite_store.py),
+читання їх у дерево, розрахунок калькулятором і ті самі суми запитом
+WITH RECURSIVE, і звіряє суми:
+    python benchmark_test.py sqlite --sizes 100000 --shapes random kary
+
+Команда snapshots міряє, скільки запитів комісій за секунду обслуговують
+потоки-читачі models/versioned.py без перерахунку і під час фонових
+перерахунків, найдовше очікування одного запиту і час перерахунку:
+    python benchmark_test.py snapshots --sizes 100000 1000000 --readers 4
+
+Старий виклик python benchmark_test.py --n 50000 означає run з одним розміром.
+З --calculator parallel --workers 4 комісії рахуються в 4 процесах.
 """
 
-import time
-import os
-import random
-import json
 import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from main import save_commissions
 from models.core import MLMTree, CommissionCalculator
+from models.columnar import ColumnarTree, VectorizedCommissionCalculator
+from models.parallel import ParallelCommissionCalculator
+from models.tree_index import TreeIndex
+from models.versioned import VersionedCommissions
+from utils.benchmark import add_sink, remove_sink
+from utils.generators import SHAPES, generate_partners
+from utils import codec
+from utils.streaming import OUTPUT_FORMATS, iter_partners
 
 # Папка для тимчасових файлів
 TEMP_DIR = "temp"
 PARTNERS_PATH = os.path.join(TEMP_DIR, "partners.json")
 COMMISSIONS_PATH = os.path.join(TEMP_DIR, "commissions.json")
+RESULTS_PATH = os.path.join(TEMP_DIR, "benchmark.json")
 
+PHASES = ("parse", "build", "cycle_check", "compute", "serialize")
+CALCULATORS = ("core", "fixed", "vectorized", "parallel")
 
-def generate_fake_partners(n: int) -> list[dict]:
-    """
-    Створює фейкових партнерів для тестування.
 
-    Генерує дерево де кожен партнер (крім першого) має випадкового батька
-    з тих що вже створені. Це дає реалістичну MLM структуру.
+def compute_commissions(tree, calculator, workers=None):
+    """
+    Рахує комісії обраним калькулятором.
 
     Args:
-        n: Кількість партнерів для створення
+        tree (MLMTree): Побудоване дерево
+        calculator (str): Одна з CALCULATORS
+        workers (int | None): Кількість процесів для parallel
+
+    Returns:
+        dict: Комісії
+    """
+    if calculator == "core":
+        instance = CommissionCalculator(tree)
+    elif calculator == "fixed":
+        instance = CommissionCalculator(tree, fixed_point=True)
+    elif calculator == "vectorized":
+        instance = VectorizedCommissionCalculator(ColumnarTree.from_tree(tree))
+    else:
+        instance = ParallelCommissionCalculator(tree, workers)
+    return instance.calculate_commissions()
+
+
+class PhaseCollector:
+    """Приймач подій utils.benchmark, що запам'ятовує їх у списку."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def seconds(self, name):
+        return next(e["seconds"] for e in reversed(self.events) if e["phase"] == name)
+
+
+def run_pipeline(calculator, workers=None, output_format="json"):
+    """
+    Один прогін конвеєра main.py з часом кожної фази.
 
     Returns:
-        Список словників з даними партнерів
+        dict: Фаза -> секунди
     """
-    partners = []
-    for i in range(1, n + 1):
-        # Перший партнер - корінь дерева, інші мають випадкового батька
-        parent_id = None if i == 1 else random.randint(1, i - 1)
-        partners.append({
-            "id": i,
-            "parent_id": parent_id,
-            "monthly_revenue": random.randint(1000, 10000)  # Випадковий дохід
-        })
-    return partners
-
-
-def benchmark_large_run(n: int):
+    timings = {}
+
+    start = time.perf_counter()
+    partners = list(iter_partners(PARTNERS_PATH))
+    timings["parse"] = time.perf_counter() - start
+
+    collector = add_sink(PhaseCollector())
+    try:
+        tree = MLMTree(partners)
+    finally:
+        remove_sink(collector)
+    timings["build"] = collector.seconds("build")
+    timings["cycle_check"] = collector.seconds("cycle_check")
+
+    start = time.perf_counter()
+    commissions = compute_commissions(tree, calculator, workers)
+    timings["compute"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_commissions(commissions, COMMISSIONS_PATH, output_format)
+    timings["serialize"] = time.perf_counter() - start
+
+    return timings
+
+
+def summarize(times, rows):
+    median = statistics.median(times)
+    return {
+        "times": times,
+        "min": min(times),
+        "median": median,
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rows_per_second": rows / median if median else None,
+    }
+
+
+def run_suite(shapes, sizes, repeat=3, warmup=1, calculator="core", workers=None, seed=0, output_format="json"):
     """
-    Виконує повний тест продуктивності.
+    Проганяє конвеєр для всіх комбінацій форми і розміру.
 
-    Створює партнерів, зберігає їх, будує дерево, рахує комісії
-    і зберігає результат. Вимірює час виконання через декоратор.
+    Вхідні дані генеруються і записуються компактним JSON один раз на
+    комбінацію, поза вимірюванням.
 
     Args:
-        n: Кількість партнерів для тестування
+        shapes (list): Форми дерева з utils.generators.SHAPES
+        sizes (list): Кількості партнерів
+        repeat (int): Скільки виміряних прогонів
+        warmup (int): Скільки прогонів відкинути перед вимірюванням
+        calculator (str): Одна з CALCULATORS
+        workers (int | None): Кількість процесів для parallel
+        seed (int): Зерно генератора
+        output_format (str): Формат запису комісій у фазі serialize
+
+    Returns:
+        dict: meta і список results, готові до json.dump
+    """
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    results = []
+    for shape in shapes:
+        for n in sizes:
+            with open(PARTNERS_PATH, "w", encoding="utf-8") as f:
+                json.dump(generate_partners(shape, n, seed), f, separators=(",", ":"))
+
+            for _ in range(warmup):
+                run_pipeline(calculator, workers, output_format)
+            runs = [run_pipeline(calculator, workers, output_format) for _ in range(repeat)]
+
+            phases = {phase: summarize([run[phase] for run in runs], n) for phase in PHASES}
+            results.append({"shape": shape, "n": n, "calculator": calculator, "phases": phases})
+            print(f"{shape:>9} {n:>10} " + " ".join(
+                f"{phase}={phases[phase]['median']:.4f}s ({_rate(phases[phase]['rows_per_second'])})"
+                for phase in PHASES))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "warmup": warmup,
+            "seed": seed,
+            "calculator": calculator,
+            "workers": workers,
+            "output_format": output_format,
+            "json_backend": codec.backend,
+        },
+        "results": results,
+    }
+
+
+def _naive_subtree_revenue(tree, i):
+    offsets, child_index = tree.csr()
+    total, stack = 0, [i]
+    while stack:
+        k = stack.pop()
+        total += tree.monthly_revenue[k]
+        stack.extend(child_index[offsets[k]:offsets[k + 1]])
+    return total
+
+
+def _naive_in_downline(tree, i, sponsor):
+    # Обхід мережі спонсора в пошуках партнера
+    offsets, child_index = tree.csr()
+    stack = list(child_index[offsets[sponsor]:offsets[sponsor + 1]])
+    while stack:
+        k = stack.pop()
+        if k == i:
+            return True
+        stack.extend(child_index[offsets[k]:offsets[k + 1]])
+    return False
+
+
+def _naive_lca(tree, i, j):
+    ancestors = set()
+    while i >= 0:
+        ancestors.add(i)
+        i = tree.parent_index[i]
+    while j >= 0 and j not in ancestors:
+        j = tree.parent_index[j]
+    return tree.ids[j] if j >= 0 else None
+
+
+def run_queries(shapes, sizes, queries=1000, seed=0):
     """
-    # Створюємо папку якщо її немає
+    Порівнює запити через TreeIndex з наївним обходом дерева.
+
+    Для кожної форми і розміру відповідає на однакові випадкові запити
+    обома способами, перевіряє, що відповіді збігаються, і міряє час на запит.
+
+    Returns:
+        dict: meta і список results з часом побудови індексу і запитів
+    """
+    import random
+
+    results = []
+    for shape in shapes:
+        for n in sizes:
+            tree = MLMTree(generate_partners(shape, n, seed))
+            start = time.perf_counter()
+            index = TreeIndex(tree)
+            index.lca(tree.ids[0], tree.ids[0])
+            build = time.perf_counter() - start
+
+            rnd = random.Random(seed)
+            pairs = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(queries)]
+            ids = tree.ids
+            cases = {
+                "subtree_revenue": (lambda i, j: index.subtree_revenue(ids[i]),
+                                    lambda i, j: _naive_subtree_revenue(tree, i)),
+                "in_downline": (lambda i, j: index.in_downline(ids[i], ids[j]),
+                                lambda i, j: _naive_in_downline(tree, i, j)),
+                "lca": (lambda i, j: index.lca(ids[i], ids[j]),
+                        lambda i, j: _naive_lca(tree, i, j)),
+            }
+            timings = {}
+            for name, (indexed, naive) in cases.items():
+                row = {}
+                for method, func in (("index", indexed), ("naive", naive)):
+                    start = time.perf_counter()
+                    answers = [func(i, j) for i, j in pairs]
+                    row[method] = (time.perf_counter() - start) / queries
+                    row[f"{method}_answers"] = answers
+                indexed_answers, naive_answers = row.pop("index_answers"), row.pop("naive_answers")
+                if name == "subtree_revenue":
+                    assert all(abs(a - b) <= 1e-6 * max(1, abs(b)) for a, b in zip(indexed_answers, naive_answers))
+                else:
+                    assert indexed_answers == naive_answers, name
+                row["speedup"] = row["naive"] / row["index"] if row["index"] else None
+                timings[name] = row
+
+            results.append({"shape": shape, "n": n, "build": build, "queries": timings})
+            print(f"{shape:>9} {n:>10} build={build:.3f}s " + " ".join(
+                f"{name}={row['index'] * 1e6:.1f}us/{row['naive'] * 1e6:.1f}us (x{row['speedup']:.1f})"
+                for name, row in timings.items()))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "queries": queries,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def run_sqlite(shapes, sizes, seed=0):
+    """
+    Порівнює розрахунок у Python з рекурсивним запитом SQLite.
+
+    Для кожної форми і розміру записує партнерів у свіжу базу і міряє
+    фази import, read (таблиця -> MLMTree), compute і cte.
+
+    Returns:
+        dict: meta і список results з часом фаз і кількістю розбіжностей сум
+    """
+    from utils import sqlite_store
+
     os.makedirs(TEMP_DIR, exist_ok=True)
+    db_path = os.path.join(TEMP_DIR, "partners.db")
+    results = []
+    for shape in shapes:
+        for n in sizes:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            timings = {}
+            start = time.perf_counter()
+            sqlite_store.import_partners(db_path, generate_partners(shape, n, seed))
+            timings["import"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tree = sqlite_store.read_tree(db_path)
+            timings["read"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            calculator = CommissionCalculator(tree)
+            calculator.calculate_commissions()
+            timings["compute"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            sums = sqlite_store.cte_subtree_sums(db_path)
+            timings["cte"] = time.perf_counter() - start
+
+            memo = calculator.memo
+            mismatches = sum(abs(memo[pid] - total) > 1e-9 * max(abs(total), 1) for pid, total in sums)
+            results.append({"shape": shape, "n": n, "phases": timings, "mismatches": mismatches})
+            print(f"{shape:>9} {n:>10} " + " ".join(f"{name}={t:.4f}s" for name, t in timings.items())
+                  + f" mismatches={mismatches}")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _read_load(store, ids, readers, stop):
+    # Потоки-читачі: кожен запит бере поточний знімок і комісію одного
+    # партнера. Повертає лічильники запитів і найдовші запити потоків
+    import threading
+
+    counts, worst = [0] * readers, [0.0] * readers
+
+    def reader(k):
+        clock = time.perf_counter
+        reads, longest, n = 0, 0.0, len(ids)
+        while not stop.is_set():
+            start = clock()
+            snapshot = store.current
+            snapshot.commission(ids[(reads * 7919 + k) % n])
+            elapsed = clock() - start
+            if elapsed > longest:
+                longest = elapsed
+            reads += 1
+        counts[k], worst[k] = reads, longest
+
+    threads = [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+    for thread in threads:
+        thread.start()
+    return threads, counts, worst
 
-    # Генеруємо фейкових партнерів
-    partners_data = generate_fake_partners(n)
 
-    # Зберігаємо вхідні дані
-    with open(PARTNERS_PATH, "w", encoding="utf-8") as f:
-        json.dump(partners_data, f, indent=2)
+def run_snapshots(shapes, sizes, readers=4, recomputes=3, seed=0):
+    """
+    Міряє читання версійних знімків під час перерахунку.
+
+    Для кожної форми і розміру спершу рахує recomputes повних перерахунків
+    без читачів, потім стільки ж часу дає читачам працювати без записів, і
+    нарешті запускає ті самі перерахунки у фоні під навантаженням читачів.
+
+    Returns:
+        dict: meta і список results з часом перерахунку, запитами за секунду
+            і найдовшим запитом без записів і під час перерахунку
+    """
+    import threading
+
+    results = []
+    for shape in shapes:
+        for n in sizes:
+            tree = MLMTree(generate_partners(shape, n, seed))
+            store = VersionedCommissions(tree)
+            feeds = [[r * (k + 2) for r in tree.monthly_revenue] for k in range(recomputes)]
+
+            start = time.perf_counter()
+            for feed in feeds:
+                store.recompute(feed)
+            alone = (time.perf_counter() - start) / recomputes
+
+            row = {"shape": shape, "n": n, "recompute": alone}
+            for mode in ("idle", "recompute"):
+                stop = threading.Event()
+                threads, counts, worst = _read_load(store, tree.ids, readers, stop)
+                start = time.perf_counter()
+                if mode == "idle":
+                    time.sleep(alone * recomputes)
+                else:
+                    for feed in feeds:
+                        store.recompute_async(feed).result()
+                    row["recompute_under_load"] = (time.perf_counter() - start) / recomputes
+                stop.set()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+                row[f"{mode}_reads_per_second"] = sum(counts) / elapsed
+                row[f"{mode}_max_read"] = max(worst)
+            store.close()
+
+            results.append(row)
+            print(f"{shape:>9} {n:>10} recompute={alone:.3f}s/{row['recompute_under_load']:.3f}s "
+                  f"reads={row['idle_reads_per_second'] / 1e3:.0f}k/s idle, "
+                  f"{row['recompute_reads_per_second'] / 1e3:.0f}k/s during recompute "
+                  f"max_read={row['idle_max_read'] * 1e3:.2f}ms/{row['recompute_max_read'] * 1e3:.2f}ms")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "readers": readers,
+            "recomputes": recomputes,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _rate(rows_per_second):
+    if rows_per_second is None:
+        return "- rows/s"
+    return f"{rows_per_second / 1e6:.2f}M rows/s"
+
 
-    # Основна робота - будуємо дерево і рахуємо комісії
-    tree = MLMTree(partners_data)
-    calculator = CommissionCalculator(tree)
-    commissions = calculator.calculate_commissions()
+def compare_results(baseline, current, threshold=0.1, min_seconds=0.001):
+    """
+    Порівнює медіани фаз з базовим прогоном.
+
+    Регресія - коли медіана виросла більше ніж на threshold і водночас
+    більше ніж на min_seconds, щоб шум коротких фаз не давав хибних тривог.
+
+    Returns:
+        list: Рядки (shape, n, calculator, phase, base, current, ratio, regressed)
+    """
+    base_index = {(r["shape"], r["n"], r["calculator"]): r["phases"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        base_phases = base_index.get((r["shape"], r["n"], r["calculator"]))
+        if base_phases is None:
+            continue
+        for phase, stats in r["phases"].items():
+            if phase not in base_phases:
+                continue
+            base, cur = base_phases[phase]["median"], stats["median"]
+            ratio = cur / base if base else float("inf")
+            regressed = ratio > 1 + threshold and cur - base > min_seconds
+            rows.append((r["shape"], r["n"], r["calculator"], phase, base, cur, ratio, regressed))
+    return rows
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Бенчмарки розрахунку комісій")
+    commands = parser.add_subparsers(dest="command", required=True)
 
-    # Зберігаємо результати
-    with open(COMMISSIONS_PATH, "w", encoding="utf-8") as f:
-        json.dump(commissions, f, indent=2)
+    run = commands.add_parser("run", help="Запустити набір і зберегти результати")
+    run.add_argument("--sizes", "--n", type=int, nargs="+", default=[10_000, 100_000],
+                     help="Кількості партнерів, від 10 тисяч до 10 мільйонів")
+    run.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES),
+                     help="Форми дерева")
+    run.add_argument("--repeat", type=int, default=3, help="Кількість виміряних прогонів")
+    run.add_argument("--warmup", type=int, default=1, help="Кількість прогонів розігріву")
+    run.add_argument("--calculator", choices=CALCULATORS, default="core",
+                     help="Яким калькулятором рахувати комісії")
+    run.add_argument("--workers", type=int, default=None,
+                     help="Кількість процесів для --calculator parallel")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--format", dest="output_format", choices=sorted(OUTPUT_FORMATS), default="json",
+                     help="Формат запису комісій")
+    run.add_argument("--json-backend", choices=codec.BACKENDS, default=None,
+                     help="JSON бекенд, за замовчуванням найшвидший встановлений")
+    run.add_argument("--output", default=RESULTS_PATH, help="Куди записати JSON з результатами")
+
+    compare = commands.add_parser("compare", help="Порівняти результати з базовими")
+    compare.add_argument("baseline", help="JSON з базовими результатами")
+    compare.add_argument("current", help="JSON з новими результатами")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="Допустиме відносне сповільнення медіани (0.1 = 10%%)")
+    compare.add_argument("--min-seconds", type=float, default=0.001,
+                         help="Ігнорувати сповільнення, менші за це абсолютне значення")
+
+    queries = commands.add_parser("queries", help="Порівняти запити через TreeIndex з наївним обходом")
+    queries.add_argument("--sizes", "--n", type=int, nargs="+", default=[10_000, 100_000],
+                         help="Кількості партнерів")
+    queries.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES),
+                         help="Форми дерева")
+    queries.add_argument("--queries", type=int, default=1000, help="Кількість запитів кожного виду")
+    queries.add_argument("--seed", type=int, default=0)
+    queries.add_argument("--output", help="Куди записати JSON з результатами")
+
+    sqlite = commands.add_parser("sqlite", help="Порівняти розрахунок з рекурсивним запитом SQLite")
+    sqlite.add_argument("--sizes", "--n", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Кількості партнерів")
+    sqlite.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=["random", "kary", "powerlaw"],
+                        help="Форми дерева; на ланцюжку запит коштує O(N^2)")
+    sqlite.add_argument("--seed", type=int, default=0)
+    sqlite.add_argument("--output", help="Куди записати JSON з результатами")
+
+    snapshots = commands.add_parser("snapshots", help="Поміряти читання знімків під час перерахунку")
+    snapshots.add_argument("--sizes", "--n", type=int, nargs="+", default=[10_000, 100_000],
+                           help="Кількості партнерів")
+    snapshots.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=["random", "powerlaw"],
+                           help="Форми дерева")
+    snapshots.add_argument("--readers", type=int, default=4, help="Кількість потоків-читачів")
+    snapshots.add_argument("--recomputes", type=int, default=3, help="Кількість перерахунків")
+    snapshots.add_argument("--seed", type=int, default=0)
+    snapshots.add_argument("--output", help="Куди записати JSON з результатами")
+
+    # Старий виклик без команди: python benchmark_test.py --n 50000
+    if not argv or argv[0] not in ("run", "compare", "queries", "sqlite", "snapshots", "-h", "--help"):
+        argv = ["run", *argv]
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    # Парсимо аргументи командного рядка
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--n", type=int, default=50000,
-                        help="Кількість партнерів для тестування (за замовчуванням: 50000)")
-    args = parser.parse_args()
+    args = parse_args(sys.argv[1:])
+
+    if args.command == "run":
+        codec.set_backend(args.json_backend)
+        report = run_suite(args.shapes, args.sizes, args.repeat, args.warmup,
+                           args.calculator, args.workers, args.seed, args.output_format)
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    elif args.command in ("queries", "sqlite", "snapshots"):
+        if args.command == "queries":
+            report = run_queries(args.shapes, args.sizes, args.queries, args.seed)
+        elif args.command == "snapshots":
+            report = run_snapshots(args.shapes, args.sizes, args.readers, args.recomputes, args.seed)
+        else:
+            report = run_sqlite(args.shapes, args.sizes, args.seed)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
 
-    benchmark_large_run(args.n)
\ No newline at end of file
+        rows = compare_results(baseline, current, args.threshold, args.min_seconds)
+        for shape, n, calculator, phase, base, cur, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{shape:>9} {n:>10} {calculator:>10} {phase:>11} {base:.4f}s -> {cur:.4f}s x{ratio:.2f}{flag}")
+        regressions = sum(row[-1] for row in rows)
+        print(f"{regressions} regression(s) in {len(rows)} measurements")
+        sys.exit(1 if regressions else 0)
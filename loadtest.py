@@ -0,0 +1,121 @@
+"""
+Навантажувальний тест сервісу комісій (service.py).
+
+Запускає кілька конкурентних клієнтів з keep-alive з'єднаннями. Кожен
+клієнт шле суміш запитів: комісія партнера, піддерево, топ і зміна доходу.
+Наприкінці друкує p50/p90/p99 затримки на кожен тип запиту і пропускну
+здатність.
+
+Запуск:
+    python service.py --input dataset.json --port 8080 &
+    python loadtest.py --input dataset.json --port 8080 --clients 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+from main import load_tree
+
+# Частка запитів кожного типу
+MIX = (("commission", 0.7), ("subtree", 0.15), ("top", 0.1), ("revenue", 0.05))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def _request(reader, writer, method, target, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: mlm\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    payload = await reader.readexactly(length)
+    return status, payload
+
+
+async def _client(ids, requests, connect, latencies, rng):
+    reader, writer = await connect()
+    kinds, weights = zip(*MIX)
+    try:
+        for _ in range(requests):
+            kind = rng.choices(kinds, weights)[0]
+            pid = rng.choice(ids)
+            if kind == "commission":
+                args = ("GET", f"/commission/{pid}")
+            elif kind == "subtree":
+                args = ("GET", f"/subtree/{pid}")
+            elif kind == "top":
+                args = ("GET", "/top?n=10")
+            else:
+                args = ("POST", "/revenue", {"id": pid, "monthly_revenue": rng.randint(1000, 10000)})
+
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, *args)
+            latencies[kind].append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f"{args[0]} {args[1]} returned {status}")
+    finally:
+        writer.close()
+
+
+async def run_load(ids, clients, requests, host="127.0.0.1", port=8080, unix_path=None, seed=0):
+    """
+    Проганяє навантаження і повертає затримки по типах запитів.
+
+    Returns:
+        tuple: (dict тип -> список секунд, загальний час у секундах)
+    """
+    if unix_path:
+        def connect():
+            return asyncio.open_unix_connection(unix_path)
+    else:
+        def connect():
+            return asyncio.open_connection(host, port)
+
+    latencies = defaultdict(list)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(ids, requests, connect, latencies, random.Random(seed + c)) for c in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def report(latencies, elapsed):
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s, {total / elapsed:.0f} req/s")
+    rows = sorted(latencies.items()) + [("all", [v for values in latencies.values() for v in values])]
+    for kind, values in rows:
+        values = sorted(values)
+        print(f"{kind:>10}: n={len(values):>7} p50={percentile(values, 0.5) * 1000:.3f}ms "
+              f"p90={percentile(values, 0.9) * 1000:.3f}ms p99={percentile(values, 0.99) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Навантажувальний тест service.py")
+    parser.add_argument("--input", required=True, help="Той самий вхідний файл, що й у сервісу, для вибору id")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Unix сокет сервісу замість TCP")
+    parser.add_argument("--clients", type=int, default=16, help="Кількість конкурентних клієнтів")
+    parser.add_argument("--requests", type=int, default=1000, help="Запитів на одного клієнта")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ids = list(load_tree(args.input).ids)
+    latencies, elapsed = asyncio.run(
+        run_load(ids, args.clients, args.requests, args.host, args.port, args.unix, args.seed))
+    report(latencies, elapsed)
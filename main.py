@@ -4,12 +4,87 @@
 Завантажує дані партнерів, будує дерево, рахує комісії і зберігає результат.
 Запускається з командного рядка.
 
-Запуск - python main.py --input partners.json --output commissions.json
+Вхідний файл читається потоково, тому може бути як JSON масивом,
+так і JSON Lines (по одному партнеру на рядок).
+
+--input може вказувати і на каталог або glob шаблон ("export/part-*.jsonl"):
+тоді шарди розбираються паралельно в --workers процесах (utils/shards.py).
+
+Вхідним файлом може бути і база SQLite з таблицею partners (utils/sqlite_store.py):
+вона читається порціями прямо в дерево, а з --format sqlite комісії
+пишуться в таблицю commissions бази --output.
+
+Вхідним файлом може бути і бінарний знімок дерева (див. utils/snapshot.py):
+він відкривається через mmap без розбору JSON. Знімок записується опцією
+--write-snapshot при звичайному запуску і з --revenues.
+
+Кожна фаза (load, snapshot_write, commissions і вкладені build, cycle_check)
+може звітувати про час і пам'ять (див. utils/benchmark.py):
+--metrics-log пише рядок у stderr, --metrics-json і --metrics-prom - у файли.
+--profile зберігає cProfile, --profile-sample - семпли стеків для flamegraph.
+
+--validate report.json перед побудовою дерева перевіряє вхід одним проходом
+і записує звіт про всі дублікати id, сиріт і цикли (models/validation.py).
+Якщо є цикли, розрахунок не запускається. Знімок не зберігає сирого входу,
+тож --validate для нього - помилка.
+
+--ids 1,2,3 і/або --ids-file ids.txt (id на рядок) обмежують вихід вибраними
+партнерами: обходяться лише їхні піддерева.
+
+З --revenues matrix.csv комісії рахуються одразу за всі періоди з CSV
+(стовпець id, далі стовпець доходу на кожен період) над однією ієрархією з
+--input, і пишуться в один файл: {"id": {"період": комісія, ...}, ...}.
+
+--plan задає ставки по рівнях у відсотках (models/plans.py): "5,3,1x5" -
+5% з рівня 1, 3% з рівня 2 і 1% з рівнів 3-7. За замовчуванням - 5% від
+денного доходу всіх нащадків (пресет flat5, те саме що "5+").
+
+--fixed-point рахує суми в цілих мінорних одиницях (копійках) з точним
+округленням HALF_UP (див. models/core.py) у всіх режимах: звичайному,
+--revenues, --max-memory, --cache і звітах.
+
+--format вибирає вихід: json (з відступами, за замовчуванням), compact
+(JSON без пробілів), csv, binary (utils/streaming.py) або sqlite (таблиця
+commissions у базі --output). JSON розбирається
+і пишеться через orjson чи msgspec, якщо вони встановлені
+(--json-backend json вмикає стандартний модуль).
+
+--max-memory 512M рахує комісії з обмеженою пам'яттю (models/out_of_core.py):
+дерево не будується в пам'яті, а проміжні дані сортуються на диску
+(--tmpdir). Потрібно для мереж, більших за оперативну пам'ять.
+
+--cache DIR зберігає комісії в кеші, ключованому хешем вмісту входу
+(models/cache.py): однаковий вхід не розбирається зовсім, а для зміненого
+перераховуються лише ланцюжки предків змінених партнерів. Розмір кешу
+обмежує --cache-size (за замовчуванням 1G), давні записи видаляються.
+
+--top 1000, --threshold 50 і --percentiles 50,90,99 замість усіх комісій
+пишуть у --output JSON звіт (models/reporting.py): найбільші комісії,
+партнерів з комісією не меншою за поріг і комісії на перцентилях. Повний
+словник комісій і рядкові id при цьому не будуються.
+
+Аргументи розбирає argparse (python main.py --help), а важкі модулі
+імпортуються лише для опцій, яким вони потрібні, тож звичайний запуск на
+маленькому дереві не платить за NumPy чи пул процесів.
+
+Запуск - python main.py --input partners.json --output commissions.json [--write-snapshot tree.snap] [--workers 8]
+        [--format compact] [--json-backend orjson] [--plan 5,3,1x5] [--fixed-point]
+        [--validate report.json] [--ids 1,2,3] [--ids-file ids.txt] [--revenues matrix.csv]
+        [--max-memory 512M] [--tmpdir /var/tmp] [--cache .mlm-cache] [--cache-size 1G]
+        [--top 1000] [--threshold 50] [--percentiles 50,90,99]
+        [--metrics-log] [--metrics-json metrics.jsonl] [--metrics-prom mlm.prom]
+        [--profile run.prof | --profile-sample run.folded]
 """
 
-import json
-import sys
 from models.core import MLMTree, CommissionCalculator
+from utils.benchmark import phase
+from utils.shards import expand_shards, is_shard_pattern, read_shards
+from utils.snapshot import is_snapshot, write_snapshot
+from utils.streaming import OUTPUT_FORMATS, iter_partners
+
+# NumPy, csv, пул процесів, логування і решта опційних частин імпортуються
+# лише тими функціями та опціями, яким вони потрібні: main.py часто
+# запускають на маленьких деревах, де час старту більший за розрахунок.
 
 
 def load_partners(filepath):
@@ -22,42 +97,461 @@ def load_partners(filepath):
     Returns:
         list: Список партнерів
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return list(iter_partners(filepath))
 
 
-def save_commissions(data, filepath):
+def load_tree(filepath, workers=None):
     """
-    Зберігає комісії в JSON файл.
+    Будує дерево з JSON файлу чи шардів або відкриває бінарний знімок.
 
     Args:
-        data (dict): Розраховані комісії 
-        filepath (str): Куди зберігати
+        filepath (str): JSON масив, JSON Lines, знімок, база SQLite, каталог або glob шардів
+        workers (int | None): Процесів для розбору шардів
+
+    Returns:
+        MLMTree: Дерево партнерів
     """
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    from utils.sqlite_store import is_sqlite, read_tree
 
+    if is_shard_pattern(filepath):
+        with phase("shards_parse") as event:
+            paths = expand_shards(filepath)
+            columns = read_shards(paths, workers)
+            event["shards"] = len(paths)
+        return MLMTree.from_columns(*columns)
+    if is_snapshot(filepath):
+        return MLMTree.from_snapshot(filepath)
+    if is_sqlite(filepath):
+        return read_tree(filepath)
+    # Читаємо партнерів потоково без проміжного списку
+    return MLMTree(iter_partners(filepath))
 
-if __name__ == "__main__":
-    # Парсимо аргументи командного рядка
-    # Шукаємо --input і --output
+
+def iter_records(filepath):
+    """Партнери словниками з JSON файлу, шардів або бази SQLite, без побудови дерева."""
+    if is_shard_pattern(filepath):
+        from itertools import chain
+        return chain.from_iterable(map(iter_partners, expand_shards(filepath)))
+    from utils.sqlite_store import is_sqlite, iter_rows
+    if is_sqlite(filepath):
+        return iter_rows(filepath)
+    return iter_partners(filepath)
+
+
+def _parse_number(raw):
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def resolve_partner_id(raw_id, tree):
+    """
+    Знаходить id партнера з рядка командного рядка чи CSV.
+
+    Id у файлах і аргументах - рядок, а в дереві зазвичай число.
+
+    Raises:
+        ValueError: Якщо такого партнера немає в дереві
+    """
     try:
-        input_file = sys.argv[sys.argv.index("--input") + 1]
-        output_file = sys.argv[sys.argv.index("--output") + 1]
-    except (ValueError, IndexError):
-        # Якщо щось не так з аргументами - показуємо як користуватися
-        print("Usage: python main.py --input partners.json --output commissions.json")
-        sys.exit(1)
+        pid = int(raw_id)
+    except ValueError:
+        pid = raw_id
+    if pid not in tree.index:
+        pid = raw_id
+    if pid not in tree.index:
+        raise ValueError(f"Partner {raw_id} is not in the tree")
+    return pid
+
+
+def load_ids(ids=None, ids_file=None):
+    """
+    Збирає id з --ids (через кому) і --ids-file (по одному на рядок).
+
+    Returns:
+        list: Id-рядки без повторів у порядку першої появи
+    """
+    raw = []
+    if ids:
+        raw.extend(ids.split(","))
+    if ids_file:
+        with open(ids_file, encoding="utf-8") as f:
+            raw.extend(f)
+    return list(dict.fromkeys(r.strip() for r in raw if r.strip()))
+
+
+def load_revenue_matrix(filepath, tree):
+    """
+    Читає CSV з доходами партнерів за кілька періодів.
+
+    Перший рядок - заголовок: id, далі назви періодів. Партнери, яких
+    немає у файлі, мають нульовий дохід у всіх періодах.
+
+    Args:
+        filepath (str): Шлях до CSV
+        tree (MLMTree): Ієрархія, до якої належать id
+
+    Returns:
+        tuple: (список назв періодів, матриця партнери x періоди в порядку tree.ids)
+    """
+    import csv
+    import numpy as np
+
+    with open(filepath, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        periods = header[1:]
+        matrix = np.zeros((len(tree.ids), len(periods)))
+        for row in reader:
+            if not row:
+                continue
+            pid = resolve_partner_id(row[0], tree)
+            if len(row) != len(header):
+                raise ValueError(f"Row for partner {row[0]} has {len(row) - 1} values, expected {len(periods)}")
+            matrix[tree.index[pid]] = [_parse_number(v) for v in row[1:]]
+    return periods, matrix
+
+
+def save_commissions(data, filepath, output_format="json"):
+    """
+    Зберігає комісії у файл.
+
+    Записує потоково, тому замість словника можна передати генератор пар
+    (id, комісія), наприклад CommissionCalculator.iter_commissions().
+
+    Args:
+        data (dict | Iterable): Розраховані комісії
+        filepath (str): Куди зберігати
+        output_format (str): Один з utils.streaming.OUTPUT_FORMATS або sqlite
+    """
+    items = data.items() if isinstance(data, dict) else data
+    if output_format == "sqlite":
+        from utils.sqlite_store import write_commissions
+        write_commissions(filepath, items)
+        return
+    write, binary = OUTPUT_FORMATS[output_format]
+    if binary:
+        with open(filepath, "wb") as f:
+            write(items, f)
+    else:
+        with open(filepath, "w", encoding="utf-8", newline="") as f:
+            write(items, f)
+
+
+def _is_snapshot_input(filepath):
+    return not is_shard_pattern(filepath) and is_snapshot(filepath)
+
+
+def validate_input(input_file, report_file):
+    """
+    Перевіряє вхідний JSON і записує звіт.
 
-    # Основна робота
-    partners_data = load_partners(input_file)
+    Args:
+        input_file (str): JSON масив, JSON Lines, каталог або glob шардів
+        report_file (str): Куди записати звіт
+
+    Returns:
+        ValidationReport: Звіт перевірки
+
+    Raises:
+        ValueError: Якщо у вхідних даних є цикли або вхід - знімок
+    """
+    import json
+    from models.validation import validate_partners
+
+    if _is_snapshot_input(input_file):
+        raise ValueError(f"Cannot validate snapshot {input_file}: it keeps no duplicates or raw parent ids")
+
+    report = validate_partners(iter_records(input_file))
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report.to_dict(), f, indent=2)
+    if report.cycles:
+        raise ValueError(f"Invalid input {input_file}: {report.summary()}, see {report_file}")
+    return report
+
+
+def run(input_file, output_file, snapshot_file=None, ids=None, report_file=None, workers=None,
+        output_format="json", plan=None, cache_dir=None, cache_bytes=None, fixed_point=False):
+    """
+    Повний конвеєр: дерево, необов'язковий знімок, комісії у файл.
+
+    Args:
+        input_file (str): JSON масив, JSON Lines або знімок
+        output_file (str): Куди зберегти комісії
+        snapshot_file (str | None): Куди записати знімок дерева
+        ids (list | None): Рахувати лише цих партнерів (id-рядки)
+        report_file (str | None): Куди записати звіт перевірки входу
+        workers (int | None): Процесів для розбору шардів
+        output_format (str): json, compact, csv, binary або sqlite
+        plan (CommissionPlan | None): План зі ставками по рівнях замість 5% від усіх нащадків
+        cache_dir (str | None): Каталог кешу результатів
+        cache_bytes (int | None): Найбільший розмір кешу
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+    if report_file:
+        validate_input(input_file, report_file)
+
+    if cache_dir:
+        from models.cache import DEFAULT_CACHE_BYTES, ResultCache
+        cache = ResultCache(cache_dir, cache_bytes or DEFAULT_CACHE_BYTES, fixed_point)
+        paths = expand_shards(input_file) if is_shard_pattern(input_file) else [input_file]
+        with phase("commissions"):
+            result = cache.commissions(paths, lambda: load_tree(input_file, workers), source=input_file)
+            save_commissions(result.items(), output_file, output_format)
+        return
+
+    # Будуємо дерево MLM або відкриваємо готовий знімок
+    with phase("load", input=input_file):
+        tree = load_tree(input_file, workers)
 
-    # Будуємо дерево MLM
-    tree = MLMTree(partners_data)
+    # Зберігаємо знімок, щоб наступні запуски не розбирали JSON
+    if snapshot_file:
+        with phase("snapshot_write"):
+            write_snapshot(tree, snapshot_file)
 
-    # Рахуємо комісії
-    calculator = CommissionCalculator(tree)
-    commissions = calculator.calculate_commissions()
+    # Рахуємо комісії і одразу пишемо їх у файл
+    with phase("commissions"):
+        if plan is None:
+            calculator = CommissionCalculator(tree, fixed_point)
+        else:
+            from models.plans import LevelCommissionCalculator
+            calculator = LevelCommissionCalculator(tree, plan, fixed_point)
+        # Записувачі самі перетворюють id, тож str(pid) на кожен рядок не потрібен
+        if ids is None:
+            commissions = calculator.iter_commissions(str_ids=False)
+        else:
+            # Лише піддерева запитаних партнерів, без повного словника
+            commissions = calculator.iter_commissions_for(
+                [resolve_partner_id(pid, tree) for pid in ids], str_ids=False)
+        save_commissions(commissions, output_file, output_format)
 
-    # Зберігаємо результат
-    save_commissions(commissions, output_file)
\ No newline at end of file
+
+def run_periods(input_file, revenues_file, output_file, fixed_point=False, output_format="json",
+                snapshot_file=None, workers=None):
+    """
+    Комісії за всі періоди з матриці доходів з однією побудовою дерева.
+
+    Args:
+        input_file (str): Ієрархія - JSON масив, JSON Lines або знімок
+        revenues_file (str): CSV з доходами за періодами
+        output_file (str): Куди зберегти {"id": {"період": комісія}}
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+        output_format (str): json, compact або csv (стовпець на період)
+        snapshot_file (str | None): Куди записати знімок ієрархії
+        workers (int | None): Процесів для розбору шардів
+    """
+    from models.columnar import ColumnarTree, MultiPeriodCommissionCalculator
+
+    with phase("load", input=input_file):
+        tree = load_tree(input_file, workers)
+
+    if snapshot_file:
+        with phase("snapshot_write"):
+            write_snapshot(tree, snapshot_file)
+
+    with phase("revenues_load", input=revenues_file) as event:
+        periods, matrix = load_revenue_matrix(revenues_file, tree)
+        event["periods"] = len(periods)
+
+    with phase("commissions", periods=len(periods)):
+        calculator = MultiPeriodCommissionCalculator(
+            ColumnarTree.from_tree(tree), matrix, periods, fixed_point=fixed_point)
+        save_commissions(calculator.iter_commissions(), output_file, output_format)
+
+
+def run_out_of_core(input_file, output_file, max_memory, tmpdir=None, output_format="json", fixed_point=False):
+    """
+    Комісії з обмеженою пам'яттю: вхід читається потоком, дерево живе на диску.
+
+    Args:
+        input_file (str): JSON масив, JSON Lines, каталог або glob шардів
+        output_file (str): Куди зберегти комісії
+        max_memory (int): Бюджет пам'яті в байтах
+        tmpdir (str | None): Каталог для тимчасових файлів
+        output_format (str): json, compact, csv, binary або sqlite
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+    from models.out_of_core import OutOfCoreCommissionCalculator
+
+    if _is_snapshot_input(input_file):
+        raise ValueError("--max-memory needs JSON or SQLite input, the snapshot is already memory-mapped")
+    records = iter_records(input_file)
+
+    with phase("commissions", max_memory=max_memory):
+        calculator = OutOfCoreCommissionCalculator(records, max_memory, tmpdir, fixed_point)
+        save_commissions(calculator.iter_commissions(), output_file, output_format)
+
+
+def run_report(input_file, output_file, top=None, threshold=None, percentiles=None, workers=None,
+               fixed_point=False):
+    """
+    Звіт про найбільші комісії, поріг і перцентилі замість усіх комісій.
+
+    Args:
+        input_file (str): JSON масив, JSON Lines, знімок, база SQLite, каталог або glob шардів
+        output_file (str): Куди записати JSON звіт
+        top (int | None): Скільки найбільших комісій
+        threshold (float | None): Поріг виплати
+        percentiles (list | None): Перцентилі від 0 до 100
+        workers (int | None): Процесів для розбору шардів
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+    import json
+    from models.reporting import CommissionReport
+
+    with phase("load", input=input_file):
+        tree = load_tree(input_file, workers)
+
+    with phase("report"):
+        report = CommissionReport(tree, fixed_point).to_dict(top, threshold, percentiles)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def _parse_percentiles(raw):
+    return [float(q) for q in raw.split(",")]
+
+
+def parse_args(argv=None):
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Розрахунок комісій MLM")
+    parser.add_argument("--input", required=True,
+                        help="JSON масив, JSON Lines, знімок, каталог або glob шардів")
+    parser.add_argument("--output", required=True, help="Куди записати комісії")
+    parser.add_argument("--write-snapshot", metavar="FILE", help="Зберегти бінарний знімок дерева")
+    parser.add_argument("--workers", type=int, help="Процесів для розбору шардів")
+    parser.add_argument("--format", dest="output_format", choices=[*OUTPUT_FORMATS, "sqlite"], default="json",
+                        help="Формат виводу")
+    parser.add_argument("--json-backend",
+                        help="orjson, msgspec або json, за замовчуванням найшвидший встановлений")
+    parser.add_argument("--plan", help="Ставки по рівнях у відсотках, наприклад 5,3,1x5")
+    parser.add_argument("--fixed-point", action="store_true", help="Рахувати в цілих мінорних одиницях")
+    parser.add_argument("--validate", metavar="FILE", help="Перевірити вхід і записати звіт")
+    parser.add_argument("--ids", help="Рахувати лише цих партнерів (через кому)")
+    parser.add_argument("--ids-file", metavar="FILE", help="Файл з id партнерів, по одному на рядок")
+    parser.add_argument("--revenues", metavar="FILE", help="CSV з доходами за періодами")
+    parser.add_argument("--max-memory", help="Бюджет пам'яті для розрахунку на диску, наприклад 512M або 2G")
+    parser.add_argument("--tmpdir", help="Каталог для тимчасових файлів --max-memory")
+    parser.add_argument("--cache", metavar="DIR", help="Кеш результатів, ключований хешем входу")
+    parser.add_argument("--cache-size", help="Найбільший розмір кешу, наприклад 1G")
+    parser.add_argument("--top", type=int, metavar="N", help="Звіт про N найбільших комісій")
+    parser.add_argument("--threshold", type=float, help="Звіт про партнерів з комісією від порогу")
+    parser.add_argument("--percentiles", type=_parse_percentiles, metavar="Q,...",
+                        help="Звіт про комісії на перцентилях, наприклад 50,90,99")
+    parser.add_argument("--metrics-log", action="store_true", help="Писати події фаз у лог")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Дописувати події фаз у JSON Lines")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Textfile для Prometheus node_exporter")
+    profiling = parser.add_mutually_exclusive_group()
+    profiling.add_argument("--profile", metavar="FILE", help="Зберегти cProfile")
+    profiling.add_argument("--profile-sample", metavar="FILE", help="Зберегти семпли стеків для flamegraph")
+    args = parser.parse_args(argv)
+
+    if args.json_backend:
+        from utils import codec
+        try:
+            codec.set_backend(args.json_backend)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.max_memory:
+        from models.out_of_core import MIN_MEMORY, parse_size
+        try:
+            args.max_memory = parse_size(args.max_memory)
+        except ValueError:
+            parser.error(f"invalid --max-memory {args.max_memory!r}, expected e.g. 512M")
+        if args.max_memory < MIN_MEMORY:
+            parser.error(f"--max-memory must be at least {MIN_MEMORY // 1024}K")
+        if args.revenues or args.plan or args.ids or args.ids_file or args.write_snapshot:
+            parser.error("--max-memory cannot be combined with --revenues, --plan, --ids or --write-snapshot")
+
+    # Знімок зберігає дерево вже без дублікатів і з розв'язаними батьками,
+    # тож звіту про вхід з нього не скласти
+    if args.validate and os.path.isfile(args.input) and _is_snapshot_input(args.input):
+        parser.error("--validate needs JSON, JSON Lines, SQLite or shard input, not a snapshot")
+
+    if args.revenues and (args.ids or args.ids_file):
+        parser.error("--revenues cannot be combined with --ids or --ids-file")
+    # MultiPeriodCommissionCalculator рахує лише 5% від усіх нащадків
+    if args.revenues and args.plan:
+        parser.error("--revenues cannot be combined with --plan")
+    # Бінарний формат і таблиця commissions мають одну колонку комісій і не вміщують періодів
+    if args.revenues and args.output_format in ("binary", "sqlite"):
+        parser.error("--revenues cannot be written with --format binary or sqlite")
+
+    if args.plan:
+        from models.plans import CommissionPlan
+        try:
+            args.plan = CommissionPlan.parse(args.plan)
+        except ValueError as e:
+            parser.error(f"invalid --plan: {e}")
+
+    if args.cache_size:
+        from models.out_of_core import parse_size
+        try:
+            args.cache_size = parse_size(args.cache_size)
+        except ValueError:
+            parser.error(f"invalid --cache-size {args.cache_size!r}, expected e.g. 1G")
+    if args.cache and (args.max_memory or args.revenues or args.plan or args.ids or args.ids_file
+                       or args.write_snapshot):
+        parser.error("--cache cannot be combined with --max-memory, --revenues, --plan, --ids or --write-snapshot")
+    if args.top is not None or args.threshold is not None or args.percentiles is not None:
+        if (args.max_memory or args.revenues or args.plan or args.ids or args.ids_file or args.cache
+                or args.write_snapshot):
+            parser.error("--top, --threshold and --percentiles cannot be combined with "
+                         "--max-memory, --revenues, --plan, --ids, --cache or --write-snapshot")
+        # Звіт завжди пишеться JSON
+        if args.output_format != "json":
+            parser.error("--top, --threshold and --percentiles write a JSON report, --format must be json")
+        if args.percentiles and any(not 0 <= q <= 100 for q in args.percentiles):
+            parser.error("--percentiles must be between 0 and 100")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.metrics_log or args.metrics_json or args.metrics_prom:
+        from utils.benchmark import JsonLinesSink, LogSink, PrometheusSink, add_sink
+        if args.metrics_log:
+            import logging
+            logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+            add_sink(LogSink())
+        if args.metrics_json:
+            add_sink(JsonLinesSink(args.metrics_json))
+        if args.metrics_prom:
+            add_sink(PrometheusSink(args.metrics_prom))
+
+    if args.profile or args.profile_sample:
+        from utils.benchmark import profile
+        profiler = profile(args.profile or args.profile_sample, sampling=bool(args.profile_sample))
+    else:
+        from contextlib import nullcontext
+        profiler = nullcontext()
+
+    with profiler:
+        if args.max_memory:
+            if args.validate:
+                validate_input(args.input, args.validate)
+            run_out_of_core(args.input, args.output, args.max_memory, args.tmpdir, args.output_format,
+                            args.fixed_point)
+        elif args.top is not None or args.threshold is not None or args.percentiles is not None:
+            if args.validate:
+                validate_input(args.input, args.validate)
+            run_report(args.input, args.output, args.top, args.threshold, args.percentiles, args.workers,
+                       args.fixed_point)
+        elif args.revenues:
+            if args.validate:
+                validate_input(args.input, args.validate)
+            run_periods(args.input, args.revenues, args.output, args.fixed_point, args.output_format,
+                        args.write_snapshot, args.workers)
+        else:
+            ids = load_ids(args.ids, args.ids_file) if args.ids or args.ids_file else None
+            run(args.input, args.output, args.write_snapshot, ids, args.validate, args.workers,
+                args.output_format, args.plan, args.cache, args.cache_size, args.fixed_point)
+
+
+if __name__ == "__main__":
+    main()
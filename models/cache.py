@@ -0,0 +1,255 @@
+"""
+Кеш результатів на диску, ключований хешем вмісту входу.
+
+Кожен запис кешу - колонки дерева (id, parent_id, дохід), суми нащадків з
+memo і округлені комісії. Для входу, байт-у-байт однакового з уже
+порахованим, комісії беруться із запису без розбору JSON. Якщо вхід
+змінився, він порівнюється з останнім записом для того самого файлу, і
+суми перераховуються лише для предків змінених, нових, видалених або
+переміщених партнерів. Решта сум і комісій береться з кешу.
+
+Суми на змінених ланцюжках рахуються заново з дітей у тому ж порядку, що
+й CommissionCalculator._dfs, тож результат біт-в-біт той самий, що й при
+повному розрахунку, а не накопичення дельт.
+
+Розмір кешу обмежений: після запису найдавніше використані записи
+видаляються, доки сума їхніх розмірів більша за max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+from models.core import CommissionCalculator, daily_revenue, round_commission, round_commission_exact, to_minor_units
+from utils.benchmark import phase
+
+DEFAULT_CACHE_BYTES = 1 << 30
+
+# Змінюється разом з форматом запису, щоб старі записи не читались
+_FORMAT = b"mlm-cache-1"
+_CHUNK = 1 << 20
+
+
+def content_hash(paths, fixed_point=False):
+    """
+    Хеш вмісту вхідних файлів і режиму розрахунку.
+
+    Args:
+        paths (list): Файли входу в порядку читання (кілька - для шардів)
+        fixed_point (bool): Режим розрахунку, бо він змінює суми в memo
+    """
+    digest = hashlib.blake2b(_FORMAT, digest_size=20)
+    digest.update(b"fixed" if fixed_point else b"float")
+    for path in paths:
+        digest.update(b"%d:" % os.path.getsize(path))
+        with open(path, "rb") as f:
+            while chunk := f.read(_CHUNK):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedResult:
+    """Запис кешу: колонки дерева, суми нащадків і комісії в порядку ids."""
+
+    def __init__(self, source, ids, parent_ids, revenue, totals, commissions):
+        self.source = source
+        self.ids = ids
+        self.parent_ids = parent_ids
+        self.revenue = revenue
+        self.totals = totals
+        self.commissions = commissions
+
+    def items(self):
+        return zip(self.ids, self.commissions)
+
+
+class ResultCache:
+    """
+    Кеш комісій у каталозі з обмеженням розміру.
+
+    Args:
+        directory (str): Каталог кешу, створюється за потреби
+        max_bytes (int): Найбільший сумарний розмір записів
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES, fixed_point=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fixed_point = fixed_point
+        # Як був отриманий останній результат: hit, incremental або miss
+        self.last = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _read_index(self):
+        # key -> джерело; записи без файлу (видалені вручну) пропускаються
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        return {key: source for key, source in index.items() if os.path.exists(self._entry(key))}
+
+    def _write_index(self, index):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path())
+
+    def load(self, key):
+        """Повертає запис за ключем або None; використання оновлює його місце в LRU."""
+        path = self._entry(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return result
+
+    def latest(self, source):
+        """Останній використаний запис для того самого файлу входу або None."""
+        keys = [key for key, entry_source in self._read_index().items() if entry_source == source]
+        if not keys:
+            return None
+        return self.load(max(keys, key=lambda key: os.path.getmtime(self._entry(key))))
+
+    def store(self, key, result):
+        """Записує результат і видаляє найдавніше використані записи понад max_bytes."""
+        path = self._entry(key)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        index = self._read_index()
+        index[key] = result.source
+        self._write_index(self.evict(index))
+
+    def evict(self, index):
+        entries = sorted(index, key=lambda key: os.path.getmtime(self._entry(key)))
+        total = sum(os.path.getsize(self._entry(key)) for key in entries)
+        for key in entries:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(self._entry(key))
+            os.remove(self._entry(key))
+            del index[key]
+        return index
+
+    def commissions(self, paths, load_tree, source=None):
+        """
+        Комісії для входу з кешу, інкрементально або повним розрахунком.
+
+        Args:
+            paths (list): Файли входу, з яких рахується хеш
+            load_tree (callable): Будує MLMTree, якщо вхід не знайдено в кеші
+            source (str | None): Ім'я входу для пошуку попереднього запису,
+                за замовчуванням перший файл
+
+        Returns:
+            CachedResult: Результат; пари (id, комісія) дає items()
+        """
+        source = os.path.abspath(source or paths[0])
+        with phase("cache") as event:
+            key = content_hash(paths, self.fixed_point)
+            result = self.load(key)
+            if result is not None:
+                self.last = event["result"] = "hit"
+                return result
+
+            tree = load_tree()
+            previous = self.latest(source)
+            if previous is None:
+                result, event["recomputed"] = self._full(tree, source), len(tree.ids)
+                self.last = "miss"
+            else:
+                result, event["recomputed"] = self._incremental(tree, source, previous)
+                self.last = "incremental"
+            event["result"] = self.last
+            self.store(key, result)
+        return result
+
+    def _full(self, tree, source):
+        calculator = CommissionCalculator(tree, self.fixed_point)
+        commissions = [c for _, c in calculator.iter_commissions(str_ids=False)]
+        memo = calculator.memo
+        return CachedResult(source, list(tree.ids), [tree._parent_id(i) for i in range(len(tree.ids))],
+                            list(tree.monthly_revenue), [memo[pid] for pid in tree.ids], commissions)
+
+    def _incremental(self, tree, source, previous):
+        ids = list(tree.ids)
+        revenue = list(tree.monthly_revenue)
+        parent_index = tree.parent_index
+        parent_ids = [tree._parent_id(i) for i in range(len(ids))]
+        old_position = dict(zip(previous.ids, range(len(previous.ids))))
+        index = tree.index
+
+        # dirty[i] - сума нащадків i могла змінитись. Позначка піднімається
+        # до кореня і зупиняється на вже позначеному предку.
+        dirty = bytearray(len(ids))
+
+        def mark(i):
+            while i >= 0 and not dirty[i]:
+                dirty[i] = 1
+                i = parent_index[i]
+
+        def mark_id(partner_id):
+            i = index.get(partner_id) if partner_id is not None else None
+            if i is not None:
+                mark(i)
+
+        positions = [-1] * len(ids)
+        seen = bytearray(len(previous.ids))
+        ordered = True
+        last = -1
+        for i, pid in enumerate(ids):
+            j = old_position.get(pid)
+            if j is None:
+                # Новий партнер: його сума рахується з нуля, як і в предків
+                mark(i)
+                continue
+            positions[i] = j
+            seen[j] = 1
+            ordered = ordered and j > last
+            last = j
+            if previous.parent_ids[j] != parent_ids[i] or previous.revenue[j] != revenue[i]:
+                mark(parent_index[i])
+                if previous.parent_ids[j] != parent_ids[i]:
+                    mark_id(previous.parent_ids[j])
+        for j, was_seen in enumerate(seen):
+            if not was_seen:
+                mark_id(previous.parent_ids[j])
+
+        offsets, child_index = tree.csr()
+        if not ordered:
+            # Рядки переставлено: сума, де змінився порядок дітей, додається
+            # в іншому порядку, тож рахується заново
+            for p in range(len(ids)):
+                children = [positions[c] for c in child_index[offsets[p]:offsets[p + 1]]]
+                if children != sorted(children):
+                    mark(p)
+
+        if self.fixed_point:
+            contribution, round_ = to_minor_units, round_commission_exact
+        else:
+            contribution, round_ = daily_revenue, round_commission
+        totals = [previous.totals[j] if j >= 0 else None for j in positions]
+        commissions = [previous.commissions[j] if j >= 0 else None for j in positions]
+        recomputed = 0
+        for i in reversed(tree.order_index):
+            if not dirty[i]:
+                continue
+            total = 0
+            for c in child_index[offsets[i]:offsets[i + 1]]:
+                total += contribution(revenue[c])
+                total += totals[c]
+            totals[i] = total
+            commissions[i] = round_(total)
+            recomputed += 1
+        return CachedResult(source, ids, parent_ids, revenue, totals, commissions), recomputed
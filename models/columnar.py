@@ -0,0 +1,241 @@
+"""
+Колонкове (NumPy) представлення дерева партнерів.
+
+Замість об'єкта Partner зі списком дітей на кожен рядок дерево зберігається
+як три масиви однакової довжини: ids, parent_index і monthly_revenue.
+Суми доходу піддерев рахуються векторно, рівень за рівнем від найглибшого.
+"""
+
+import numpy as np
+
+from models.core import MINOR_UNITS, to_minor_units
+from utils.benchmark import benchmark
+
+
+class ColumnarTree:
+    """
+    Дерево партнерів у вигляді масивів.
+
+    Attributes:
+        ids (np.ndarray): Ідентифікатори партнерів
+        parent_index (np.ndarray): Індекс батька в ids або -1 для коренів
+        monthly_revenue (np.ndarray): Місячний дохід (float64)
+        depth (np.ndarray): Відстань від кореня
+    """
+
+    def __init__(self, ids, parent_index, monthly_revenue):
+        self.ids = np.asarray(ids)
+        self.parent_index = np.asarray(parent_index, dtype=np.int64)
+        self.monthly_revenue = np.asarray(monthly_revenue, dtype=np.float64)
+        self.depth = self._compute_depth()
+        self._levels = None
+
+    @classmethod
+    def from_records(cls, partners_data):
+        """
+        Будує дерево з ітерованого набору словників як у main.load_partners.
+
+        Поведінка збігається з MLMTree: при дублікатах id партнер лишається
+        на місці першої появи, але з даними останнього запису. Партнери з
+        неіснуючим parent_id вважаються коренями.
+        """
+        position = {}
+        ids, parent_ids, revenues = [], [], []
+        for p in partners_data:
+            pid = p["id"]
+            i = position.get(pid)
+            if i is None:
+                position[pid] = len(ids)
+                ids.append(pid)
+                parent_ids.append(p["parent_id"])
+                revenues.append(p["monthly_revenue"])
+            else:
+                parent_ids[i] = p["parent_id"]
+                revenues[i] = p["monthly_revenue"]
+
+        parent_index = [position.get(parent_id, -1) if parent_id is not None else -1
+                        for parent_id in parent_ids]
+        return cls(ids, parent_index, revenues)
+
+    @classmethod
+    def from_tree(cls, tree):
+        """Конвертує вже побудоване MLMTree в колонкове представлення."""
+        # MLMTree вже тримає ті ж колонки з тією ж нумерацією
+        return cls(tree.ids, tree.parent_index, tree.monthly_revenue)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _compute_depth(self):
+        # Pointer jumping: на кроці k nxt[i] - предок на 2^k рівнів вище
+        # (або корінь), dist[i] - відстань до нього. За log2(N) кроків усі
+        # вузли доходять до кореня; ті, що не дійшли, лежать на циклі.
+        n = len(self.parent_index)
+        has_parent = self.parent_index >= 0
+        dist = has_parent.astype(np.int64)
+        nxt = np.where(has_parent, self.parent_index, np.arange(n))
+
+        for _ in range(n.bit_length() + 1):
+            if not has_parent[nxt].any():
+                return dist
+            dist = dist + dist[nxt]
+            nxt = nxt[nxt]
+
+        stuck = nxt[np.flatnonzero(has_parent[nxt])[0]]
+        raise ValueError(f"Cycle detected at partner {self.ids[stuck]}")
+
+    def levels(self):
+        """
+        Повертає індекси вузлів, впорядковані за глибиною, і межі рівнів.
+
+        Всередині рівня вузли йдуть у вихідному порядку, тобто діти кожного
+        батька - в тому ж порядку, що й Partner.children у MLMTree.
+
+        Returns:
+            tuple: (order, bounds), де вузли глибини d - order[bounds[d]:bounds[d + 1]]
+        """
+        if self._levels is None:
+            order = np.argsort(self.depth, kind="stable")
+            max_depth = int(self.depth.max()) if len(self.depth) else -1
+            bounds = np.searchsorted(self.depth[order], np.arange(max_depth + 2))
+            self._levels = (order, bounds)
+        return self._levels
+
+
+def minor_units(monthly_revenue):
+    """
+    Переводить масив місячних доходів у цілі мінорні одиниці (int64).
+
+    Цілі доходи масштабуються без втрат; дробові переводяться поелементно
+    через to_minor_units, щоб не успадкувати похибку float * 100.
+    """
+    if (np.array_equal(np.floor(monthly_revenue), monthly_revenue)
+            and np.abs(monthly_revenue).max(initial=0) * MINOR_UNITS < 2 ** 53):
+        return monthly_revenue.astype(np.int64) * MINOR_UNITS
+    minor = [to_minor_units(v) for v in monthly_revenue.ravel().tolist()]
+    return np.array(minor, dtype=np.int64).reshape(monthly_revenue.shape)
+
+
+def round_commissions(daily_totals):
+    """
+    Векторна копія core.round_commission, що збігається з нею до біта.
+
+    round_commission округлює HALF_UP найкоротший десятковий запис
+    v = 0.05 * x. Запис не менший за межу k.xx5 тоді і лише тоді, коли
+    v >= найближчого до цієї межі double, а його дає коректно округлене
+    ділення (2k + 1) / 200. Тож досить знайти k з mid(k - 1) <= |v| < mid(k).
+    """
+    v = 0.05 * np.asarray(daily_totals, dtype=np.float64)
+    a = np.abs(v)
+    k = np.floor(a * 100)
+    # a * 100 може похибитись на одиницю в будь-який бік
+    k = np.where(a < (2 * k - 1) / 200, k - 1, k)
+    k = np.where(a >= (2 * k + 1) / 200, k + 1, k)
+    return np.copysign(k / 100, v)
+
+
+def round_commissions_exact(monthly_totals):
+    """Векторна копія core.round_commission_exact для сум у мінорних одиницях."""
+    num, den = 5 * np.abs(monthly_totals), 30 * MINOR_UNITS
+    hundredths = (2 * num + den) // (2 * den)
+    return np.copysign(hundredths / 100, monthly_totals)
+
+
+class VectorizedCommissionCalculator:
+    """
+    Альтернатива CommissionCalculator для ColumnarTree.
+
+    Результат calculate_commissions ідентичний CommissionCalculator, аж до
+    останнього біта float: np.add.at додає внески дітей послідовно, у тому ж
+    порядку (денний дохід дитини, потім сума її піддерева), що й _dfs.
+
+    З fixed_point=True суми рахуються в int64 мінорних одиницях місячного
+    доходу і округлюються векторно, як CommissionCalculator(fixed_point=True).
+    """
+
+    def __init__(self, tree: ColumnarTree, fixed_point=False):
+        self.tree = tree
+        self.fixed_point = fixed_point
+        self.sums = None
+
+    def subtree_sums(self):
+        """
+        Рахує суму денного доходу всіх нащадків для кожного партнера.
+
+        Returns:
+            np.ndarray: Суми в тому ж порядку, що й tree.ids (у fixed_point -
+            місячні суми в мінорних одиницях, int64)
+        """
+        if self.sums is not None:
+            return self.sums
+
+        tree = self.tree
+        revenue = self._contributions()
+        sums = np.zeros(revenue.shape, dtype=revenue.dtype)
+        order, bounds = tree.levels()
+
+        # Рівень d повністю пораховано, коли обробили рівень d + 1. Внесок
+        # дитини і сума її піддерева чергуються, як додавання в _dfs.
+        for d in range(len(bounds) - 2, 0, -1):
+            nodes = order[bounds[d]:bounds[d + 1]]
+            targets = np.repeat(tree.parent_index[nodes], 2)
+            values = np.stack((revenue[nodes], sums[nodes]), axis=1).reshape(-1, *revenue.shape[1:])
+            np.add.at(sums, targets, values)
+
+        self.sums = sums
+        return sums
+
+    def _contributions(self):
+        # Внесок кожного партнера в суму батька: денний дохід або мінорні одиниці
+        if self.fixed_point:
+            return minor_units(self.tree.monthly_revenue)
+        return self.tree.monthly_revenue / 30
+
+    def rounded(self):
+        """Комісії масивом у порядку tree.ids."""
+        sums = self.subtree_sums()
+        return round_commissions_exact(sums) if self.fixed_point else round_commissions(sums)
+
+    @benchmark()
+    def calculate_commissions(self):
+        return dict(zip(map(str, self.tree.ids.tolist()), self.rounded().tolist()))
+
+
+class MultiPeriodCommissionCalculator(VectorizedCommissionCalculator):
+    """
+    Комісії за кілька періодів (днів, місяців) над однією ієрархією.
+
+    Дерево будується і перевіряється на цикли один раз, а проходи по рівнях
+    оброблюють усі періоди разом: замість вектора доходів - матриця
+    партнери x періоди. Для кожного періоду результат ідентичний
+    CommissionCalculator з відповідним monthly_revenue.
+
+    Args:
+        tree (ColumnarTree): Ієрархія (її monthly_revenue не використовується)
+        revenue (np.ndarray): Місячний дохід, рядки в порядку tree.ids, стовпці - періоди
+        periods (list): Назви періодів для виводу
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, tree: ColumnarTree, revenue, periods, fixed_point=False):
+        super().__init__(tree, fixed_point=fixed_point)
+        self.revenue = np.asarray(revenue, dtype=np.float64)
+        self.periods = list(periods)
+        if self.revenue.shape != (len(tree), len(self.periods)):
+            raise ValueError(f"Revenue matrix shape {self.revenue.shape} does not match "
+                             f"{len(tree)} partners x {len(self.periods)} periods")
+
+    def _contributions(self):
+        if self.fixed_point:
+            return minor_units(self.revenue)
+        return self.revenue / 30
+
+    def iter_commissions(self):
+        """Генерує пари (id, {період: комісія}) у порядку tree.ids."""
+        rounded = self.rounded().tolist()
+        for pid, row in zip(self.tree.ids.tolist(), rounded):
+            yield str(pid), dict(zip(self.periods, row))
+
+    @benchmark()
+    def calculate_commissions(self):
+        return dict(self.iter_commissions())
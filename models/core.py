@@ -1,74 +1,581 @@
-from decimal import Decimal, ROUND_HALF_UP
-from utils.benchmark import benchmark
+import math
+from array import array
+from bisect import insort
+from collections.abc import Mapping, Sequence
+from utils.benchmark import benchmark, phase
+from utils.snapshot import open_snapshot
+
+
+# Скільки мінорних одиниць (копійок) в одиниці валюти для режиму fixed_point
+MINOR_UNITS = 100
+
+
+# decimal імпортується при першому округленні, а не при імпорті модуля:
+# короткі запуски main.py не платять за нього, поки не рахують комісії
+_Decimal = None
+
+
+def _load_decimal():
+    global _Decimal, _CENT, _HALF_UP
+    from decimal import Decimal, ROUND_HALF_UP
+    _Decimal, _CENT, _HALF_UP = Decimal, Decimal("0.01"), ROUND_HALF_UP
+
+
+def round_money(amount):
+    # HALF_UP до сотих за найкоротшим десятковим записом float
+    if _Decimal is None:
+        _load_decimal()
+    return float(_Decimal(str(amount)).quantize(_CENT, rounding=_HALF_UP))
+
+
+def round_commission(daily_total):
+    # Те саме, що round_money(0.05 * daily_total), без зайвого виклику на гарячому шляху
+    if _Decimal is None:
+        _load_decimal()
+    return float(_Decimal(str(0.05 * daily_total)).quantize(_CENT, rounding=_HALF_UP))
+
+
+def daily_revenue(monthly_revenue):
+    return monthly_revenue / 30
+
+
+def to_minor_units(monthly_revenue):
+    # Цілі доходи переводяться без Decimal; дробові - через десятковий запис,
+    # щоб 12.34 стало рівно 1234, а не 1233.9999999999998
+    if isinstance(monthly_revenue, int):
+        return monthly_revenue * MINOR_UNITS
+    if _Decimal is None:
+        _load_decimal()
+    minor = _Decimal(str(monthly_revenue)) * MINOR_UNITS
+    if minor != minor.to_integral_value():
+        raise ValueError(f"Revenue {monthly_revenue} is not a whole number of minor units")
+    return int(minor)
+
+
+def round_commission_exact(monthly_total):
+    # 5% від денної суми з округленням HALF_UP до сотих, у цілих числах:
+    # сотих = monthly_total * 5 / (30 * MINOR_UNITS), а floor(a / b + 1/2) = (2a + b) // 2b
+    num, den = 5 * abs(monthly_total), 30 * MINOR_UNITS
+    hundredths = (2 * num + den) // (2 * den)
+    return math.copysign(hundredths / 100, monthly_total)
 
 
 class Partner:
-    def __init__(self, id, parent_id, monthly_revenue):
-        self.id = id
-        self.parent_id = parent_id
-        self.monthly_revenue = monthly_revenue
-        self.children = []
+    # Легке представлення рядка дерева: всі дані лежать у колонках MLMTree,
+    # а сам об'єкт тримає лише посилання на дерево та індекс
+    __slots__ = ("_tree", "index")
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self.index = index
+
+    @property
+    def id(self):
+        return self._tree.ids[self.index]
+
+    @property
+    def parent_id(self):
+        return self._tree._parent_id(self.index)
+
+    @property
+    def monthly_revenue(self):
+        return self._tree.monthly_revenue[self.index]
+
+    @monthly_revenue.setter
+    def monthly_revenue(self, value):
+        self._tree._make_writable()
+        self._tree.monthly_revenue[self.index] = value
+
+    @property
+    def children(self):
+        return [Partner(self._tree, c) for c in self._tree._children(self.index)]
 
     def daily_revenue(self):
-        return self.monthly_revenue / 30
+        return daily_revenue(self.monthly_revenue)
+
+    def __eq__(self, other):
+        return isinstance(other, Partner) and self._tree is other._tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self._tree), self.index))
+
+    def __repr__(self):
+        return f"Partner(id={self.id!r}, parent_id={self.parent_id!r}, monthly_revenue={self.monthly_revenue!r})"
+
+
+class PartnerView(Mapping):
+    # Словникоподібний доступ tree.partners[id] без окремого об'єкта на партнера
+
+    def __init__(self, tree):
+        self._tree = tree
+
+    def __getitem__(self, partner_id):
+        return Partner(self._tree, self._tree.index[partner_id])
+
+    def __contains__(self, partner_id):
+        return partner_id in self._tree.index
+
+    def __iter__(self):
+        return iter(self._tree.ids)
+
+    def __len__(self):
+        return len(self._tree.ids)
+
+
+class PartnerSequence(Sequence):
+    def __init__(self, tree, indices):
+        self._tree = tree
+        self._indices = indices
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PartnerSequence(self._tree, self._indices[i])
+        return Partner(self._tree, self._indices[i])
+
+    def __len__(self):
+        return len(self._indices)
 
 
 class MLMTree:
     def __init__(self, partners_data):
-        self.partners = self._build_partners(partners_data)
-        self._build_tree()
-        self._check_for_cycles()
+        self._snapshot = None
+        # Дані часто надходять потоком, тож build включає і їх читання
+        with phase("build") as event:
+            self._build_partners(partners_data)
+            self._build_tree()
+            event["partners"] = len(self.ids)
+        self._order = self._check_for_cycles()
+        self.partners = PartnerView(self)
+
+    @classmethod
+    def from_columns(cls, ids, parent_ids, monthly_revenue):
+        """
+        Будує дерево з уже розібраних колонок (наприклад з utils.shards).
+
+        Результат такий самий, як MLMTree з відповідних словників, але без
+        створення словника на кожного партнера.
+        """
+        tree = cls.__new__(cls)
+        tree._snapshot = None
+        with phase("build") as event:
+            tree._build_columns(ids, parent_ids, monthly_revenue)
+            tree._build_tree()
+            event["partners"] = len(tree.ids)
+        tree._order = tree._check_for_cycles()
+        tree.partners = PartnerView(tree)
+        return tree
+
+    @classmethod
+    def from_snapshot(cls, path):
+        # Колонки лишаються memoryview на mmap знімка, без розбору і копіювання.
+        # Перша зміна дерева копіює їх у звичайні списки (_make_writable).
+        with phase("snapshot_open") as event:
+            columns = open_snapshot(path)
+            event["partners"] = len(columns["ids"])
+        tree = cls.__new__(cls)
+        tree._snapshot = columns["mmap"]
+        tree.ids = columns["ids"]
+        tree._index = None
+        tree.monthly_revenue = columns["monthly_revenue"]
+        tree.parent_index = columns["parent_index"]
+        tree._orphan_parent = columns["orphans"]
+        tree._orphans = {}
+        for i, parent_id in tree._orphan_parent.items():
+            tree._orphans.setdefault(parent_id, []).append(i)
+        tree._csr = (columns["offsets"], columns["child_index"])
+        tree._csr_patch = {}
+        tree._order = columns["order"]
+        tree.partners = PartnerView(tree)
+        return tree
+
+    @property
+    def index(self):
+        # Для знімка словник id -> індекс будується лише при першому пошуку
+        if self._index is None:
+            self._index = dict(zip(self.ids, range(len(self.ids))))
+        return self._index
+
+    def _make_writable(self):
+        if self._snapshot is None:
+            return
+        self.ids = self.ids.tolist()
+        self.monthly_revenue = self.monthly_revenue.tolist()
+        self.parent_index = array("q", self.parent_index)
+        offsets, child_index = self._csr
+        self._csr = (array("q", offsets), array("q", child_index))
+        self._order = array("q", self._order)
+        self._snapshot = None
+
+    @property
+    def order(self):
+        return PartnerSequence(self, self.order_index)
+
+    @property
+    def order_index(self):
+        # Після структурних змін порядок перебудовується при першому зверненні
+        if self._order is None:
+            self._order = self._check_for_cycles()
+        return self._order
 
     def _build_partners(self, data):
-        return {p["id"]: Partner(p["id"], p["parent_id"], p["monthly_revenue"]) for p in data}
+        # Ідентифікатори перенумеровуються в щільні індекси 0..N-1. При
+        # дублікатах партнер лишається на місці першої появи з даними останнього.
+        self.ids = []
+        self._index = {}
+        self.monthly_revenue = []
+        self._raw_parent_ids = []
+        for p in data:
+            i = self._index.get(p["id"])
+            if i is None:
+                self._index[p["id"]] = len(self.ids)
+                self.ids.append(p["id"])
+                self._raw_parent_ids.append(p["parent_id"])
+                self.monthly_revenue.append(p["monthly_revenue"])
+            else:
+                self._raw_parent_ids[i] = p["parent_id"]
+                self.monthly_revenue[i] = p["monthly_revenue"]
+
+    def _build_columns(self, ids, parent_ids, monthly_revenue):
+        self._index = dict(zip(ids, range(len(ids))))
+        if len(self._index) < len(ids):
+            # Є дублікати - розв'язуємо їх так само, як для словників
+            self._build_partners({"id": pid, "parent_id": parent_id, "monthly_revenue": revenue}
+                                 for pid, parent_id, revenue in zip(ids, parent_ids, monthly_revenue))
+            return
+        self.ids = list(ids)
+        self._raw_parent_ids = list(parent_ids)
+        self.monthly_revenue = list(monthly_revenue)
 
     def _build_tree(self):
-        for partner in self.partners.values():
-            if partner.parent_id is not None:
-                parent = self.partners.get(partner.parent_id)
-                if parent:
-                    parent.children.append(partner)
+        # Партнери з неіснуючим батьком стають коренями (parent_index = -1), але
+        # запам'ятовуються, щоб приєднати їх, якщо батько з'явиться через add_partner
+        self.parent_index = array("q")
+        self._orphans = {}
+        self._orphan_parent = {}
+        for i, parent_id in enumerate(self._raw_parent_ids):
+            p = self.index.get(parent_id, -1) if parent_id is not None else -1
+            self.parent_index.append(p)
+            if p < 0 and parent_id is not None:
+                self._orphans.setdefault(parent_id, []).append(i)
+                self._orphan_parent[i] = parent_id
+        del self._raw_parent_ids
+        self._csr = None
+        self._csr_patch = {}
+
+    def csr(self):
+        # Діти у форматі CSR: діти вузла i - child_index[offsets[i]:offsets[i + 1]],
+        # у порядку індексів. Зміни після побудови лежать у _csr_patch і
+        # зливаються сюди перебудовою лише тоді, коли CSR потрібен цілком.
+        if self._csr is None or self._csr_patch:
+            self._csr = self._build_csr()
+            self._csr_patch = {}
+        return self._csr
+
+    def _build_csr(self):
+        # Один прохід сортування підрахунком, O(N)
+        n = len(self.ids)
+        offsets = array("q", bytes(8 * (n + 1)))
+        for p in self.parent_index:
+            if p >= 0:
+                offsets[p + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        child_index = array("q", bytes(8 * offsets[n]))
+        cursor = offsets[:n]
+        for i, p in enumerate(self.parent_index):
+            if p >= 0:
+                child_index[cursor[p]] = i
+                cursor[p] += 1
+        return offsets, child_index
+
+    def _children(self, i):
+        # Діти одного вузла без перебудови CSR: вузли, чиї діти змінились після
+        # побудови, беруться з _csr_patch, решта - з побудованого CSR. Нові
+        # вузли за межами CSR без запису в _csr_patch дітей не мають.
+        children = self._csr_patch.get(i)
+        if children is not None:
+            return children
+        if self._csr is None:
+            self.csr()
+        offsets, child_index = self._csr
+        if i + 1 < len(offsets):
+            return child_index[offsets[i]:offsets[i + 1]]
+        return ()
 
+    def _patch_children(self, i, add=(), remove=None):
+        # Змінює список дітей вузла i в _csr_patch за O(кількість дітей),
+        # зберігаючи порядок індексів. Якщо CSR ще не побудований, його
+        # однаково збудують з parent_index.
+        if self._csr is None:
+            return
+        children = [c for c in self._children(i) if c != remove]
+        for c in add:
+            insort(children, c)
+        self._csr_patch[i] = children
+
+    def _parent_id(self, i):
+        p = self.parent_index[i]
+        return self.ids[p] if p >= 0 else self._orphan_parent.get(i)
+
+    def _set_parent(self, i, parent_id):
+        self._make_writable()
+        old_p = self.parent_index[i]
+        old = self._orphan_parent.pop(i, None)
+        if old is not None:
+            self._orphans[old].remove(i)
+            if not self._orphans[old]:
+                del self._orphans[old]
+
+        p = self.index.get(parent_id, -1) if parent_id is not None else -1
+        if p < 0 and parent_id is not None:
+            self._orphans.setdefault(parent_id, []).append(i)
+            self._orphan_parent[i] = parent_id
+        self.parent_index[i] = p
+        if old_p != p:
+            if old_p >= 0:
+                self._patch_children(old_p, remove=i)
+            if p >= 0:
+                self._patch_children(p, add=(i,))
+        self._order = None
+
+    def _check_new_parent(self, partner_id, parent_id):
+        # Цикл з'являється лише тоді, коли partner_id є предком нового батька,
+        # тож достатньо піднятися від батька до кореня - O(глибина)
+        pid = parent_id
+        while pid is not None and pid != partner_id and pid in self.index:
+            pid = self._parent_id(self.index[pid])
+        if pid == partner_id:
+            raise ValueError(f"Cycle detected at partner {partner_id}")
+
+    def add_partner(self, partner_id, parent_id, monthly_revenue):
+        if partner_id in self.index:
+            raise ValueError(f"Partner {partner_id} already exists")
+        self._check_new_parent(partner_id, parent_id)
+        self._make_writable()
+
+        i = len(self.ids)
+        self.index[partner_id] = i
+        self.ids.append(partner_id)
+        self.monthly_revenue.append(monthly_revenue)
+        self.parent_index.append(-1)
+        orphans = self._orphans.pop(partner_id, [])
+        for orphan in orphans:
+            del self._orphan_parent[orphan]
+            self.parent_index[orphan] = i
+        if orphans:
+            self._patch_children(i, add=orphans)
+        self._set_parent(i, parent_id)
+        return Partner(self, i)
+
+    def move_partner(self, partner_id, new_parent_id):
+        i = self.index[partner_id]
+        self._check_new_parent(partner_id, new_parent_id)
+        self._set_parent(i, new_parent_id)
+        return Partner(self, i)
+
+    @benchmark("cycle_check")
     def _check_for_cycles(self):
-        visited = set()
-        rec_stack = set()
+        # Обхід у ширину від коренів без рекурсії. Кожен партнер має рівно
+        # одного батька, тому вузли, недосяжні з коренів, лежать на циклі
+        # або під ним. Отриманий порядок (батьки раніше за дітей)
+        # калькулятор використовує для розрахунку знизу вгору.
+        offsets, child_index = self.csr()
+        order = array("q", (i for i, p in enumerate(self.parent_index) if p < 0))
+        head = 0
+        while head < len(order):
+            i = order[head]
+            order.extend(child_index[offsets[i]:offsets[i + 1]])
+            head += 1
+
+        if len(order) != len(self.ids):
+            reached = bytearray(len(self.ids))
+            for i in order:
+                reached[i] = 1
+            i = reached.index(0)
+            seen = set()
+            # Піднімаємось по батьках, доки не повернемось у вже бачений вузол
+            while i not in seen:
+                seen.add(i)
+                i = self.parent_index[i]
+            raise ValueError(f"Cycle detected at partner {self.ids[i]}")
 
-        def dfs(partner_id):
-            visited.add(partner_id)
-            rec_stack.add(partner_id)
-            for child in self.partners[partner_id].children:
-                if child.id not in visited:
-                    dfs(child.id)
-                elif child.id in rec_stack:
-                    raise ValueError(f"Cycle detected at partner {child.id}")
-            rec_stack.remove(partner_id)
+        return order
 
-        for pid in self.partners:
-            if pid not in visited:
-                dfs(pid)
+
+def _same(value):
+    return value
 
 
 class CommissionCalculator:
-    def __init__(self, tree: MLMTree):
+    def __init__(self, tree: MLMTree, fixed_point=False):
+        # У режимі fixed_point memo зберігає місячні суми в цілих мінорних
+        # одиницях, а ділення на 30, 5% і округлення робляться один раз в кінці
         self.tree = tree
+        self.fixed_point = fixed_point
         self.memo = {}
+        self.commissions = None
+        if fixed_point:
+            self._contribution = to_minor_units
+            self._round = round_commission_exact
+        else:
+            self._contribution = daily_revenue
+            self._round = round_commission
 
     @benchmark()
     def calculate_commissions(self):
-        result = {}
-        for pid, partner in self.tree.partners.items():
-            commission = Decimal(str(0.05 * self._dfs(partner))).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            result[str(pid)] = float(commission)
+        result = dict(self.iter_commissions())
+        self.commissions = result
         return result
 
-    def _dfs(self, partner: Partner):
-        if partner.id in self.memo:
-            return self.memo[partner.id]
+    def iter_commissions(self, str_ids=True):
+        # str_ids=False віддає id як є, без рядка на кожного партнера
+        totals = self._fill()
+        ids = map(str, self.tree.ids) if str_ids else self.tree.ids
+        yield from zip(ids, map(self._round, totals))
+
+    def iter_commissions_for(self, partner_ids, str_ids=True):
+        """
+        Комісії лише вибраних партнерів без обходу всього дерева.
+
+        Обходяться тільки піддерева цих партнерів; спільні частини піддерев
+        рахуються один раз завдяки memo. Комісії ідентичні calculate_commissions.
+
+        Args:
+            partner_ids (Iterable): Id партнерів
+            str_ids (bool): Віддавати id рядками, як calculate_commissions
+
+        Yields:
+            tuple: (id, комісія) у порядку partner_ids
+        """
+        partners = self.tree.partners
+        key = str if str_ids else _same
+        for pid in partner_ids:
+            yield key(pid), self._round(self._dfs(partners[pid]))
+
+    def subtree_totals(self):
+        """
+        Неокруглені суми нащадків у порядку tree.ids.
+
+        Комісія - неспадна функція суми (round_commission і
+        round_commission_exact), тож звіти (models/reporting.py) вибирають
+        партнерів за сумами і округлюють лише вибраних.
+        """
+        return self._fill()
+
+    def _fill(self):
+        # Знизу вгору по order_index: коли доходимо до вузла, суми його дітей
+        # уже пораховані. Прохід іде по цілих індексах і зрізах CSR, без
+        # Partner на кожен вузол. Суми, що вже є в memo (після оновлень чи
+        # iter_commissions_for), актуальні і не перераховуються.
+        tree = self.tree
+        ids = tree.ids
+        revenue = tree.monthly_revenue
+        contribution = self._contribution
+        offsets, child_index = tree.csr()
+        memo = self.memo
+        known = memo.get if memo else None
+        totals = [0] * len(ids)
+        for i in reversed(tree.order_index):
+            total = known(ids[i]) if known else None
+            if total is None:
+                total = 0
+                for c in child_index[offsets[i]:offsets[i + 1]]:
+                    total += contribution(revenue[c])
+                    total += totals[c]
+            totals[i] = total
+        memo.update(zip(ids, totals))
+        return totals
+
+    def update_revenue(self, partner_id, monthly_revenue):
+        partner = self.tree.partners[partner_id]
+        delta = self._contribution(monthly_revenue) - self._contribution(partner.monthly_revenue)
+        partner.monthly_revenue = monthly_revenue
+        self._propagate(partner.parent_id, delta)
+
+    def add_partner(self, partner_id, parent_id, monthly_revenue):
+        partner = self.tree.add_partner(partner_id, parent_id, monthly_revenue)
+        if self.commissions is not None:
+            self.commissions[str(partner_id)] = self._round(self._dfs(partner))
+        if parent_id in self.memo:
+            self._propagate(parent_id, self._contribution(monthly_revenue) + self._dfs(partner))
+        return partner
+
+    def move_partner(self, partner_id, new_parent_id):
+        partner = self.tree.partners[partner_id]
+        old_parent_id = partner.parent_id
+        self.tree._check_new_parent(partner_id, new_parent_id)
 
         total = 0
-        for child in partner.children:
-            total += child.daily_revenue()
-            total += self._dfs(child)
+        if old_parent_id in self.memo or new_parent_id in self.memo:
+            total = self._contribution(partner.monthly_revenue) + self._dfs(partner)
+
+        # Спершу переносимо, щоб старий батько перераховувався вже без партнера.
+        # Предки старого батька від переносу не змінюються: новий батько не
+        # може лежати в піддереві партнера
+        self.tree.move_partner(partner_id, new_parent_id)
+        self._propagate(old_parent_id, -total)
+        self._propagate(new_parent_id, total)
+        return partner
+
+    def _propagate(self, partner_id, delta):
+        # Зміна в піддереві змінює лише суми предків. Якщо предка немає в
+        # memo, то і його предків там немає - їх порахують з нуля пізніше.
+        # Вузол у memo означає, що й усі його нащадки там.
+        #
+        # Цілі суми fixed_point точні, тож досить додати різницю. Сума float
+        # залежить від порядку додавань, і memo[p] + delta може розійтися з
+        # повним розрахунком в останньому біті, а з ним і округлена комісія.
+        # Тому в float сума предка перераховується з дітей у тому ж порядку,
+        # що й у _fill, як у models/cache.py.
+        memo = self.memo
+        tree = self.tree
+        ids = tree.ids
+        revenue = tree.monthly_revenue
+        contribution = self._contribution
+        while partner_id in memo:
+            i = tree.index[partner_id]
+            if self.fixed_point:
+                memo[partner_id] += delta
+            else:
+                total = 0
+                for c in tree._children(i):
+                    total += contribution(revenue[c])
+                    total += memo[ids[c]]
+                memo[partner_id] = total
+            if self.commissions is not None:
+                self.commissions[str(partner_id)] = self._round(memo[partner_id])
+            partner_id = tree._parent_id(i)
+
+    def _dfs(self, partner: Partner):
+        memo = self.memo
+        if partner.id in memo:
+            return memo[partner.id]
+
+        ids = self.tree.ids
+        revenue = self.tree.monthly_revenue
+        contribution = self._contribution
+        # Діти через _children, а не csr(): після add_partner чи move_partner
+        # обхід піддерева не перебудовує CSR всього дерева
+        children_of = self.tree._children
+
+        # Post-order обхід з явним стеком замість рекурсії: вузол
+        # рахується вдруге, коли всі його діти вже є в memo
+        stack = [(partner.index, False)]
+        while stack:
+            i, expanded = stack.pop()
+            if ids[i] in memo:
+                continue
+            children = children_of(i)
+            if not expanded:
+                stack.append((i, True))
+                stack.extend((c, False) for c in children if ids[c] not in memo)
+                continue
+
+            total = 0
+            for c in children:
+                total += contribution(revenue[c])
+                total += memo[ids[c]]
+            memo[ids[i]] = total
 
-        self.memo[partner.id] = total
-        return total
+        return memo[partner.id]
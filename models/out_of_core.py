@@ -0,0 +1,292 @@
+"""
+Розрахунок комісій для дерев, більших за оперативну пам'ять.
+
+Дерево ніколи не тримається в пам'яті цілком: усі проміжні дані - файли
+кортежів, відсортовані зовнішнім сортуванням (utils/external.py), а кожен
+крок - злиття двох відсортованих потоків. Кроки:
+
+1. Записи сортуються за id: дублікати зливаються як у MLMTree (місце першої
+   появи, дані останнього запису), номер першої появи стає позицією вузла.
+2. Записи сортуються за parent_id і зливаються зі списком id, щоб знайти
+   позицію батька. Партнери з неіснуючим батьком стають коренями. Результат -
+   файл ребер (батько, дитина), відсортований за позицією батька.
+3. Глибина кожного вузла подвоєнням вказівників (list ranking): за раунд
+   вузол стрибає до предка свого предка, раунд - два сортування і злиття.
+   Вузли, що не дійшли до кореня за N кроків, лежать на циклі чи під ним.
+4. Вузли з доходом сортуються від найглибшого рівня до коренів. На кожному
+   рівні внески дітей групуються за батьком у порядку позицій, що дає ті
+   самі додавання float, що й CommissionCalculator._dfs.
+5. Комісії сортуються за позицією і віддаються потоком.
+
+Пам'ять обмежена бюджетом max_memory незалежно від розміру дерева. Глибини
+коштують O(log глибини) проходів сортування і злиття по N вузлах, тож і
+ланцюжки в мільйони рівнів не потребують мільйонів проходів. Крок 4 читає
+вузли одним сортуванням за глибиною.
+"""
+
+import os
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+
+from models.core import daily_revenue, round_commission, round_commission_exact, to_minor_units
+from utils.benchmark import phase
+from utils.external import ITEM_BYTES, MIN_ITEMS, ExternalSorter, read_items, write_items
+
+# Одночасно активні: два сортувальники, блоки злиття і запас на решту
+_BUDGET_SHARES = 4
+
+# З меншим бюджетом ExternalSorter усе одно тримав би MIN_ITEMS записів
+# і мовчки виходив за бюджет
+MIN_MEMORY = _BUDGET_SHARES * ITEM_BYTES * MIN_ITEMS
+
+
+def parse_size(text):
+    """
+    Розбирає розмір пам'яті: 512M, 2G, 64K або число байтів.
+
+    Raises:
+        ValueError: Якщо рядок не є розміром
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _id_key(value):
+    # Ключ, за яким можна порівнювати id різних типів між собою
+    if type(value) is int:
+        return 0, value
+    if type(value) is str:
+        return 1, value
+    return 2, repr(value)
+
+
+_first = itemgetter(0)
+_first_two = itemgetter(0, 1)
+
+# Ключ батька для коренів: менший за ключ будь-якого id, тож ніколи не знаходиться
+_ROOT = (-1,)
+
+
+def _deepest_first(node):
+    return -node[0], node[1]
+
+
+class OutOfCoreCommissionCalculator:
+    """
+    Комісії з потоку записів з обмеженою пам'яттю.
+
+    Результат той самий, що в CommissionCalculator на тих самих записах,
+    до останнього біта float.
+
+    Args:
+        records (Iterable): Словники партнерів (наприклад iter_partners)
+        max_memory (int): Бюджет пам'яті в байтах для проміжних даних
+        directory (str | None): Де створювати тимчасові файли
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+
+    Raises:
+        ValueError: Якщо max_memory менший за MIN_MEMORY
+    """
+
+    def __init__(self, records, max_memory, directory=None, fixed_point=False):
+        if max_memory < MIN_MEMORY:
+            raise ValueError(f"max_memory of {max_memory} bytes is below the minimum of {MIN_MEMORY} bytes")
+        self.records = records
+        self.max_memory = max_memory
+        self.directory = directory
+        self.fixed_point = fixed_point
+        # Записів в одному буфері сортування
+        self.max_items = max_memory // (_BUDGET_SHARES * ITEM_BYTES)
+        self.partners = 0
+        self.depth = 0
+
+    def _sorter(self, key):
+        return ExternalSorter(self._tmp, self.max_items, key)
+
+    def _file(self, name):
+        return os.path.join(self._tmp, name)
+
+    def _dedupe(self):
+        # Крок 1: (ключ id, номер запису, id, parent_id, дохід), відсортовані за
+        # ключем. Сортування стабільне, тож у групі першим іде перший запис.
+        by_id = self._sorter(_first)
+        for seq, p in enumerate(self.records):
+            by_id.add((_id_key(p["id"]), seq, p["id"], p["parent_id"], p["monthly_revenue"]))
+
+        group = None
+        for key, seq, pid, parent_id, revenue in by_id:
+            if group is not None and group[0] == key:
+                group = (key, group[1], pid, parent_id, revenue)
+                continue
+            if group is not None:
+                yield group
+            group = (key, seq, pid, parent_id, revenue)
+        if group is not None:
+            yield group
+
+    def _edges(self):
+        # Крок 2: nodes.bin - (позиція, id, дохід) за позицією,
+        # edges.bin - (позиція батька, позиція) за батьком, корені з батьком -1
+        ids_path = self._file("ids.bin")
+        by_parent = self._sorter(_first_two)
+        nodes = self._sorter(_first)
+
+        def positions():
+            for key, pos, pid, parent_id, revenue in self._dedupe():
+                self.partners += 1
+                by_parent.add((_ROOT if parent_id is None else _id_key(parent_id), pos))
+                nodes.add((pos, pid, revenue))
+                yield key, pos
+
+        write_items(ids_path, positions(), self.max_items)
+        write_items(self._file("nodes.bin"), nodes, self.max_items)
+
+        edges = self._sorter(_first_two)
+        ids = read_items(ids_path)
+        current = next(ids, None)
+        for parent_key, pos in by_parent:
+            while current is not None and current[0] < parent_key:
+                current = next(ids, None)
+            edges.add((current[1] if current is not None and current[0] == parent_key else -1, pos))
+        ids.close()
+        os.remove(ids_path)
+
+        edges_path = self._file("edges.bin")
+        write_items(edges_path, edges, self.max_items)
+        return edges_path
+
+    def _depths(self, edges_path):
+        # Крок 3: state.bin - (позиція, батько, предок, відстань до предка) за
+        # позицією. Спершу предок - батько на відстані 1, у коренів -1 на
+        # відстані 0. За раунд кожен вузол, чий предок ще не -1, стрибає до
+        # предка свого предка і додає його відстань: після k раундів предок
+        # 2^k-й, а вузли, що дійшли до кореня, мають відстань, рівну глибині.
+        # Раунд - злиття активних вузлів, відсортованих за предком, зі
+        # state.bin і сортування стрибків назад за позицією, тож проходів
+        # log2(глибина) + 1.
+        by_pos = self._sorter(_first)
+        by_pos.extend((pos, parent, parent, 0 if parent < 0 else 1) for parent, pos in read_items(edges_path))
+        state_path = self._file("state.bin")
+        write_items(state_path, by_pos, self.max_items)
+        # edges.bin уже відсортований за батьком, тобто за предком першого раунду
+        by_ancestor = ((parent, pos, 1) for parent, pos in read_items(edges_path) if parent >= 0)
+
+        step = 0
+        while True:
+            jumped = self._sorter(_first)
+            state = read_items(state_path)
+            current = None
+            active = left = reach = 0
+            for ancestor, pos, distance in by_ancestor:
+                while current is None or current[0] < ancestor:
+                    current = next(state)
+                jumped.add((pos, current[2], distance + current[3]))
+                active += 1
+                if current[2] >= 0:
+                    left += 1
+                    reach = distance + current[3]
+            state.close()
+            if not active:
+                break
+            # Шлях до кореня коротший за кількість партнерів, тож вузли, що
+            # стрибнули так далеко і не дійшли, лежать на циклі чи під ним
+            if reach >= self.partners:
+                raise ValueError(f"Cycle detected: {left} partners are not reachable from any root")
+
+            # jumped за позицією містить рівно активні вузли state.bin; ті, що
+            # лишились активними, одразу йдуть у сортування наступного раунду
+            by_ancestor = self._sorter(_first)
+
+            def merged(state_path=state_path, updates=iter(jumped), by_ancestor=by_ancestor):
+                for node in read_items(state_path):
+                    if node[2] >= 0:
+                        node = (node[0], node[1], *next(updates)[1:])
+                        if node[2] >= 0:
+                            by_ancestor.add((node[2], node[0], node[3]))
+                    yield node
+
+            next_path = self._file(f"state-{step}.bin")
+            write_items(next_path, merged(), self.max_items)
+            os.remove(state_path)
+            state_path = next_path
+            step += 1
+
+        os.remove(edges_path)
+        depth = max((distance for _, _, _, distance in read_items(state_path)), default=-1)
+        return state_path, depth
+
+    def _order(self, state_path):
+        # Вузли з даними у порядку обробки: від найглибшого рівня, за позицією
+        ordered = self._sorter(_deepest_first)
+        nodes_path = self._file("nodes.bin")
+        for (pos, parent, _, depth), (_, pid, revenue) in zip(read_items(state_path), read_items(nodes_path)):
+            ordered.add((depth, pos, parent, pid, revenue))
+        os.remove(state_path)
+        os.remove(nodes_path)
+        return ordered
+
+    def _aggregate(self, ordered):
+        # Крок 4: суми нащадків рівень за рівнем від найглибшого до коренів
+        if self.fixed_point:
+            contribution, round_ = to_minor_units, round_commission_exact
+        else:
+            contribution, round_ = daily_revenue, round_commission
+        results = self._sorter(_first)
+        totals_path = None
+
+        for level, nodes in groupby(ordered, key=_first):
+            totals = read_items(totals_path) if totals_path else None
+            current = next(totals, None) if totals else None
+            by_parent = self._sorter(_first_two)
+            for _, pos, parent, pid, revenue in nodes:
+                total = 0
+                if current is not None and current[0] == pos:
+                    total = current[1]
+                    current = next(totals, None)
+                results.add((pos, pid, round_(total)))
+                if level:
+                    by_parent.add((parent, pos, contribution(revenue), total))
+            if totals:
+                totals.close()
+                os.remove(totals_path)
+
+            # Порядок додавань як у _dfs: внесок дитини, потім її сума, діти за позицією
+            def parent_totals():
+                parent, total = None, 0
+                for child_parent, _, child_contribution, child_total in by_parent:
+                    if child_parent != parent:
+                        if parent is not None:
+                            yield parent, total
+                        parent, total = child_parent, 0
+                    total += child_contribution
+                    total += child_total
+                if parent is not None:
+                    yield parent, total
+
+            totals_path = self._file(f"totals-{level - 1}.bin") if level else None
+            if totals_path:
+                write_items(totals_path, parent_totals(), self.max_items)
+
+        return results
+
+    def iter_commissions(self):
+        """Генерує пари (str id, комісія) у порядку першої появи id у вході."""
+        with tempfile.TemporaryDirectory(prefix="mlm-ooc-", dir=self.directory) as tmp:
+            self._tmp = tmp
+            with phase("ooc_sort") as event:
+                edges_path = self._edges()
+                event["partners"] = self.partners
+            with phase("ooc_levels") as event:
+                state_path, self.depth = self._depths(edges_path)
+                event["depth"] = self.depth
+            with phase("ooc_aggregate"):
+                results = self._aggregate(self._order(state_path))
+            for _, pid, commission in results:
+                yield str(pid), commission
+
+    def calculate_commissions(self):
+        return dict(self.iter_commissions())
@@ -0,0 +1,183 @@
+"""
+Паралельний розрахунок комісій на кількох ядрах.
+
+Ліс розрізається на незалежні піддерева нижче зрізу. Їх суми рахуються в
+ProcessPoolExecutor над спільною пам'яттю (RawArray): кожен процес пише
+лише у свої вузли. Після цього головний процес досумовує вузли над зрізом.
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import RawArray
+
+import numpy as np
+
+from models.columnar import ColumnarTree, minor_units
+from models.core import MLMTree, daily_revenue, round_commission, round_commission_exact
+from utils.benchmark import benchmark
+
+# На скільки задач ділиться робота на кожен процес: більше задач - краще
+# балансування, коли піддерева різного розміру
+CHUNKS_PER_WORKER = 8
+
+# Масиви процесу-воркера, підключені один раз в _init_worker
+_shared = None
+
+
+def _views(arrays, fixed_point):
+    offsets, child_index, revenue, sums, commissions = (memoryview(a).cast("B") for a in arrays)
+    value = "q" if fixed_point else "d"
+    return offsets.cast("q"), child_index.cast("q"), revenue.cast(value), sums.cast(value), commissions.cast("d")
+
+
+def _init_worker(arrays, fixed_point):
+    global _shared
+    _shared = (_views(arrays, fixed_point), fixed_point)
+
+
+def _accumulate(nodes, views, fixed_point):
+    # Ті самі додавання в тому ж порядку, що й CommissionCalculator._dfs,
+    # тому результат збігається до біта. nodes - діти раніше за батьків.
+    offsets, child_index, revenue, sums, commissions = views
+    contribution = (lambda v: v) if fixed_point else daily_revenue
+    round_ = round_commission_exact if fixed_point else round_commission
+    for i in nodes:
+        total = 0
+        for c in child_index[offsets[i]:offsets[i + 1]]:
+            total += contribution(revenue[c])
+            total += sums[c]
+        sums[i] = total
+        commissions[i] = round_(total)
+
+
+def _compute_subtrees(roots):
+    views, fixed_point = _shared
+    offsets, child_index = views[0], views[1]
+    for root in roots:
+        # Обхід у ширину дає батьків раніше за дітей; у зворотному порядку
+        # кожен вузол рахується після всіх своїх дітей
+        order = [root]
+        head = 0
+        while head < len(order):
+            i = order[head]
+            order.extend(child_index[offsets[i]:offsets[i + 1]])
+            head += 1
+        _accumulate(reversed(order), views, fixed_point)
+    return len(roots)
+
+
+class ParallelCommissionCalculator:
+    """
+    Багатопроцесна альтернатива CommissionCalculator для MLMTree.
+
+    Результат calculate_commissions ідентичний CommissionCalculator з тим
+    самим fixed_point. Довгий ланцюжок над max_cut_depth не ділиться і
+    рахується однією задачею.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        workers (int | None): Кількість процесів, за замовчуванням os.cpu_count()
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+        max_cut_depth (int): Найбільша глибина, на якій піддерево ще ділиться
+    """
+
+    def __init__(self, tree: MLMTree, workers=None, fixed_point=False, max_cut_depth=64):
+        self.tree = tree
+        self.workers = workers or os.cpu_count() or 1
+        self.fixed_point = fixed_point
+        self.max_cut_depth = max_cut_depth
+        self.sums = None
+        self._commissions = None
+
+    def _partition(self, columnar):
+        """
+        Розрізає ліс на піддерева для процесів.
+
+        Найбільше піддерево розкривається (його корінь іде над зріз, діти -
+        у чергу), доки воно більше за частку однієї задачі.
+
+        Returns:
+            tuple: (tasks, above) - списки коренів піддерев для кожної задачі
+            і вузли над зрізом, діти раніше за батьків
+        """
+        n = len(columnar)
+        order, bounds = columnar.levels()
+        sizes = np.ones(n, dtype=np.int64)
+        for d in range(len(bounds) - 2, 0, -1):
+            nodes = order[bounds[d]:bounds[d + 1]]
+            np.add.at(sizes, columnar.parent_index[nodes], sizes[nodes])
+
+        offsets, child_index = self.tree.csr()
+        sizes_list = sizes.tolist()
+        depth = columnar.depth
+        task_count = self.workers * CHUNKS_PER_WORKER
+        threshold = max(1, n // task_count)
+
+        heap = [(-sizes_list[r], r) for r in order[:bounds[1]].tolist()]
+        heapq.heapify(heap)
+        above = []
+        while heap and -heap[0][0] > threshold and depth[heap[0][1]] < self.max_cut_depth:
+            _, i = heapq.heappop(heap)
+            above.append(i)
+            for c in child_index[offsets[i]:offsets[i + 1]]:
+                heapq.heappush(heap, (-sizes_list[c], c))
+
+        # Жадібне пакування: найбільше піддерево - в найменш завантажену задачу
+        bins = [(0, t, []) for t in range(min(task_count, len(heap)))]
+        for neg_size, root in sorted(heap):
+            load, t, roots = heapq.heappop(bins)
+            roots.append(root)
+            heapq.heappush(bins, (load - neg_size, t, roots))
+
+        above.sort(key=lambda i: depth[i], reverse=True)
+        return [roots for _, _, roots in bins], above
+
+    def subtree_sums(self):
+        """
+        Рахує суми піддерев і комісії паралельно.
+
+        Returns:
+            np.ndarray: Суми в порядку tree.ids (у fixed_point - місячні суми
+            в мінорних одиницях, int64)
+        """
+        if self.sums is not None:
+            return self.sums
+
+        tree = self.tree
+        n = len(tree.ids)
+        if n == 0:
+            self.sums = np.zeros(0, dtype=np.int64 if self.fixed_point else np.float64)
+            self._commissions = []
+            return self.sums
+
+        columnar = ColumnarTree.from_tree(tree)
+        offsets, child_index = tree.csr()
+        value = "q" if self.fixed_point else "d"
+        if self.fixed_point:
+            revenue = minor_units(columnar.monthly_revenue)
+        else:
+            revenue = columnar.monthly_revenue
+
+        arrays = (RawArray("q", len(offsets)), RawArray("q", max(1, len(child_index))),
+                  RawArray(value, n), RawArray(value, n), RawArray("d", n))
+        views = _views(arrays, self.fixed_point)
+        views[0][:] = offsets
+        views[1][:len(child_index)] = child_index
+        np.frombuffer(arrays[2], dtype=revenue.dtype)[:n] = revenue
+
+        tasks, above = self._partition(columnar)
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(arrays, self.fixed_point)) as pool:
+            for _ in pool.map(_compute_subtrees, tasks):
+                pass
+        _accumulate(above, views, self.fixed_point)
+
+        self.sums = np.frombuffer(arrays[3], dtype=revenue.dtype)[:n].copy()
+        self._commissions = np.frombuffer(arrays[4], dtype=np.float64)[:n].tolist()
+        return self.sums
+
+    @benchmark()
+    def calculate_commissions(self):
+        self.subtree_sums()
+        return dict(zip(map(str, self.tree.ids), self._commissions))
@@ -0,0 +1,217 @@
+"""
+Плани комісій зі ставками по рівнях.
+
+CommissionPlan задає ставку для кожного рівня нижче партнера: рівень 1 -
+прямі діти, рівень 2 - їхні діти і так далі. План або обмежує глибину
+(глибші рівні нічого не приносять), або поширює останню ставку на всі
+глибші рівні. Поточна схема "5% від усіх нащадків" - пресет FLAT_5.
+
+LevelCommissionCalculator рахує план одним проходом знизу вгору: кожен
+партнер тримає L сум денного доходу - по одній на рівень плану - і додає
+їх зі зсувом на рівень у суми батька. Тож розрахунок коштує O(N * L), а не
+O(N * глибина).
+"""
+
+import math
+from array import array
+from fractions import Fraction
+
+from models.core import MINOR_UNITS, CommissionCalculator, daily_revenue, round_money, to_minor_units
+from utils.benchmark import benchmark
+
+
+class CommissionPlan:
+    """
+    Ставки комісії по рівнях нижче партнера.
+
+    Args:
+        rates (Iterable): Ставки рівнів 1, 2, ... - Decimal, Fraction, int або
+            рядок ("0.05"); float переводиться через його десятковий запис
+        unlimited (bool): Остання ставка діє і для всіх глибших рівнів
+        name (str | None): Назва для звітів
+    """
+
+    def __init__(self, rates, unlimited=False, name=None):
+        self.rates = tuple(Fraction(str(r)) if isinstance(r, float) else Fraction(r) for r in rates)
+        if not self.rates:
+            raise ValueError("Commission plan needs at least one level")
+        if any(r < 0 for r in self.rates):
+            raise ValueError("Commission rates must be non-negative")
+        self.unlimited = unlimited
+        self.name = name
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Читає план з рядка відсотків по рівнях.
+
+        "5,3,1x5" - 5% на рівні 1, 3% на рівні 2, 1% на рівнях 3-7;
+        "+" після останньої ставки поширює її на всі глибші рівні ("5+").
+        Назва пресету з PRESETS теж підходить.
+        """
+        if spec in PRESETS:
+            return PRESETS[spec]
+        unlimited = spec.endswith("+")
+        rates = []
+        try:
+            for part in spec.rstrip("+").split(","):
+                percent, _, repeat = part.strip().partition("x")
+                rates.extend([Fraction(percent) / 100] * (int(repeat) if repeat else 1))
+        except ValueError:
+            raise ValueError(f"Invalid commission plan {spec!r}, expected e.g. '5,3,1x5' or '5+'")
+        return cls(rates, unlimited=unlimited, name=spec)
+
+    @property
+    def levels(self):
+        return len(self.rates)
+
+    def __eq__(self, other):
+        return (isinstance(other, CommissionPlan)
+                and self.rates == other.rates and self.unlimited == other.unlimited)
+
+    def __hash__(self):
+        return hash((self.rates, self.unlimited))
+
+    def __repr__(self):
+        percents = ",".join(f"{float(r * 100):g}" for r in self.rates)
+        return f"CommissionPlan({percents}{'+' if self.unlimited else ''})"
+
+
+# Поточна схема: 5% від денного доходу всіх нащадків
+FLAT_5 = CommissionPlan([Fraction(1, 20)], unlimited=True, name="flat5")
+
+PRESETS = {"flat5": FLAT_5}
+
+
+class LevelCommissionCalculator:
+    """
+    Комісії за планом зі ставками по рівнях.
+
+    Для FLAT_5 делегує CommissionCalculator, тож результат ідентичний йому.
+
+    У режимі fixed_point суми рівнів - цілі мінорні одиниці місячного
+    доходу, а ставки - дроби зі спільним знаменником, тож комісія
+    округлюється HALF_UP точно. Інакше суми - float денного доходу, як у
+    CommissionCalculator, а округлюється float сума ставка * сума рівня.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        plan (CommissionPlan): План комісій
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, tree, plan=FLAT_5, fixed_point=False):
+        self.tree = tree
+        self.plan = plan
+        self.fixed_point = fixed_point
+        if fixed_point:
+            den = math.lcm(*(r.denominator for r in plan.rates))
+            self._numerators = [int(r * den) for r in plan.rates]
+            # сотих = sum(ставка * сума) / (30 * MINOR_UNITS) * 100
+            self._divisor = den * 30 * MINOR_UNITS // 100
+        else:
+            self._float_rates = [float(r) for r in plan.rates]
+
+    def _round(self, sums, start):
+        sums = sums[start:start + self.plan.levels]
+        if self.fixed_point:
+            num = sum(n * s for n, s in zip(self._numerators, sums))
+            den = self._divisor
+            return math.copysign((2 * abs(num) + den) // (2 * den) / 100, num)
+        total = 0.0
+        for rate, s in zip(self._float_rates, sums):
+            total += rate * s
+        return round_money(total)
+
+    def level_sums(self, roots=None):
+        """
+        Суми доходу по рівнях плану одним проходом знизу вгору.
+
+        Args:
+            roots (Iterable | None): Індекси вузлів, чиї піддерева рахувати;
+                None - усе дерево
+
+        Returns:
+            tuple: (position, sums) - суми вузла i лежать у
+            sums[position[i] * L:(position[i] + 1) * L] (рівні 1..L; з
+            unlimited остання сума охоплює і всі глибші рівні)
+        """
+        tree = self.tree
+        L = self.plan.levels
+        unlimited = self.plan.unlimited
+        contribution = to_minor_units if self.fixed_point else daily_revenue
+        revenue = tree.monthly_revenue
+        parent_index = tree.parent_index
+
+        if roots is None:
+            order = tree.order_index
+            position = array("q", bytes(8 * len(order)))
+            for k, i in enumerate(order):
+                position[i] = k
+            parent_position = array("q", (position[p] if p >= 0 else -1
+                                          for p in map(parent_index.__getitem__, order)))
+        else:
+            order = self._subtree_order(roots)
+            position = {i: k for k, i in enumerate(order)}
+            parent_position = array("q", (position.get(parent_index[i], -1) for i in order))
+
+        # Одна пласка таблиця замість списку на вузол; діти йдуть раніше за
+        # батьків, тож суми дитини повні, коли вона додає їх батьку зі зсувом
+        sums = [0 if self.fixed_point else 0.0] * (len(order) * L)
+        for k in range(len(order) - 1, -1, -1):
+            q = parent_position[k]
+            if q < 0:
+                continue
+            own, target = k * L, q * L
+            sums[target] += contribution(revenue[order[k]])
+            for d in range(1, L):
+                sums[target + d] += sums[own + d - 1]
+            if unlimited:
+                sums[target + L - 1] += sums[own + L - 1]
+        return position, sums
+
+    def _subtree_order(self, roots):
+        # Лишаємо корені без запитаного предка: їхні піддерева не перетинаються,
+        # тож конкатенація обходів у ширину теж має батьків раніше за дітей
+        tree = self.tree
+        wanted = set(roots)
+        offsets, child_index = tree.csr()
+        order = array("q")
+        for root in wanted:
+            p = tree.parent_index[root]
+            while p >= 0 and p not in wanted:
+                p = tree.parent_index[p]
+            if p >= 0:
+                continue
+            head = len(order)
+            order.append(root)
+            while head < len(order):
+                i = order[head]
+                order.extend(child_index[offsets[i]:offsets[i + 1]])
+                head += 1
+        return order
+
+    def iter_commissions(self, str_ids=True):
+        if self.plan == FLAT_5:
+            yield from CommissionCalculator(self.tree, self.fixed_point).iter_commissions(str_ids)
+            return
+        position, sums = self.level_sums()
+        L = self.plan.levels
+        for i, pid in enumerate(self.tree.ids):
+            yield str(pid) if str_ids else pid, self._round(sums, position[i] * L)
+
+    def iter_commissions_for(self, partner_ids, str_ids=True):
+        """Комісії лише вибраних партнерів: проходяться тільки їхні піддерева."""
+        if self.plan == FLAT_5:
+            yield from CommissionCalculator(self.tree, self.fixed_point).iter_commissions_for(partner_ids, str_ids)
+            return
+        index = self.tree.index
+        partner_ids = list(partner_ids)
+        position, sums = self.level_sums([index[pid] for pid in partner_ids])
+        L = self.plan.levels
+        for pid in partner_ids:
+            yield str(pid) if str_ids else pid, self._round(sums, position[index[pid]] * L)
+
+    @benchmark()
+    def calculate_commissions(self):
+        return dict(self.iter_commissions())
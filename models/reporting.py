@@ -0,0 +1,112 @@
+"""
+Звіти для перевірки виплат без повного словника комісій.
+
+Комісія неспадно залежить від суми нащадків, тож партнерів можна
+вибирати за неокругленими сумами з CommissionCalculator.subtree_totals, а
+округлювати і віддавати лише вибраних:
+
+- top(n) - n найбільших комісій обмеженою купою, O(N log n);
+- above(threshold) - комісії не менші за поріг одним проходом, O(N);
+- percentiles(qs) - комісії на заданих перцентилях через np.partition,
+  O(N) без сортування всіх сум.
+
+Id віддаються як є, без рядка на кожного партнера.
+"""
+
+import heapq
+import math
+
+from models.core import MINOR_UNITS, CommissionCalculator, MLMTree
+
+# Найбільша похибка округлення комісії до сотих
+_HALF_CENT = 0.005
+
+
+class CommissionReport:
+    """
+    Звіти за сумами нащадків одного розрахунку.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, tree: MLMTree, fixed_point=False):
+        self.tree = tree
+        calculator = CommissionCalculator(tree, fixed_point)
+        self._round = calculator._round
+        self.totals = calculator.subtree_totals()
+        # Комісія на одиницю суми до округлення: 5% від денної суми або від
+        # місячної суми в мінорних одиницях
+        self._rate = 0.05 / (30 * MINOR_UNITS) if fixed_point else 0.05
+
+    def top(self, n):
+        """
+        n партнерів з найбільшими комісіями.
+
+        Returns:
+            list: Пари (id, комісія) за спаданням; при рівних сумах раніше
+            іде партнер, що раніше з'явився у вході
+        """
+        totals = self.totals
+        ids = self.tree.ids
+        best = heapq.nlargest(n, range(len(totals)), key=totals.__getitem__)
+        return [(ids[i], self._round(totals[i])) for i in best]
+
+    def above(self, threshold):
+        """
+        Партнери з комісією не меншою за threshold у порядку входу.
+
+        Округлюються лише суми, які після округлення можуть дотягнути до порогу.
+        """
+        bound = (threshold - 2 * _HALF_CENT) / self._rate
+        round_ = self._round
+        ids = self.tree.ids
+        result = []
+        for i, total in enumerate(self.totals):
+            if total >= bound:
+                commission = round_(total)
+                if commission >= threshold:
+                    result.append((ids[i], commission))
+        return result
+
+    def percentiles(self, qs):
+        """
+        Комісії на перцентилях за методом найближчого рангу.
+
+        Args:
+            qs (Iterable): Перцентилі від 0 до 100
+
+        Returns:
+            dict: {перцентиль: комісія}
+        """
+        import numpy as np
+
+        qs = list(qs)
+        if any(not 0 <= q <= 100 for q in qs):
+            raise ValueError(f"Percentiles must be between 0 and 100, got {qs}")
+        totals = self.totals
+        if not totals:
+            return {q: None for q in qs}
+        n = len(totals)
+        ranks = {q: max(math.ceil(q / 100 * n), 1) - 1 for q in qs}
+        # Суми fixed_point стають int64, float - float64; item() повертає їх у Python
+        partitioned = np.partition(np.asarray(totals), sorted(set(ranks.values())))
+        return {q: self._round(partitioned[k].item()) for q, k in ranks.items()}
+
+    def to_dict(self, top=None, threshold=None, percentiles=None):
+        """Звіт для JSON: лише розділи, для яких задані параметри."""
+        report = {"partners": len(self.totals)}
+        if top is not None:
+            report["top"] = [{"id": pid, "commission": c} for pid, c in self.top(top)]
+        if threshold is not None:
+            above = self.above(threshold)
+            report["threshold"] = {
+                "threshold": threshold,
+                "count": len(above),
+                "total": round(math.fsum(c for _, c in above), 2),
+                "partners": [{"id": pid, "commission": c} for pid, c in above],
+            }
+        if percentiles is not None:
+            report["percentiles"] = {f"{q:g}": c for q, c in self.percentiles(percentiles).items()}
+        return report
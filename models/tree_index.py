@@ -0,0 +1,211 @@
+"""
+Індекс дерева для швидких запитів по піддеревах і предках.
+
+Обхід у глибину нумерує вузли так, що піддерево вузла i - суцільний
+відрізок [tin[i], tout[i]) порядку обходу (Euler tour). Тож:
+
+- дохід піддерева - різниця префіксних сум доходу в порядку обходу, O(1);
+  після першої зміни доходу індекс переходить на дерево Фенвіка, і запит
+  та зміна коштують O(log N);
+- "A в мережі B" - перевірка вкладеності відрізків, O(1);
+- найнижчий спільний спонсор - двійкові підйоми по таблиці предків на
+  1, 2, 4, ... рівнів вгору, O(log глибина). Таблиця будується при першому
+  запиті.
+
+З матрицею доходів за періодами (main.load_revenue_matrix) префіксні суми
+двовимірні, і дохід піддерева за будь-який проміжок періодів теж коштує O(1).
+
+Суми через різницю префіксів - float, тож можуть відрізнятися від прямого
+додавання в останніх знаках.
+"""
+
+from array import array
+from itertools import accumulate
+
+from models.core import MLMTree
+
+
+class TreeIndex:
+    """
+    Індекс над MLMTree, побудований за O(N).
+
+    Індекс тримає власну копію доходів: update_revenue не змінює дерево, а
+    структурні зміни дерева потребують нового індексу.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        matrix (numpy.ndarray | None): Доходи за періодами, рядок на партнера
+            в порядку tree.ids
+        periods (list | None): Назви стовпців matrix
+    """
+
+    def __init__(self, tree: MLMTree, matrix=None, periods=None):
+        self.tree = tree
+        n = len(tree.ids)
+        offsets, child_index = tree.csr()
+        parent_index = tree.parent_index
+
+        # Обхід у глибину з явним стеком; діти відвідуються в порядку індексів
+        order = array("q")
+        stack = [i for i in range(n - 1, -1, -1) if parent_index[i] < 0]
+        while stack:
+            i = stack.pop()
+            order.append(i)
+            stack.extend(reversed(child_index[offsets[i]:offsets[i + 1]]))
+
+        tin = array("q", bytes(8 * n))
+        for k, i in enumerate(order):
+            tin[i] = k
+        # Розмір піддерева: діти йдуть у порядку обходу пізніше за батька
+        size = array("q", [1]) * n
+        for i in reversed(order):
+            p = parent_index[i]
+            if p >= 0:
+                size[p] += size[i]
+        self.order = order
+        self.tin = tin
+        self.tout = array("q", (t + s for t, s in zip(tin, size)))
+
+        self.revenue = list(tree.monthly_revenue)
+        self._prefix = list(accumulate((self.revenue[i] for i in order), initial=0))
+        self._fenwick = None
+        self._up = None
+        self._depth = None
+
+        self.periods = None
+        if matrix is not None:
+            self._build_periods(matrix, periods)
+
+    def _build_periods(self, matrix, periods):
+        import numpy as np
+
+        if matrix.shape[0] != len(self.order):
+            raise ValueError(f"Revenue matrix has {matrix.shape[0]} rows, expected {len(self.order)}")
+        self.periods = list(periods) if periods is not None else list(range(matrix.shape[1]))
+        self._period_index = {period: k for k, period in enumerate(self.periods)}
+        # prefix[k, m] - сума перших k вузлів обходу за перші m періодів
+        prefix = np.zeros((matrix.shape[0] + 1, matrix.shape[1] + 1))
+        np.cumsum(matrix[np.asarray(self.order)], axis=0, out=prefix[1:, 1:])
+        np.cumsum(prefix[1:, 1:], axis=1, out=prefix[1:, 1:])
+        self._period_prefix = prefix
+
+    def _i(self, partner_id):
+        return self.tree.index[partner_id]
+
+    def subtree_revenue(self, partner_id, include_self=True):
+        """
+        Місячний дохід піддерева партнера.
+
+        Args:
+            partner_id: Id партнера
+            include_self (bool): False - лише нащадки, як у розрахунку комісій
+        """
+        i = self._i(partner_id)
+        lo, hi = self.tin[i], self.tout[i]
+        if not include_self:
+            lo += 1
+        if self._fenwick is None:
+            return self._prefix[hi] - self._prefix[lo]
+        return self._fenwick_sum(hi) - self._fenwick_sum(lo)
+
+    def period_revenue(self, partner_id, first, last, include_self=True):
+        """
+        Дохід піддерева партнера за періоди від first до last включно.
+
+        Args:
+            partner_id: Id партнера
+            first, last: Назви періодів з periods
+
+        Raises:
+            ValueError: Якщо індекс побудовано без матриці доходів
+        """
+        if self.periods is None:
+            raise ValueError("TreeIndex was built without a revenue matrix")
+        i = self._i(partner_id)
+        lo, hi = self.tin[i] + (0 if include_self else 1), self.tout[i]
+        start, stop = self._period_index[first], self._period_index[last] + 1
+        prefix = self._period_prefix
+        return float(prefix[hi, stop] - prefix[lo, stop] - prefix[hi, start] + prefix[lo, start])
+
+    def update_revenue(self, partner_id, monthly_revenue):
+        """Змінює дохід партнера в індексі за O(log N)."""
+        i = self._i(partner_id)
+        if self._fenwick is None:
+            self._build_fenwick()
+        delta = monthly_revenue - self.revenue[i]
+        self.revenue[i] = monthly_revenue
+        tree = self._fenwick
+        k = self.tin[i] + 1
+        while k < len(tree):
+            tree[k] += delta
+            k += k & -k
+
+    def _build_fenwick(self):
+        # Дерево Фенвіка за O(N): кожна комірка додається до наступної відповідальної
+        tree = [0, *(self.revenue[i] for i in self.order)]
+        for k in range(1, len(tree)):
+            parent = k + (k & -k)
+            if parent < len(tree):
+                tree[parent] += tree[k]
+        self._fenwick = tree
+        self._prefix = None
+
+    def _fenwick_sum(self, k):
+        # Сума перших k вузлів обходу
+        tree = self._fenwick
+        total = 0
+        while k:
+            total += tree[k]
+            k &= k - 1
+        return total
+
+    def in_downline(self, partner_id, sponsor_id):
+        """Чи є партнер нащадком спонсора (сам спонсор - ні)."""
+        i, s = self._i(partner_id), self._i(sponsor_id)
+        return self.tin[s] < self.tin[i] < self.tout[s]
+
+    def depth(self, partner_id):
+        """Кількість предків партнера."""
+        if self._depth is None:
+            self._build_lifting()
+        return self._depth[self._i(partner_id)]
+
+    def _build_lifting(self):
+        # up[k][i] - предок i на 2**k рівнів вище або -1
+        parent_index = self.tree.parent_index
+        depth = array("q", bytes(8 * len(self.order)))
+        for i in self.order:
+            p = parent_index[i]
+            if p >= 0:
+                depth[i] = depth[p] + 1
+        up = [array("q", parent_index)]
+        for _ in range(max(depth, default=0).bit_length() - 1):
+            prev = up[-1]
+            up.append(array("q", (prev[p] if p >= 0 else -1 for p in prev)))
+        self._depth = depth
+        self._up = up
+
+    def lca(self, a, b):
+        """
+        Найнижчий спільний спонсор двох партнерів.
+
+        Якщо один партнер - предок іншого, повертається він сам.
+
+        Returns:
+            Id спільного предка або None, якщо партнери в різних деревах
+        """
+        if self._up is None:
+            self._build_lifting()
+        i, j = self._i(a), self._i(b)
+        tin, tout = self.tin, self.tout
+        if tin[i] <= tin[j] < tout[i]:
+            return a
+        if tin[j] <= tin[i] < tout[j]:
+            return b
+        # Піднімаємо i найбільшими стрибками, що ще не накривають j
+        for up in reversed(self._up):
+            p = up[i]
+            if p >= 0 and not tin[p] <= tin[j] < tout[p]:
+                i = p
+        p = self.tree.parent_index[i]
+        return self.tree.ids[p] if p >= 0 else None
@@ -0,0 +1,139 @@
+"""
+Перевірка вхідних даних партнерів перед побудовою дерева.
+
+MLMTree мовчки перезаписує дублікати id, робить коренями партнерів з
+неіснуючим батьком і зупиняється на першому циклі. validate_partners за
+один лінійний прохід збирає всі такі проблеми у звіт, нічого не виправляючи.
+"""
+
+from array import array
+
+from utils.benchmark import phase
+
+# Стан вузла при обході по батьках
+_NEW, _ON_PATH, _ROOTED, _CYCLIC = 0, 1, 2, 3
+
+
+class ValidationReport:
+    """
+    Результат validate_partners.
+
+    Attributes:
+        partners (int): Кількість унікальних id
+        records (int): Кількість записів на вході
+        duplicates (dict): id -> скільки разів він зустрівся (лише > 1)
+        orphans (dict): id -> неіснуючий parent_id
+        cycles (list): Цикли, кожен - список id від вузла до його предків
+        detached (list): Id, що не лежать на циклі, але висять під ним
+    """
+
+    def __init__(self, partners, records, duplicates, orphans, cycles, detached):
+        self.partners = partners
+        self.records = records
+        self.duplicates = duplicates
+        self.orphans = orphans
+        self.cycles = cycles
+        self.detached = detached
+
+    @property
+    def ok(self):
+        """Чи можна побудувати дерево без втрат і помилок."""
+        return not (self.duplicates or self.orphans or self.cycles)
+
+    def to_dict(self):
+        # Для JSON: id лишаються як є, ключі словників - списком пар
+        return {
+            "partners": self.partners,
+            "records": self.records,
+            "ok": self.ok,
+            "duplicates": [{"id": pid, "records": n} for pid, n in self.duplicates.items()],
+            "orphans": [{"id": pid, "parent_id": parent} for pid, parent in self.orphans.items()],
+            "cycles": self.cycles,
+            "detached": self.detached,
+        }
+
+    def summary(self):
+        return (f"{self.partners} partners, {len(self.duplicates)} duplicate ids, {len(self.orphans)} orphans, "
+                f"{len(self.cycles)} cycles, {len(self.detached)} partners under cycles")
+
+
+def validate_partners(partners_data):
+    """
+    Знаходить усі дублікати id, сиріт і цикли за O(N).
+
+    Дублікати розв'язуються як у MLMTree: діє останній запис. Далі кожен
+    вузол фарбується при підйомі по батьках: шлях іде, доки не впреться в
+    корінь, уже пофарбований вузол або вузол поточного шляху - тоді від
+    нього починається новий цикл. Кожен вузол відвідується один раз.
+
+    Args:
+        partners_data (Iterable): Словники з id і parent_id
+
+    Returns:
+        ValidationReport: Звіт з усіма знайденими проблемами
+    """
+    with phase("validate") as event:
+        ids = []
+        index = {}
+        raw_parent_ids = []
+        counts = {}
+        records = 0
+        for p in partners_data:
+            records += 1
+            pid = p["id"]
+            i = index.get(pid)
+            if i is None:
+                index[pid] = len(ids)
+                ids.append(pid)
+                raw_parent_ids.append(p["parent_id"])
+            else:
+                raw_parent_ids[i] = p["parent_id"]
+                counts[pid] = counts.get(pid, 1) + 1
+
+        n = len(ids)
+        parent_index = array("q", bytes(8 * n))
+        orphans = {}
+        for i, parent_id in enumerate(raw_parent_ids):
+            p = index.get(parent_id, -1) if parent_id is not None else -1
+            parent_index[i] = p
+            if p < 0 and parent_id is not None:
+                orphans[ids[i]] = parent_id
+        del raw_parent_ids
+
+        state = bytearray(n)
+        cycles = []
+        detached = []
+        path = []
+        for start in range(n):
+            if state[start]:
+                continue
+            i = start
+            while i >= 0 and state[i] == _NEW:
+                state[i] = _ON_PATH
+                path.append(i)
+                i = parent_index[i]
+
+            if i < 0:
+                end = _ROOTED
+            elif state[i] == _ON_PATH:
+                # Замкнулись на поточному шляху: від i до кінця шляху - цикл
+                k = len(path) - 1
+                while path[k] != i:
+                    k -= 1
+                cycle = path[k:]
+                del path[k:]
+                for c in cycle:
+                    state[c] = _CYCLIC
+                cycles.append([ids[c] for c in cycle])
+                end = _CYCLIC
+            else:
+                end = state[i]
+
+            for j in path:
+                state[j] = end
+            if end == _CYCLIC:
+                detached.extend(ids[j] for j in path)
+            path.clear()
+
+        event["partners"] = n
+    return ValidationReport(n, records, counts, orphans, cycles, detached)
@@ -0,0 +1,202 @@
+"""
+Версійні знімки комісій для читання під час перерахунку.
+
+CommissionCalculator змінює memo на місці, тож потік, що читає комісії
+під час _dfs чи update_revenue, може побачити напівзаповнений стан.
+VersionedCommissions натомість тримає незмінний ResultSnapshot: кортежі
+доходів, сум нащадків і комісій однієї версії. Перерахунок будує новий
+знімок поруч зі старим і публікує його одним присвоєнням атрибута, яке в
+CPython атомарне. Читачі беруть current один раз і працюють з цим знімком
+без блокувань, а старий знімок живе, доки на нього є посилання.
+
+Записувачі (recompute, update_revenue) виконуються по черзі під замком,
+тож версії публікуються в порядку викликів. Структура дерева в усіх
+версіях однакова; для нової структури потрібен новий VersionedCommissions.
+"""
+
+import heapq
+import threading
+
+from models.core import MLMTree, daily_revenue, round_commission, round_commission_exact, to_minor_units
+
+
+class ResultSnapshot:
+    """
+    Незмінні комісії однієї версії.
+
+    Attributes:
+        version (int): Номер версії, зростає з кожною публікацією
+        revenue (tuple): Місячні доходи в порядку tree.ids
+        totals (tuple): Суми нащадків, як CommissionCalculator.memo
+        commissions (tuple): Округлені комісії
+    """
+
+    __slots__ = ("version", "tree", "revenue", "totals", "commissions", "_top")
+
+    def __init__(self, version, tree, revenue, totals, commissions):
+        self.version = version
+        self.tree = tree
+        self.revenue = tuple(revenue)
+        self.totals = tuple(totals)
+        self.commissions = tuple(commissions)
+        self._top = None
+
+    def commission(self, partner_id):
+        return self.commissions[self.tree.index[partner_id]]
+
+    def total(self, partner_id):
+        return self.totals[self.tree.index[partner_id]]
+
+    def items(self, str_ids=True):
+        """Пари (id, комісія) у порядку tree.ids, як CommissionCalculator.iter_commissions."""
+        ids = map(str, self.tree.ids) if str_ids else self.tree.ids
+        return zip(ids, self.commissions)
+
+    def top(self, n):
+        # Знімок незмінний, тож топ можна кешувати; два читачі, що рахують
+        # його одночасно, отримають і запишуть однаковий результат
+        top = self._top
+        if top is None or len(top) < min(n, len(self.commissions)):
+            commissions = self.commissions
+            best = heapq.nlargest(max(n, 10), range(len(commissions)), key=commissions.__getitem__)
+            top = self._top = [(self.tree.ids[i], commissions[i]) for i in best]
+        return top[:n]
+
+
+class VersionedCommissions:
+    """
+    Комісії, які можна перераховувати, поки інші потоки їх читають.
+
+    Args:
+        tree (MLMTree): Дерево партнерів; його доходи - версія 0
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, tree: MLMTree, fixed_point=False):
+        self.tree = tree
+        self.fixed_point = fixed_point
+        if fixed_point:
+            self._contribution, self._round = to_minor_units, round_commission_exact
+        else:
+            self._contribution, self._round = daily_revenue, round_commission
+        # Структура спільна для всіх версій і не змінюється
+        self._order = tree.order_index
+        self._csr = tree.csr()
+        # Лінивий tree.index будується тут, а не першим із читачів
+        self._index = tree.index
+        self._lock = threading.Lock()
+        self._executor = None
+        self._version = 0
+        self._current = self._build(list(tree.monthly_revenue))
+
+    @property
+    def current(self):
+        """Останній опублікований знімок; читання не блокується."""
+        return self._current
+
+    def _build(self, revenue):
+        # Та сама послідовність додавань, що й у CommissionCalculator._dfs:
+        # діти в порядку індексів, внесок дитини, потім її сума
+        contribution, round_ = self._contribution, self._round
+        offsets, child_index = self._csr
+        totals = [0] * len(revenue)
+        for i in reversed(self._order):
+            total = 0
+            for c in child_index[offsets[i]:offsets[i + 1]]:
+                total += contribution(revenue[c])
+                total += totals[c]
+            totals[i] = total
+        return ResultSnapshot(self._version, self.tree, revenue, totals, map(round_, totals))
+
+    def _revenue_feed(self, revenue, base):
+        # Словник {id: дохід} змінює лише вказаних партнерів, послідовність
+        # задає доходи всіх партнерів у порядку tree.ids
+        if isinstance(revenue, dict):
+            updated = list(base)
+            index = self._index
+            for partner_id, monthly_revenue in revenue.items():
+                updated[index[partner_id]] = monthly_revenue
+            return updated
+        updated = list(revenue)
+        if len(updated) != len(base):
+            raise ValueError(f"Revenue feed has {len(updated)} values, expected {len(base)}")
+        return updated
+
+    def recompute(self, revenue):
+        """
+        Перераховує всі комісії на новому доході і публікує нову версію.
+
+        Args:
+            revenue (dict | Sequence): {id: місячний дохід} або доходи всіх
+                партнерів у порядку tree.ids
+
+        Returns:
+            ResultSnapshot: Опублікований знімок
+        """
+        with self._lock:
+            revenue = self._revenue_feed(revenue, self._current.revenue)
+            self._version += 1
+            snapshot = self._build(revenue)
+            self._current = snapshot
+        return snapshot
+
+    def recompute_async(self, revenue):
+        """
+        recompute у фоновому потоці.
+
+        Returns:
+            concurrent.futures.Future: Завершується опублікованим знімком
+        """
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="mlm-recompute")
+        return self._executor.submit(self.recompute, revenue)
+
+    def update_revenue(self, updates):
+        """
+        Копіює поточну версію і перераховує лише предків змінених партнерів.
+
+        Args:
+            updates (dict): {id: новий місячний дохід}
+
+        Returns:
+            ResultSnapshot: Опублікований знімок
+        """
+        with self._lock:
+            current = self._current
+            revenue = self._revenue_feed(updates, current.revenue)
+            totals = list(current.totals)
+            commissions = list(current.commissions)
+            parent_index = self.tree.parent_index
+            index = self._index
+
+            # Предки змінених партнерів, від найглибших до коренів
+            depth = {}
+            for partner_id in updates:
+                i, chain = parent_index[index[partner_id]], []
+                while i >= 0 and i not in depth:
+                    chain.append(i)
+                    i = parent_index[i]
+                base = depth[i] if i >= 0 else -1
+                for k, p in enumerate(reversed(chain)):
+                    depth[p] = base + 1 + k
+
+            contribution, round_ = self._contribution, self._round
+            offsets, child_index = self._csr
+            for i in sorted(depth, key=depth.__getitem__, reverse=True):
+                total = 0
+                for c in child_index[offsets[i]:offsets[i + 1]]:
+                    total += contribution(revenue[c])
+                    total += totals[c]
+                totals[i] = total
+                commissions[i] = round_(total)
+
+            self._version += 1
+            snapshot = ResultSnapshot(self._version, self.tree, revenue, totals, commissions)
+            self._current = snapshot
+        return snapshot
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
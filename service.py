@@ -0,0 +1,236 @@
+"""
+Довгоживучий сервіс комісій з "теплим" деревом у пам'яті.
+
+Дерево будується і комісії рахуються один раз при старті. Далі сервіс
+відповідає на запити з готового memo, а зміни доходу оновлюють лише
+предків зміненого партнера (CommissionCalculator.update_revenue).
+
+HTTP/1.1 з keep-alive поверх TCP або Unix сокета, лише стандартна бібліотека:
+
+    GET  /health                  - {"partners": N}
+    GET  /commission/<id>         - комісія партнера
+    GET  /top?n=10                - N партнерів з найбільшою комісією
+    GET  /subtree/<id>            - денний дохід піддерева і комісія
+    POST /revenue                 - {"id": 42, "monthly_revenue": 5000}
+
+Запуск - python service.py --input dataset.json [--port 8080 | --unix /tmp/mlm.sock] [--fixed-point]
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import math
+from operator import itemgetter
+from urllib.parse import parse_qs, urlsplit
+
+from main import load_tree
+from models.core import MINOR_UNITS, CommissionCalculator, daily_revenue, to_minor_units
+from utils.benchmark import phase
+
+MAX_BODY = 1 << 20
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class CommissionService:
+    """
+    Запити до теплого CommissionCalculator без мережевого шару.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        fixed_point (bool): Рахувати в цілих мінорних одиницях
+    """
+
+    def __init__(self, tree, fixed_point=False):
+        self.tree = tree
+        self.calculator = CommissionCalculator(tree, fixed_point=fixed_point)
+        with phase("service_warmup", partners=len(tree.ids)):
+            self.calculator.calculate_commissions()
+        # Топ кешується до наступної зміни доходу
+        self._top = None
+
+    def _partner_id(self, raw):
+        # Id з URL або JSON - рядок чи число; в дереві зазвичай числа
+        if raw in self.tree.index:
+            return raw
+        try:
+            if int(raw) in self.tree.index:
+                return int(raw)
+        except (TypeError, ValueError):
+            pass
+        raise ServiceError(404, f"Partner {raw} not found")
+
+    def commission(self, raw_id):
+        partner_id = self._partner_id(raw_id)
+        return {"id": partner_id, "commission": self.calculator.commissions[str(partner_id)]}
+
+    def top(self, n):
+        if n < 0:
+            raise ServiceError(400, "n must be non-negative")
+        commissions = self.calculator.commissions
+        if self._top is None or len(self._top) < min(n, len(commissions)):
+            self._top = heapq.nlargest(max(n, 10), commissions.items(), key=itemgetter(1))
+        return [{"id": self._partner_id(pid), "commission": commission} for pid, commission in self._top[:n]]
+
+    def subtree(self, raw_id):
+        partner_id = self._partner_id(raw_id)
+        partner = self.tree.partners[partner_id]
+        descendants = self.calculator._dfs(partner)
+        if self.calculator.fixed_point:
+            own = to_minor_units(partner.monthly_revenue)
+            descendants, own = descendants / (30 * MINOR_UNITS), own / (30 * MINOR_UNITS)
+        else:
+            own = daily_revenue(partner.monthly_revenue)
+        return {
+            "id": partner_id,
+            "descendants_daily_revenue": descendants,
+            "subtree_daily_revenue": descendants + own,
+            "commission": self.calculator.commissions[str(partner_id)],
+        }
+
+    def update_revenue(self, raw_id, monthly_revenue):
+        partner_id = self._partner_id(raw_id)
+        if isinstance(monthly_revenue, bool) or not isinstance(monthly_revenue, (int, float)):
+            raise ServiceError(400, "monthly_revenue must be a number")
+        # json.loads приймає NaN і Infinity, а 1e400 стає inf. Такий дохід
+        # назавжди зіпсував би memo всіх предків, тож відхиляємо його до змін
+        try:
+            finite = math.isfinite(monthly_revenue)
+        except OverflowError:
+            finite = False
+        if not finite:
+            raise ServiceError(400, "monthly_revenue must be a finite number")
+        try:
+            self.calculator.update_revenue(partner_id, monthly_revenue)
+        except ValueError as e:
+            raise ServiceError(400, str(e))
+        self._top = None
+        return self.commission(partner_id)
+
+    def handle(self, method, target, body=b""):
+        """
+        Обробляє один запит.
+
+        Returns:
+            tuple: (HTTP статус, об'єкт для JSON відповіді)
+        """
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        try:
+            if method == "POST" and parts == ["revenue"]:
+                try:
+                    payload = json.loads(body)
+                    return 200, self.update_revenue(payload["id"], payload["monthly_revenue"])
+                except (ValueError, KeyError, TypeError):
+                    raise ServiceError(400, "Expected JSON {\"id\": ..., \"monthly_revenue\": ...}")
+            if method != "GET":
+                raise ServiceError(405, f"Method {method} not allowed")
+            if parts == ["health"]:
+                return 200, {"partners": len(self.tree.ids)}
+            if len(parts) == 2 and parts[0] == "commission":
+                return 200, self.commission(parts[1])
+            if len(parts) == 2 and parts[0] == "subtree":
+                return 200, self.subtree(parts[1])
+            if parts == ["top"]:
+                try:
+                    n = int(parse_qs(url.query).get("n", ["10"])[0])
+                except ValueError:
+                    raise ServiceError(400, "n must be an integer")
+                return 200, self.top(n)
+            raise ServiceError(404, f"Unknown path {url.path}")
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+
+
+async def _handle_connection(service, reader, writer):
+    # Мінімальний HTTP/1.1: рядок запиту, заголовки, тіло за Content-Length
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                status, payload = 413, {"error": "Request body too large"}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = service.handle(method, target, body)
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+
+            data = json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=8080, unix_path=None):
+    """
+    Запускає сервер і повертає asyncio.Server (для тестів і вбудовування).
+
+    Args:
+        service (CommissionService): Обробник запитів
+        host (str): Адреса TCP
+        port (int): Порт TCP, 0 - будь-який вільний
+        unix_path (str | None): Шлях Unix сокета замість TCP
+    """
+    def handler(reader, writer):
+        return _handle_connection(service, reader, writer)
+
+    if unix_path:
+        return await asyncio.start_unix_server(handler, path=unix_path)
+    return await asyncio.start_server(handler, host, port)
+
+
+async def serve(service, host="127.0.0.1", port=8080, unix_path=None):
+    server = await start_server(service, host, port, unix_path)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервіс комісій з деревом у пам'яті")
+    parser.add_argument("--input", required=True, help="JSON, JSON Lines або знімок дерева")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Слухати Unix сокет замість TCP")
+    parser.add_argument("--fixed-point", action="store_true", help="Рахувати в цілих мінорних одиницях")
+    args = parser.parse_args()
+
+    service = CommissionService(load_tree(args.input), fixed_point=args.fixed_point)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving {len(service.tree.ids)} partners on {where}")
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
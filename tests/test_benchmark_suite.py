@@ -0,0 +1,86 @@
+import pytest
+from benchmark_test import compare_results, parse_args, run_queries, run_snapshots, summarize
+from models.core import MLMTree
+from models.columnar import ColumnarTree
+from utils.generators import SHAPES, generate_partners
+
+
+def report(**medians):
+    """Мінімальний результат run_suite з медіанами фаз для random / 1000"""
+    phases = {phase: {"median": median} for phase, median in medians.items()}
+    return {"results": [{"shape": "random", "n": 1000, "calculator": "core", "phases": phases}]}
+
+
+class TestBenchmarkSuite:
+    """Тести генераторів форм дерева і порівняння результатів бенчмарку"""
+
+    @pytest.mark.parametrize("shape, max_depth", [
+        ("chain", 999),
+        ("star", 1),
+        ("kary", 5),  # 4-арне дерево з 1000 вузлів
+    ])
+    def test_shape_depth(self, shape, max_depth):
+        """Тест глибини детермінованих форм"""
+        tree = ColumnarTree.from_records(generate_partners(shape, 1000))
+
+        assert int(tree.depth.max()) == max_depth
+
+    @pytest.mark.parametrize("shape", sorted(SHAPES))
+    def test_shapes_are_valid_trees(self, shape):
+        """Тест що кожна форма - одне дерево без циклів, відтворюване за seed"""
+        data = generate_partners(shape, 500, seed=3)
+        tree = MLMTree(data)
+
+        assert len(tree.partners) == 500
+        assert sum(p.parent_id is None for p in tree.partners.values()) == 1
+        assert generate_partners(shape, 500, seed=3) == data
+
+    def test_powerlaw_has_hubs(self):
+        """Тест що power-law дає вузли з великою кількістю дітей"""
+        tree = MLMTree(generate_partners("powerlaw", 10000))
+        offsets, _ = tree.csr()
+        fan_out = max(offsets[i + 1] - offsets[i] for i in range(len(tree.ids)))
+
+        assert fan_out > 100
+
+    def test_compare_flags_regression(self):
+        """Тест що сповільнення понад поріг позначається як регресія"""
+        rows = compare_results(report(parse=1.0, compute=1.0), report(parse=1.05, compute=1.5), threshold=0.1)
+
+        assert [(row[3], row[-1]) for row in rows] == [("parse", False), ("compute", True)]
+
+    def test_compare_ignores_tiny_phases(self):
+        """Тест що подвоєння мікросекундної фази не вважається регресією"""
+        rows = compare_results(report(build=0.0001), report(build=0.0002), min_seconds=0.001)
+
+        assert rows[0][-1] is False
+
+    def test_legacy_arguments(self):
+        """Тест що старий виклик --n 50000 означає run"""
+        args = parse_args(["--n", "50000"])
+
+        assert args.command == "run"
+        assert args.sizes == [50000]
+
+    def test_rows_per_second(self):
+        """Тест що зведення фази містить пропускну здатність за медіаною"""
+        summary = summarize([0.5, 0.25, 1.0], rows=1000)
+
+        assert summary["median"] == 0.5
+        assert summary["rows_per_second"] == 2000
+
+    def test_queries(self):
+        """Тест що запити через TreeIndex звіряються з наївним обходом і мають час"""
+        report = run_queries(["random", "chain"], [300], queries=50)
+
+        for result in report["results"]:
+            assert set(result["queries"]) == {"subtree_revenue", "in_downline", "lca"}
+            assert all(row["index"] > 0 and row["naive"] > 0 for row in result["queries"].values())
+
+    def test_snapshots(self):
+        """Тест що читачі обслуговують запити і без записів, і під час перерахунку"""
+        report = run_snapshots(["random"], [300], readers=2, recomputes=2)
+
+        result = report["results"][0]
+        assert result["recompute"] > 0
+        assert result["idle_reads_per_second"] > 0 and result["recompute_reads_per_second"] > 0
@@ -0,0 +1,144 @@
+import json
+import os
+import random
+import pytest
+from main import load_tree, main
+from models.cache import ResultCache, content_hash
+from models.core import MLMTree, CommissionCalculator
+from utils.benchmark import add_sink, remove_sink
+from utils.generators import generate_partners
+
+
+class Collector:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+def write_input(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def expected(data, fixed_point=False):
+    return list(CommissionCalculator(MLMTree(data), fixed_point).calculate_commissions().items())
+
+
+def cached(cache, path):
+    result = cache.commissions([path], lambda: load_tree(path))
+    return [(str(pid), c) for pid, c in result.items()]
+
+
+class TestResultCache:
+    """Тести кешу результатів, ключованого хешем входу"""
+
+    def setup_method(self):
+        self.data = generate_partners("powerlaw", 3000, seed=6)
+        for p in self.data[::7]:
+            p["monthly_revenue"] += 0.37
+
+    def test_hit_skips_parsing(self, tmp_path):
+        """Тест що однаковий вхід береться з кешу без побудови дерева"""
+        path = write_input(tmp_path / "partners.json", self.data)
+        cache = ResultCache(str(tmp_path / "cache"))
+        first = cached(cache, path)
+        assert cache.last == "miss"
+
+        result = cache.commissions([path], lambda: pytest.fail("input must not be parsed on a cache hit"))
+
+        assert cache.last == "hit"
+        assert [(str(pid), c) for pid, c in result.items()] == first == expected(self.data)
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_incremental_matches_full(self, tmp_path, fixed_point):
+        """Тест що після змін доходів, переміщень, додавань і видалень результат біт-в-біт як повний"""
+        path = write_input(tmp_path / "partners.json", self.data)
+        cache = ResultCache(str(tmp_path / "cache"), fixed_point=fixed_point)
+        cached(cache, path)
+
+        random.seed(3)
+        data = [dict(p) for p in self.data]
+        for p in random.sample(data, 25):
+            p["monthly_revenue"] = round(p["monthly_revenue"] + 12.34, 2)
+        data[40]["parent_id"] = data[7]["id"]
+        data[41]["parent_id"] = "missing"
+        del data[100:103]
+        data.append({"id": "new", "parent_id": data[10]["id"], "monthly_revenue": 450})
+        data.append({"id": data[200]["id"], "parent_id": None, "monthly_revenue": 90})
+        write_input(tmp_path / "partners.json", data)
+
+        result = cached(cache, path)
+
+        assert cache.last == "incremental"
+        assert result == expected(data, fixed_point)
+
+    def test_reordered_rows(self, tmp_path):
+        """Тест що перестановка рядків змінює порядок додавань так само, як повний розрахунок"""
+        path = write_input(tmp_path / "partners.json", self.data)
+        cache = ResultCache(str(tmp_path / "cache"))
+        cached(cache, path)
+
+        data = list(self.data)
+        random.Random(5).shuffle(data)
+        write_input(tmp_path / "partners.json", data)
+
+        assert cached(cache, path) == expected(data)
+
+    def test_only_changed_chains_recomputed(self, tmp_path):
+        """Тест що перераховуються лише предки зміненого партнера"""
+        data = [{"id": i, "parent_id": i - 1 if i else None, "monthly_revenue": 300} for i in range(10)]
+        data += [{"id": 100 + i, "parent_id": 0, "monthly_revenue": 300} for i in range(50)]
+        path = write_input(tmp_path / "partners.json", data)
+        cache = ResultCache(str(tmp_path / "cache"))
+        cached(cache, path)
+
+        data[5]["monthly_revenue"] = 600
+        write_input(tmp_path / "partners.json", data)
+        collector = add_sink(Collector())
+        try:
+            assert cached(cache, path) == expected(data)
+        finally:
+            remove_sink(collector)
+
+        # Змінився дохід 5: перераховуються 4, 3, 2, 1 і 0
+        assert [e["recomputed"] for e in collector.events if e["phase"] == "cache"] == [5]
+
+    def test_lru_eviction(self, tmp_path):
+        """Тест що понад ліміт видаляються найдавніше використані записи"""
+        cache = ResultCache(str(tmp_path / "cache"))
+        base = generate_partners("random", 500, seed=1)
+        # Усі доходи float, тож записи мають однаковий розмір
+        inputs = [[dict(p, monthly_revenue=p["monthly_revenue"] + k + 0.5) for p in base] for k in range(4)]
+        paths = []
+        for k in range(3):
+            paths.append(write_input(tmp_path / f"partners{k}.json", inputs[k]))
+            cached(cache, paths[-1])
+            os.utime(cache._entry(content_hash([paths[-1]])), (k, k))
+        entry_size = os.path.getsize(cache._entry(content_hash([paths[0]])))
+
+        # Використання першого запису робить другий найдавнішим
+        cache.load(content_hash([paths[0]]))
+        cache.max_bytes = 3 * entry_size
+        cached(cache, write_input(tmp_path / "partners3.json", inputs[3]))
+
+        remaining = set(cache._read_index())
+        assert content_hash([paths[1]]) not in remaining
+        assert content_hash([paths[0]]) in remaining
+        assert len(remaining) == 3
+
+    def test_cli(self, tmp_path):
+        """Тест main з --cache"""
+        output = tmp_path / "commissions.json"
+        args = ["--input", "dataset.json", "--output", str(output), "--cache", str(tmp_path / "cache"),
+                "--cache-size", "64M"]
+
+        main(args)
+        first = output.read_text()
+        output.unlink()
+        main(args)
+
+        tree = MLMTree(json.load(open("dataset.json")))
+        assert output.read_text() == first
+        assert json.loads(first) == CommissionCalculator(tree).calculate_commissions()
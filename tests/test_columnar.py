@@ -0,0 +1,73 @@
+import json
+import pytest
+from models.core import MLMTree, CommissionCalculator
+from models.columnar import ColumnarTree, VectorizedCommissionCalculator
+from utils.generators import random_partners
+
+
+class TestColumnar:
+    """Тести колонкового NumPy-бекенду"""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_commission_calculator(self, seed):
+        """Тест що результат ідентичний CommissionCalculator"""
+        data = random_partners(3000, seed)
+
+        expected = CommissionCalculator(MLMTree(data)).calculate_commissions()
+        actual = VectorizedCommissionCalculator(ColumnarTree.from_records(data)).calculate_commissions()
+
+        assert actual == expected
+        assert list(actual) == list(expected)
+
+    def test_matches_on_dataset(self):
+        """Тест на реальному dataset.json"""
+        with open("dataset.json", encoding="utf-8") as f:
+            data = json.load(f)
+
+        tree = MLMTree(data)
+        expected = CommissionCalculator(tree).calculate_commissions()
+
+        assert VectorizedCommissionCalculator(ColumnarTree.from_tree(tree)).calculate_commissions() == expected
+
+    def test_duplicates_and_orphans(self):
+        """Тест що дублікати і сироти обробляються так само як в MLMTree"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": None, "monthly_revenue": 2000},
+            {"id": 3, "parent_id": 1, "monthly_revenue": 1500},
+            {"id": 3, "parent_id": 2, "monthly_revenue": 1800},  # Дублікат переносить 3 під 2
+            {"id": 4, "parent_id": 99, "monthly_revenue": 900},  # Батька не існує
+            {"id": 5, "parent_id": 4, "monthly_revenue": 600},
+        ]
+
+        tree = ColumnarTree.from_records(data)
+
+        assert tree.ids.tolist() == [1, 2, 3, 4, 5]
+        assert tree.parent_index.tolist() == [-1, -1, 1, -1, 3]
+        assert tree.depth.tolist() == [0, 0, 1, 0, 1]
+        assert (VectorizedCommissionCalculator(tree).calculate_commissions()
+                == CommissionCalculator(MLMTree(data)).calculate_commissions())
+
+    def test_deep_chain(self):
+        """Тест глибокого ланцюжка"""
+        n = 5000
+        tree = ColumnarTree(range(1, n + 1), range(-1, n - 1), [30] * n)
+
+        sums = VectorizedCommissionCalculator(tree).subtree_sums()
+
+        assert tree.depth[-1] == n - 1
+        assert sums[0] == n - 1
+        assert sums[-1] == 0
+
+    @pytest.mark.parametrize("parents", [[0], [1, 0], [-1, 2, 3, 1]])
+    def test_cycle_detected(self, parents):
+        """Тест виявлення циклів"""
+        n = len(parents)
+        with pytest.raises(ValueError, match="Cycle detected"):
+            ColumnarTree(range(n), parents, [1000] * n)
+
+    def test_empty_tree(self):
+        """Тест порожнього дерева"""
+        tree = ColumnarTree.from_records([])
+
+        assert VectorizedCommissionCalculator(tree).calculate_commissions() == {}
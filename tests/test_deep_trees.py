@@ -0,0 +1,69 @@
+import sys
+import pytest
+from models.core import MLMTree, CommissionCalculator
+
+
+def chain(n):
+    """Лінійне дерево 1 -> 2 -> ... -> n"""
+    return [
+        {"id": i, "parent_id": None if i == 1 else i - 1, "monthly_revenue": 30}
+        for i in range(1, n + 1)
+    ]
+
+
+class TestDeepTrees:
+    """Тести ітеративного обходу на деревах, глибших за ліміт рекурсії"""
+
+    def test_deep_chain_commissions(self):
+        """Тест що ланцюжок глибиною більше recursionlimit рахується без помилок"""
+        n = sys.getrecursionlimit() * 20
+        tree = MLMTree(chain(n))
+        commissions = CommissionCalculator(tree).calculate_commissions()
+
+        # Кожен партнер отримує 5% від денного доходу (30/30 = 1) всіх нащадків
+        assert commissions["1"] == round(0.05 * (n - 1), 2)
+        assert commissions[str(n - 1)] == 0.05
+        assert commissions[str(n)] == 0.0
+
+    def test_deep_chain_manual_dfs(self):
+        """Тест що прямий виклик _dfs на глибокому дереві не падає"""
+        n = sys.getrecursionlimit() * 5
+        tree = MLMTree(chain(n))
+        calculator = CommissionCalculator(tree)
+
+        assert calculator._dfs(tree.partners[1]) == pytest.approx(n - 1)
+        assert len(calculator.memo) == n
+
+    def test_deep_cycle_detected(self):
+        """Тест що довгий цикл виявляється без переповнення стеку"""
+        n = sys.getrecursionlimit() * 5
+        data = chain(n)
+        # Корінь стає дитиною останнього партнера - цикл довжиною n
+        data[0]["parent_id"] = n
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            MLMTree(data)
+
+    def test_cycle_below_valid_root(self):
+        """Тест що цикл виявляється навіть поруч з правильним деревом"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 2000},
+            {"id": 3, "parent_id": 4, "monthly_revenue": 1000},
+            {"id": 4, "parent_id": 3, "monthly_revenue": 1000},
+            {"id": 5, "parent_id": 4, "monthly_revenue": 1000},
+        ]
+
+        with pytest.raises(ValueError, match="Cycle detected at partner [34]"):
+            MLMTree(data)
+
+    def test_order_parents_before_children(self):
+        """Тест що порядок обходу ставить батьків раніше за дітей"""
+        data = [
+            {"id": 3, "parent_id": 2, "monthly_revenue": 1000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 2000},
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+        ]
+        tree = MLMTree(data)
+
+        assert [p.id for p in tree.order] == [1, 2, 3]
@@ -0,0 +1,139 @@
+import json
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+import pytest
+from main import main
+from models.core import MLMTree, CommissionCalculator, round_commission_exact, to_minor_units
+from models.columnar import ColumnarTree, VectorizedCommissionCalculator
+from utils.generators import random_partners
+
+
+def exact_commissions(data):
+    """Еталон у раціональних числах: 5% від суми денного доходу нащадків, HALF_UP"""
+    tree = MLMTree(data)
+    totals = {pid: Fraction(0) for pid in tree.partners}
+    for partner in reversed(tree.order):
+        if partner.parent_id in totals:
+            totals[partner.parent_id] += Fraction(str(partner.monthly_revenue)) + totals[partner.id]
+
+    result = {}
+    for pid, total in totals.items():
+        commission = total * Fraction(5, 100) / 30
+        rounded = Decimal(commission.numerator) / Decimal(commission.denominator)
+        result[str(pid)] = float(rounded.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+    return result, totals
+
+
+class TestFixedPoint:
+    """Тести режиму fixed_point з цілими мінорними одиницями"""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_decimal_except_ties(self, seed):
+        """Тест що результат збігається з Decimal, крім рівно половини копійки"""
+        data = random_partners(3000, seed, fractional=False)
+
+        decimal_result = CommissionCalculator(MLMTree(data)).calculate_commissions()
+        fixed_result = CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions()
+        exact, totals = exact_commissions(data)
+
+        assert list(fixed_result) == list(decimal_result)
+        assert fixed_result == exact
+        for pid, commission in decimal_result.items():
+            if commission != fixed_result[pid]:
+                # Точна комісія - рівно півкопійки, а float-сума трохи менша
+                hundredths = totals[int(pid)] * Fraction(5, 100) / 30 * 100
+                assert hundredths % 1 == Fraction(1, 2)
+
+    def test_matches_on_dataset(self):
+        """Тест на реальному dataset.json"""
+        with open("dataset.json", encoding="utf-8") as f:
+            data = json.load(f)
+
+        assert CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions() == exact_commissions(data)[0]
+
+    @pytest.mark.parametrize("seed", [1, 2])
+    def test_vectorized_matches(self, seed):
+        """Тест що векторний fixed_point дає той самий результат"""
+        data = random_partners(3000, seed, fractional=False)
+
+        expected = CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions()
+        actual = VectorizedCommissionCalculator(ColumnarTree.from_records(data), fixed_point=True).calculate_commissions()
+
+        assert actual == expected
+
+    def test_fractional_revenue(self):
+        """Тест що дробові доходи переводяться в копійки без похибки float"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 100},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 12.34},
+            {"id": 3, "parent_id": 2, "monthly_revenue": 0.1},
+        ]
+
+        expected = exact_commissions(data)[0]
+
+        assert to_minor_units(12.34) == 1234
+        assert CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions() == expected
+        assert VectorizedCommissionCalculator(ColumnarTree.from_records(data), fixed_point=True).calculate_commissions() == expected
+
+    def test_sub_minor_revenue_rejected(self):
+        """Тест що дохід дрібніший за копійку не округлюється мовчки"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 100},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 12.345},
+        ]
+
+        with pytest.raises(ValueError, match="minor units"):
+            CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions()
+        with pytest.raises(ValueError, match="minor units"):
+            VectorizedCommissionCalculator(ColumnarTree.from_records(data), fixed_point=True).calculate_commissions()
+
+    @pytest.mark.parametrize("monthly_total, expected", [
+        (0, 0.0),
+        (300, 0.01),     # 0.005 - рівно половина, HALF_UP вгору
+        (299, 0.0),
+        (-300, -0.01),   # Від нуля, як Decimal ROUND_HALF_UP
+        (-299, -0.0),
+        (600 * 250_075, 2500.75),
+    ])
+    def test_round_commission_exact(self, monthly_total, expected):
+        """Тест округлення місячної суми в копійках"""
+        assert round_commission_exact(monthly_total) == expected
+
+    def test_incremental_updates(self):
+        """Тест що інкрементальні зміни в fixed_point зберігають цілі суми"""
+        data = random_partners(200, 7, fractional=False)
+        calculator = CommissionCalculator(MLMTree(data), fixed_point=True)
+        calculator.calculate_commissions()
+
+        calculator.update_revenue(150, 12.34)
+        calculator.add_partner(201, 3, 999)
+        calculator.move_partner(150, 2)
+
+        tree = calculator.tree
+        snapshot = [{"id": p.id, "parent_id": p.parent_id, "monthly_revenue": p.monthly_revenue}
+                    for p in tree.partners.values()]
+        fresh = CommissionCalculator(MLMTree(snapshot), fixed_point=True)
+
+        assert calculator.commissions == fresh.calculate_commissions()
+        assert calculator.memo == fresh.memo
+        assert all(isinstance(total, int) for total in calculator.memo.values())
+
+    @pytest.mark.parametrize("extra", [[], ["--max-memory", "1M"], ["--cache", "cache"], ["--revenues", "revenues.csv"]],
+                             ids=["run", "max-memory", "cache", "revenues"])
+    def test_cli(self, tmp_path, monkeypatch, extra):
+        """Тест що --fixed-point доходить до кожного режиму main"""
+        # На цих даних кілька комісій - рівно півкопійки, і float округлює їх інакше
+        data = random_partners(300, 6, fractional=False)
+        (tmp_path / "partners.json").write_text(json.dumps(data))
+        tree = MLMTree(data)
+        (tmp_path / "revenues.csv").write_text("id,p1\n" + "".join(
+            f"{pid},{revenue!r}\n" for pid, revenue in zip(tree.ids, tree.monthly_revenue)))
+        monkeypatch.chdir(tmp_path)
+
+        main(["--input", "partners.json", "--output", "out.json", "--fixed-point", *extra])
+
+        result = json.loads((tmp_path / "out.json").read_text())
+        if extra and extra[0] == "--revenues":
+            result = {pid: c["p1"] for pid, c in result.items()}
+        assert result == CommissionCalculator(tree, fixed_point=True).calculate_commissions()
+        assert result != CommissionCalculator(tree).calculate_commissions()
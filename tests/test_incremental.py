@@ -0,0 +1,230 @@
+import random
+import pytest
+from models.core import MLMTree, CommissionCalculator
+
+
+def snapshot(tree):
+    """Поточний стан дерева у вигляді вхідних даних для повного перерахунку"""
+    return [
+        {"id": p.id, "parent_id": p.parent_id, "monthly_revenue": p.monthly_revenue}
+        for p in tree.partners.values()
+    ]
+
+
+def full_recompute(tree):
+    calculator = CommissionCalculator(MLMTree(snapshot(tree)))
+    return calculator.calculate_commissions(), calculator.memo
+
+
+class TestIncrementalUpdates:
+    """Тести інкрементального оновлення memo і комісій"""
+
+    def setup_method(self):
+        # Доходи кратні 30, тому денні доходи цілі і суми float точні
+        self.data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 2100},
+            {"id": 3, "parent_id": 1, "monthly_revenue": 1500},
+            {"id": 4, "parent_id": 2, "monthly_revenue": 900},
+            {"id": 5, "parent_id": 4, "monthly_revenue": 600},
+            {"id": 6, "parent_id": 3, "monthly_revenue": 300},
+        ]
+        self.tree = MLMTree(self.data)
+        self.calculator = CommissionCalculator(self.tree)
+        self.commissions = self.calculator.calculate_commissions()
+
+    def assert_consistent(self):
+        expected, memo = full_recompute(self.tree)
+        assert self.calculator.commissions == expected
+        assert self.calculator.memo == memo
+
+    def test_update_revenue(self):
+        """Тест що зміна доходу оновлює тільки предків"""
+        self.calculator.update_revenue(5, 3600)
+
+        # Денний дохід 5 виріс зі 20 до 120, +5 до комісій 4, 2 і 1
+        assert self.commissions["4"] == 6.0
+        assert self.commissions["2"] == 7.5
+        assert self.commissions["1"] == 14.0
+        assert self.commissions["3"] == 0.5
+        self.assert_consistent()
+
+    def test_update_revenue_touches_only_ancestors(self):
+        """Тест що оновлення коштує O(глибина), а не O(N)"""
+        before = dict(self.calculator.memo)
+        self.calculator.update_revenue(4, 1200)
+
+        changed = {pid for pid in before if before[pid] != self.calculator.memo[pid]}
+        assert changed == {1, 2}
+
+    def test_add_partner(self):
+        """Тест додавання нового партнера"""
+        self.calculator.add_partner(7, 6, 3000)
+
+        assert self.commissions["7"] == 0.0
+        assert self.commissions["6"] == 5.0
+        assert self.commissions["1"] == 14.0
+        self.assert_consistent()
+
+    def test_add_partner_adopts_orphans(self):
+        """Тест що новий партнер приєднує сиріт, які на нього посилались"""
+        data = self.data + [{"id": 8, "parent_id": 7, "monthly_revenue": 600}]
+        tree = MLMTree(data)
+        calculator = CommissionCalculator(tree)
+        calculator.calculate_commissions()
+
+        calculator.add_partner(7, 3, 300)
+
+        assert [child.id for child in tree.partners[7].children] == [8]
+        assert calculator.commissions["7"] == 1.0
+        expected, memo = full_recompute(tree)
+        assert calculator.commissions == expected
+        assert calculator.memo == memo
+
+    def test_add_existing_partner_rejected(self):
+        """Тест що повторне додавання id відхиляється"""
+        with pytest.raises(ValueError, match="already exists"):
+            self.calculator.add_partner(3, 1, 100)
+
+    def test_move_partner(self):
+        """Тест перенесення піддерева до іншого батька"""
+        self.calculator.move_partner(4, 3)
+
+        # Діти зберігаються в порядку індексів, як після повної перебудови дерева
+        assert [child.id for child in self.tree.partners[3].children] == [4, 6]
+        assert self.tree.partners[2].children == []
+        assert self.commissions["2"] == 0.0
+        assert self.commissions["3"] == 3.0
+        self.assert_consistent()
+
+    def test_move_partner_to_root(self):
+        """Тест перетворення партнера на корінь"""
+        self.calculator.move_partner(2, None)
+
+        assert self.commissions["1"] == 3.0
+        assert self.tree.order[1].id == 2
+        self.assert_consistent()
+
+    @pytest.mark.parametrize("new_parent", [4, 5, 2])
+    def test_move_into_own_subtree_rejected(self, new_parent):
+        """Тест що перенесення, яке створює цикл, відхиляється без змін"""
+        before = dict(self.commissions)
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            self.calculator.move_partner(2, new_parent)
+
+        assert self.commissions == before
+        assert self.tree.partners[2].parent_id == 1
+        self.assert_consistent()
+
+    def test_add_partner_closing_orphan_cycle_rejected(self):
+        """Тест що додавання не може замкнути цикл через сироту"""
+        tree = MLMTree([{"id": 1, "parent_id": 2, "monthly_revenue": 300}])
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            tree.add_partner(2, 1, 300)
+
+    def test_updates_before_calculation(self):
+        """Тест змін до першого розрахунку - memo ще порожнє"""
+        tree = MLMTree(self.data)
+        calculator = CommissionCalculator(tree)
+
+        calculator.update_revenue(5, 3600)
+        calculator.move_partner(6, 5)
+        calculator.add_partner(7, 6, 300)
+
+        assert calculator.calculate_commissions() == full_recompute(tree)[0]
+
+    def test_random_updates(self):
+        """Тест серії випадкових змін проти повного перерахунку"""
+        rng = random.Random(5)
+        next_id = 7
+        for _ in range(200):
+            action = rng.random()
+            pid = rng.choice(list(self.tree.partners))
+            if action < 0.5:
+                self.calculator.update_revenue(pid, 30 * rng.randint(0, 300))
+            elif action < 0.7:
+                self.calculator.add_partner(next_id, pid, 30 * rng.randint(0, 300))
+                next_id += 1
+            else:
+                try:
+                    self.calculator.move_partner(pid, rng.choice(list(self.tree.partners) + [None]))
+                except ValueError:
+                    pass
+
+        self.assert_consistent()
+
+    def test_fractional_update_matches_full(self):
+        """Тест що сума предка після оновлення біт-в-біт як при повному розрахунку"""
+        tree = MLMTree([
+            {"id": 1, "parent_id": None, "monthly_revenue": 0},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 7349},
+            {"id": 3, "parent_id": 1, "monthly_revenue": 8006},
+        ])
+        calculator = CommissionCalculator(tree)
+        calculator.calculate_commissions()
+
+        calculator.update_revenue(2, 9583)
+
+        # memo + різниця дає 29.32: денні доходи не цілі, і порядок додавань важить
+        assert calculator.commissions["1"] == 29.31
+        assert calculator.memo == full_recompute(tree)[1]
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_fractional_updates(self, seed, fixed_point):
+        """Тест випадкових дробових змін: після кожної - як свіжий CommissionCalculator"""
+        rng = random.Random(seed)
+        revenue = (lambda: round(rng.uniform(0, 10000), 2)) if fixed_point else (lambda: rng.uniform(0, 10000))
+        data = [{"id": i, "parent_id": rng.randint(1, i - 1) if i > 1 else None, "monthly_revenue": revenue()}
+                for i in range(1, 40)]
+        tree = MLMTree(data)
+        calculator = CommissionCalculator(tree, fixed_point)
+        calculator.calculate_commissions()
+
+        next_id = 40
+        for _ in range(60):
+            action = rng.random()
+            pid = rng.choice(list(tree.partners))
+            if action < 0.6:
+                calculator.update_revenue(pid, revenue())
+            elif action < 0.8:
+                calculator.add_partner(next_id, pid, revenue())
+                next_id += 1
+            else:
+                try:
+                    calculator.move_partner(pid, rng.choice(list(tree.partners) + [None]))
+                except ValueError:
+                    pass
+
+            fresh = CommissionCalculator(MLMTree(snapshot(tree)), fixed_point)
+            assert calculator.commissions == fresh.calculate_commissions()
+            assert calculator.memo == fresh.memo
+
+    def test_updates_do_not_rebuild_tree(self, monkeypatch):
+        """Тест що зміни після розрахунку не перебудовують CSR і порядок за O(N)"""
+        data = [{"id": i, "parent_id": (i - 1) // 3 or None, "monthly_revenue": 30 * (i % 7)} for i in range(1, 3001)]
+        data.append({"id": 5000, "parent_id": 4000, "monthly_revenue": 600})
+        tree = MLMTree(data)
+        calculator = CommissionCalculator(tree)
+        calculator.calculate_commissions()
+
+        def full_rebuild():
+            raise AssertionError("O(N) rebuild during an incremental update")
+
+        with monkeypatch.context() as m:
+            m.setattr(tree, "csr", full_rebuild)
+            m.setattr(tree, "_check_for_cycles", full_rebuild)
+            for k in range(20):
+                calculator.add_partner(3001 + k, 1 + 97 * k, 300)
+            calculator.add_partner(4000, 3010, 900)
+            calculator.move_partner(40, 3005)
+            calculator.move_partner(2, None)
+            calculator.update_revenue(3010, 1200)
+            assert [child.id for child in tree.partners[3005].children] == [40]
+            assert [child.id for child in tree.partners[4000].children] == [5000]
+
+        expected, memo = full_recompute(tree)
+        assert calculator.commissions == expected
+        assert calculator.memo == memo
@@ -0,0 +1,180 @@
+import json
+import logging
+import pstats
+import subprocess
+import sys
+import tracemalloc
+import pytest
+from models.core import MLMTree, CommissionCalculator
+from utils.benchmark import (JsonLinesSink, LogSink, PrometheusSink, add_sink, benchmark, clear_sinks,
+                             phase, profile, reset_traced_peak, traced_peak)
+
+
+class Collector:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 2000},
+    {"id": 3, "parent_id": 2, "monthly_revenue": 1500},
+]
+
+
+class TestInstrumentation:
+    """Тести подій фаз, приймачів і профілювання"""
+
+    def setup_method(self):
+        self.collector = add_sink(Collector())
+
+    def teardown_method(self):
+        clear_sinks()
+
+    def test_tree_and_calculator_phases(self):
+        """Тест що MLMTree і калькулятор звітують про свої фази"""
+        CommissionCalculator(MLMTree(DATA)).calculate_commissions()
+
+        phases = [e["phase"] for e in self.collector.events]
+        assert phases == ["build", "cycle_check", "CommissionCalculator.calculate_commissions"]
+        assert self.collector.events[0]["partners"] == 3
+        assert all(e["seconds"] >= 0 for e in self.collector.events)
+
+    def test_labels_and_exceptions(self):
+        """Тест що мітки потрапляють у подію, а подія надсилається і при помилці"""
+        with pytest.raises(ValueError):
+            with phase("load", input="x.json") as event:
+                event["partners"] = 5
+                raise ValueError("boom")
+
+        assert self.collector.events[-1]["phase"] == "load"
+        assert self.collector.events[-1]["input"] == "x.json"
+        assert self.collector.events[-1]["partners"] == 5
+
+    def test_nested_peak_memory(self):
+        """Тест що пік вкладеної фази враховується і в зовнішній"""
+        tracemalloc.start()
+        try:
+            with phase("outer"):
+                with phase("inner"):
+                    blob = bytearray(8 << 20)
+                    del blob
+        finally:
+            tracemalloc.stop()
+
+        inner, outer = self.collector.events
+        assert inner["peak_traced_bytes"] >= 8 << 20
+        assert outer["peak_traced_bytes"] >= inner["peak_traced_bytes"]
+
+    def test_outer_peak_survives_phase(self):
+        """Тест що фаза не стирає пік, який міряють навколо неї без phase"""
+        tracemalloc.start()
+        try:
+            reset_traced_peak()
+            blob = bytearray(8 << 20)
+            del blob
+            with phase("small"):
+                pass
+            raw, outer = tracemalloc.get_traced_memory()[1], traced_peak()
+            with phase("large"):
+                blob = bytearray(16 << 20)
+                del blob
+            after = traced_peak()
+        finally:
+            tracemalloc.stop()
+
+        assert raw < 8 << 20 <= outer
+        assert after >= 16 << 20
+
+    def test_no_traced_memory_without_tracemalloc(self):
+        """Тест що без tracemalloc пік Python-пам'яті не вигадується"""
+        with phase("quick"):
+            pass
+
+        assert "peak_traced_bytes" not in self.collector.events[0]
+
+    def test_public_tracemalloc_fallback(self, tmp_path):
+        """Тест що без C-модуля _tracemalloc (не CPython) фази рахують пік через tracemalloc"""
+        code = ("import sys, tracemalloc\n"
+                "sys.modules['_tracemalloc'] = None\n"
+                "from utils.benchmark import JsonLinesSink, add_sink, phase\n"
+                "add_sink(JsonLinesSink(sys.argv[1]))\n"
+                "tracemalloc.start()\n"
+                "with phase('blob'):\n"
+                "    blob = bytearray(1 << 20)\n"
+                "    del blob\n")
+
+        subprocess.run([sys.executable, "-c", code, str(tmp_path / "events.jsonl")], check=True)
+
+        assert json.loads((tmp_path / "events.jsonl").read_text())["peak_traced_bytes"] >= 1 << 20
+
+    def test_benchmark_decorator_label(self):
+        """Тест що декоратор бере назву фази з мітки або імені функції"""
+        @benchmark("custom")
+        def labelled():
+            return 1
+
+        @benchmark()
+        def unlabelled():
+            return 2
+
+        assert labelled() == 1
+        assert unlabelled() == 2
+        assert [e["phase"] for e in self.collector.events][-2:] == [
+            "custom", "TestInstrumentation.test_benchmark_decorator_label.<locals>.unlabelled"]
+
+    def test_json_and_prometheus_sinks(self, tmp_path):
+        """Тест формату JSON Lines і textfile Prometheus"""
+        jsonl = tmp_path / "metrics.jsonl"
+        prom = tmp_path / "mlm.prom"
+        add_sink(JsonLinesSink(jsonl))
+        add_sink(PrometheusSink(prom))
+
+        MLMTree(DATA)
+        MLMTree(DATA)
+
+        events = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        assert [e["phase"] for e in events] == ["build", "cycle_check"] * 2
+
+        # У textfile лише останнє значення кожної фази
+        lines = prom.read_text().splitlines()
+        assert sum(line.startswith('mlm_phase_seconds{phase="build"}') for line in lines) == 1
+        assert "# TYPE mlm_phase_seconds gauge" in lines
+        assert not (tmp_path / "mlm.prom.tmp").exists()
+
+    def test_log_sink(self, caplog):
+        """Тест що LogSink пише один рядок key=value"""
+        add_sink(LogSink())
+
+        with caplog.at_level(logging.INFO, logger="mlm.metrics"):
+            with phase("serialize", partners=3):
+                pass
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].getMessage().startswith("phase=serialize partners=3 seconds=")
+
+    def test_cprofile(self, tmp_path):
+        """Тест що --profile зберігає статистику cProfile"""
+        path = tmp_path / "run.prof"
+        with profile(str(path)):
+            CommissionCalculator(MLMTree(DATA)).calculate_commissions()
+
+        functions = {func for _, _, func in pstats.Stats(str(path)).stats}
+        assert "_check_for_cycles" in functions
+
+    def test_sampling_profile(self, tmp_path):
+        """Тест що семплюючий профайлер пише collapsed stacks"""
+        path = tmp_path / "run.folded"
+        with profile(str(path), sampling=True, interval=0.0005):
+            total = 0
+            for i in range(2_000_000):
+                total += i
+
+        lines = path.read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert "test_sampling_profile" in stack
+        assert int(count) > 0
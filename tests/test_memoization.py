@@ -71,26 +71,30 @@ class TestMemoization:
         tree = MLMTree(data)
         calculator = CommissionCalculator(tree)
 
-        # Лічильник викликів обчислень (не з кешу)
+        # Раніше тест рахував входи в рекурсивний _dfs - по одному на
+        # партнера, тобто 3. Тепер повний прохід (_fill) іде по індексах без
+        # _dfs, і одиниця роботи - внесок дитини в суму батька: кожен партнер
+        # з батьком додається рівно один раз, а сума кожного вузла
+        # рахується один раз і лягає в memo
         computation_count = 0
-        original_dfs = calculator._dfs
+        original_contribution = calculator._contribution
 
-        def counting_dfs(partner):
+        def counting_contribution(monthly_revenue):
             nonlocal computation_count
-            # Якщо партнер не в кеші - це нове обчислення
-            if partner.id not in calculator.memo:
-                computation_count += 1
-            return original_dfs(partner)
+            computation_count += 1
+            return original_contribution(monthly_revenue)
 
         # Підміняємо метод
-        calculator._dfs = counting_dfs
+        calculator._contribution = counting_contribution
 
-        # Виконуємо розрахунок
+        # Виконуємо розрахунок двічі: другий раз усе береться з memo
         commissions = calculator.calculate_commissions()
+        assert calculator.calculate_commissions() == commissions
 
-        # Кількість обчислень = кількість партнерів
-        assert computation_count == 3
-        assert len(calculator.memo) == 3
+        # Кількість обчислень = кількість партнерів, що мають батька (N - 1),
+        # і по сумі в memo на кожного з N партнерів
+        assert computation_count == len(data) - 1
+        assert len(calculator.memo) == len(data)
 
     def test_memoization_deep_tree(self):
         """Тест мемоізації на глибокому дереві"""
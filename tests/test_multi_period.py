@@ -0,0 +1,95 @@
+import json
+import random
+import pytest
+from main import load_revenue_matrix, load_tree, main, run_periods
+from models.columnar import ColumnarTree, MultiPeriodCommissionCalculator
+from models.core import MLMTree, CommissionCalculator
+
+
+def random_hierarchy(n, seed):
+    rng = random.Random(seed)
+    return [{"id": i, "parent_id": None if i == 1 else rng.randint(max(1, i - 20), i - 1), "monthly_revenue": 0}
+            for i in range(1, n + 1)]
+
+
+def random_revenues(n, periods, seed):
+    rng = random.Random(seed)
+    return [[rng.choice((rng.randint(0, 10000), round(rng.uniform(0, 10000), 2))) for _ in range(periods)]
+            for _ in range(n)]
+
+
+def single_period(hierarchy, revenues, period, fixed_point):
+    """Окремий прогін CommissionCalculator для одного періоду"""
+    data = [dict(p, monthly_revenue=row[period]) for p, row in zip(hierarchy, revenues)]
+    return CommissionCalculator(MLMTree(data), fixed_point=fixed_point).calculate_commissions()
+
+
+class TestMultiPeriod:
+    """Тести пакетного розрахунку за кілька періодів"""
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_matches_single_period_runs(self, fixed_point):
+        """Тест що кожен період збігається з окремим запуском до біта"""
+        hierarchy = random_hierarchy(2000, seed=3)
+        revenues = random_revenues(2000, 7, seed=4)
+        periods = [f"2024-01-{d:02d}" for d in range(1, 8)]
+        tree = ColumnarTree.from_records(hierarchy)
+
+        result = MultiPeriodCommissionCalculator(tree, revenues, periods, fixed_point).calculate_commissions()
+
+        for p, period in enumerate(periods):
+            expected = single_period(hierarchy, revenues, p, fixed_point)
+            assert {pid: by_period[period] for pid, by_period in result.items()} == expected
+
+    def test_shape_mismatch(self):
+        """Тест що матриця не того розміру відхиляється"""
+        tree = ColumnarTree.from_records(random_hierarchy(3, seed=0))
+
+        with pytest.raises(ValueError):
+            MultiPeriodCommissionCalculator(tree, [[1, 2]] * 3, ["a"])
+
+    def test_revenue_matrix_csv(self, tmp_path):
+        """Тест читання CSV: відсутні партнери мають нуль, невідомі - помилка"""
+        tree = MLMTree(random_hierarchy(3, seed=0))
+        path = tmp_path / "revenues.csv"
+        path.write_text("id,jan,feb\n3,300,12.5\n1,100,0\n")
+
+        periods, matrix = load_revenue_matrix(str(path), tree)
+
+        assert periods == ["jan", "feb"]
+        assert matrix.tolist() == [[100, 0], [0, 0], [300, 12.5]]
+
+        path.write_text("id,jan\n99,1\n")
+        with pytest.raises(ValueError):
+            load_revenue_matrix(str(path), tree)
+
+    def test_run_periods(self, tmp_path):
+        """Тест повного пакетного конвеєра з одним вихідним файлом"""
+        revenues = tmp_path / "revenues.csv"
+        output = tmp_path / "commissions.json"
+        tree = load_tree("dataset.json")
+        with open(revenues, "w") as f:
+            f.write("id,p1,p2\n")
+            for pid, revenue in zip(tree.ids, tree.monthly_revenue):
+                f.write(f"{pid},{revenue},{revenue * 2}\n")
+
+        run_periods("dataset.json", str(revenues), str(output))
+
+        result = json.loads(output.read_text())
+        expected = CommissionCalculator(tree).calculate_commissions()
+        assert {pid: c["p1"] for pid, c in result.items()} == expected
+        assert len(result) == len(tree.ids)
+
+    def test_cli_write_snapshot(self, tmp_path):
+        """Тест що --write-snapshot з --revenues записує знімок ієрархії"""
+        revenues = tmp_path / "revenues.csv"
+        snapshot = tmp_path / "tree.snap"
+        tree = load_tree("dataset.json")
+        revenues.write_text("id,p1\n" + "".join(f"{pid},{r}\n" for pid, r in zip(tree.ids, tree.monthly_revenue)))
+
+        main(["--input", "dataset.json", "--output", str(tmp_path / "out.json"), "--revenues", str(revenues),
+              "--write-snapshot", str(snapshot)])
+
+        assert list(load_tree(str(snapshot)).ids) == list(tree.ids)
+        assert CommissionCalculator(load_tree(str(snapshot))).calculate_commissions() == \
+            CommissionCalculator(tree).calculate_commissions()
@@ -0,0 +1,149 @@
+import json
+import os
+import tracemalloc
+import pytest
+from main import main, parse_args
+from models.core import MLMTree, CommissionCalculator
+from models.out_of_core import MIN_MEMORY, OutOfCoreCommissionCalculator, parse_size
+from utils.benchmark import add_sink, clear_sinks, reset_traced_peak, traced_peak
+from utils.external import ExternalSorter
+from utils.generators import generate_partners
+
+# Найменший бюджет: навіть маленькі дерева скидаються на диск багатьма прогонами
+SMALL_BUDGET = MIN_MEMORY
+
+
+class TestOutOfCore:
+    """Тести розрахунку комісій з обмеженою пам'яттю"""
+
+    @pytest.mark.parametrize("shape", ["random", "powerlaw", "star", "chain"])
+    def test_matches_in_memory(self, shape):
+        """Тест що комісії і їхній порядок біт-в-біт збігаються з CommissionCalculator"""
+        data = generate_partners(shape, 300 if shape == "chain" else 5000, seed=3)
+
+        expected = CommissionCalculator(MLMTree(data)).calculate_commissions()
+        result = list(OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET).iter_commissions())
+
+        assert result == list(expected.items())
+
+    def test_duplicates_and_orphans(self):
+        """Тест дублікатів id, сиріт і змішаних типів id як у MLMTree"""
+        data = generate_partners("random", 2000, seed=5)
+        data += [
+            {"id": 7, "parent_id": 1500, "monthly_revenue": 12.34},
+            {"id": "7", "parent_id": 7, "monthly_revenue": 300},
+            {"id": "orphan", "parent_id": "missing", "monthly_revenue": 900},
+            {"id": 1999, "parent_id": "orphan", "monthly_revenue": 45},
+        ]
+
+        expected = CommissionCalculator(MLMTree(data)).calculate_commissions()
+        result = OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET).calculate_commissions()
+
+        assert list(result.items()) == list(expected.items())
+
+    def test_fixed_point(self):
+        """Тест режиму fixed_point"""
+        data = generate_partners("powerlaw", 3000, seed=8)
+        for p in data[::4]:
+            p["monthly_revenue"] += 0.01 * (p["id"] % 100)
+
+        expected = CommissionCalculator(MLMTree(data), fixed_point=True).calculate_commissions()
+        result = OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET, fixed_point=True).calculate_commissions()
+
+        assert result == expected
+
+    def test_cycle(self, tmp_path):
+        """Тест що цикл дає ValueError і не лишає тимчасових файлів"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 100},
+            {"id": 2, "parent_id": 3, "monthly_revenue": 100},
+            {"id": 3, "parent_id": 2, "monthly_revenue": 100},
+        ]
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET, str(tmp_path)).calculate_commissions()
+        assert os.listdir(tmp_path) == []
+
+    def test_deep_chain(self):
+        """Тест що глибина ланцюжка рахується за log2(глибина) раундів, а не прохід на рівень"""
+        data = generate_partners("chain", 5000, seed=3)
+        calculator = OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET)
+
+        result = calculator.calculate_commissions()
+
+        assert calculator.depth == 4999
+        assert result == CommissionCalculator(MLMTree(data)).calculate_commissions()
+
+    @pytest.mark.parametrize("data, unreachable", [
+        ([{"id": 1, "parent_id": 1, "monthly_revenue": 100}], 1),
+        ([{"id": 1, "parent_id": None, "monthly_revenue": 100}]
+         + [{"id": i, "parent_id": i - 1 if i > 2 else 60, "monthly_revenue": 100} for i in range(2, 61)]
+         + [{"id": i, "parent_id": 30, "monthly_revenue": 100} for i in range(61, 71)], 69),
+    ], ids=["self", "tail"])
+    def test_cycle_count(self, data, unreachable):
+        """Тест що в помилку потрапляють і вузли циклу, і вузли під ним"""
+        with pytest.raises(ValueError, match=f"Cycle detected: {unreachable} partners"):
+            OutOfCoreCommissionCalculator(iter(data), SMALL_BUDGET).calculate_commissions()
+
+    def test_memory_budget(self, tmp_path):
+        """Тест що пік пам'яті проміжних даних у кожній фазі не перевищує --max-memory"""
+        data = generate_partners("random", 30000, seed=1)
+        budget = 1 << 20
+        events = []
+        sink = type("Sink", (), {"emit": lambda self, event: events.append(event)})()
+
+        add_sink(sink)
+        tracemalloc.start()
+        try:
+            reset_traced_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            count = 0
+            for _ in OutOfCoreCommissionCalculator(iter(data), budget, str(tmp_path)).iter_commissions():
+                count += 1
+            peak = traced_peak() - baseline
+        finally:
+            tracemalloc.stop()
+            clear_sinks()
+
+        phases = {event["phase"]: event["peak_traced_bytes"] - baseline for event in events}
+        assert set(phases) == {"ooc_sort", "ooc_levels", "ooc_aggregate"}
+        assert all(phase_peak <= budget for phase_peak in phases.values()), phases
+        assert count == len(data)
+        assert peak <= budget
+        assert os.listdir(tmp_path) == []
+
+    def test_budget_too_small(self):
+        """Тест що бюджет, менший за буфер сортування, відхиляється, а не перевищується"""
+        with pytest.raises(ValueError, match="below the minimum"):
+            OutOfCoreCommissionCalculator(iter([]), MIN_MEMORY - 1)
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.json", "--max-memory", "64K"])
+
+    def test_external_sorter(self, tmp_path):
+        """Тест стабільного зовнішнього сортування з кількома проходами злиття"""
+        items = [((i * 7919) % 1000, i) for i in range(20000)]
+        sorter = ExternalSorter(str(tmp_path), 256, key=lambda item: item[0])
+        sorter.extend(items)
+
+        assert len(sorter.runs) > sorter.fan_in
+        assert list(sorter) == sorted(items, key=lambda item: item[0])
+        assert os.listdir(tmp_path) == []
+
+    def test_parse_size(self):
+        """Тест розбору розміру пам'яті"""
+        assert parse_size("512M") == 512 << 20
+        assert parse_size("2g") == 2 << 30
+        assert parse_size("1.5KB") == 1536
+        assert parse_size("4096") == 4096
+        with pytest.raises(ValueError):
+            parse_size("lots")
+
+    def test_cli(self, tmp_path):
+        """Тест main з --max-memory"""
+        output = tmp_path / "commissions.json"
+
+        main(["--input", "dataset.json", "--output", str(output), "--max-memory", "1M", "--tmpdir", str(tmp_path)])
+
+        tree = MLMTree(json.load(open("dataset.json")))
+        assert json.loads(output.read_text()) == CommissionCalculator(tree).calculate_commissions()
+        assert os.listdir(tmp_path) == ["commissions.json"]
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+import pytest
+from main import parse_args, run, save_commissions
+from models.core import MLMTree, CommissionCalculator
+from utils import codec
+from utils.streaming import iter_json_array, iter_partners, read_binary, write_json_compact, write_json_object
+
+
+COMMISSIONS = {"1": 7.5, "2": 1.5, "3": 0.0, "4": 1234567.89}
+
+
+@pytest.fixture(params=codec.available_backends())
+def backend(request):
+    codec.set_backend(request.param)
+    yield request.param
+    codec.set_backend()
+
+
+class TestOutputFormats:
+    """Тести JSON бекендів і форматів запису комісій"""
+
+    def test_backends_agree(self, backend):
+        """Тест що всі бекенди пишуть і читають однаково"""
+        value = {"id": 5, "name": "Партнер", "monthly_revenue": 12.34, "parent_id": None}
+
+        assert codec.dumps(value) == '{"id":5,"name":"Партнер","monthly_revenue":12.34,"parent_id":null}'
+        assert codec.loads(codec.dumps(value)) == value
+
+    def test_json_lines_with_backend(self, tmp_path, backend):
+        """Тест що JSON Lines розбираються обраним бекендом"""
+        path = tmp_path / "partners.jsonl"
+        path.write_text('{"id": 1, "parent_id": null, "monthly_revenue": 3000}\n\n'
+                        '{"id": 2, "parent_id": 1, "monthly_revenue": 1.5}\n')
+
+        assert [p["monthly_revenue"] for p in iter_partners(str(path))] == [3000, 1.5]
+
+    @pytest.mark.parametrize("chunk_size", [5, 64, 1 << 16])
+    def test_json_array_with_backend(self, backend, chunk_size):
+        """Тест що шматки масиву розбираються бекендом, а незвичні елементи - стандартним json"""
+        items = [{"id": i, "parent_id": i - 1 or None, "monthly_revenue": i * 1.1} for i in range(1, 200)]
+        items[50]["id"] = 2 ** 70
+        items[90]["name"] = 'x}, {"id": 0}'
+        items[120] = 7
+        text = json.dumps(items).replace(str(items[150]["monthly_revenue"]), "NaN")
+
+        result = list(iter_json_array(io.StringIO(text), chunk_size))
+
+        assert result[150]["monthly_revenue"] != result[150]["monthly_revenue"]
+        result[150]["monthly_revenue"] = items[150]["monthly_revenue"]
+        assert result == items
+
+    def test_json_object_with_backend(self, backend):
+        """Тест що json з відступами пишеться бекендом і не змінюється від нього"""
+        f = io.StringIO()
+
+        write_json_object([(1, 7.5), ("a\"b", 1e-05), (3, {"jan": 1.25})], f)
+
+        assert f.getvalue() == '{\n  "1": 7.5,\n  "a\\"b": 1e-05,\n  "3": {"jan":1.25}\n}'
+
+    def test_unknown_backend(self):
+        """Тест що невідомий бекенд відхиляється"""
+        with pytest.raises(ValueError):
+            codec.set_backend("simdjson")
+
+    @pytest.mark.parametrize("batch_size", [1, 3, 1000])
+    def test_compact_json(self, backend, batch_size):
+        """Тест компактного JSON з різними розмірами пачок"""
+        f = io.StringIO()
+        items = [(1, 7.5), ("a\"b", 0.1), (3, {"jan": 1.25, "feb": 0.0})]
+
+        write_json_compact(items, f, batch_size=batch_size)
+
+        assert f.getvalue() == '{"1":7.5,"a\\"b":0.1,"3":{"jan":1.25,"feb":0.0}}'
+        assert json.loads(f.getvalue()) == {"1": 7.5, 'a"b': 0.1, "3": {"jan": 1.25, "feb": 0.0}}
+
+        f = io.StringIO()
+        write_json_compact([], f)
+        assert f.getvalue() == "{}"
+
+    @pytest.mark.parametrize("output_format", ["json", "compact"])
+    def test_json_formats_round_trip(self, tmp_path, output_format):
+        """Тест що обидва JSON формати читаються в той самий словник"""
+        path = tmp_path / "out.json"
+
+        save_commissions(COMMISSIONS, str(path), output_format)
+
+        assert json.loads(path.read_text()) == COMMISSIONS
+
+    def test_csv(self, tmp_path):
+        """Тест CSV з одним стовпцем комісій і зі стовпцем на період"""
+        path = tmp_path / "out.csv"
+        save_commissions(COMMISSIONS, str(path), "csv")
+
+        rows = list(csv.reader(path.open()))
+        assert rows[0] == ["id", "commission"]
+        assert {pid: float(c) for pid, c in rows[1:]} == COMMISSIONS
+
+        save_commissions({"1": {"jan": 1.5, "feb": 2.0}}, str(path), "csv")
+        assert path.read_text() == "id,jan,feb\n1,1.5,2.0\n"
+
+    def test_binary(self, tmp_path):
+        """Тест бінарних колонок id і комісій"""
+        path = tmp_path / "out.bin"
+
+        save_commissions(COMMISSIONS, str(path), "binary")
+
+        with open(path, "rb") as f:
+            ids, commissions = read_binary(f)
+        assert dict(zip(map(str, ids), commissions)) == COMMISSIONS
+
+        path.write_bytes(b"garbage!" + bytes(16))
+        with pytest.raises(ValueError):
+            with open(path, "rb") as f:
+                read_binary(f)
+
+    @pytest.mark.parametrize("output_format", ["json", "compact", "csv", "binary"])
+    def test_pipeline(self, tmp_path, output_format):
+        """Тест main.run з кожним форматом: ті самі комісії, що й calculate_commissions"""
+        output = tmp_path / "out"
+        expected = CommissionCalculator(MLMTree(iter_partners("dataset.json"))).calculate_commissions()
+
+        run("dataset.json", str(output), output_format=output_format)
+
+        if output_format == "binary":
+            with open(output, "rb") as f:
+                ids, commissions = read_binary(f)
+            result = dict(zip(map(str, ids), commissions))
+        elif output_format == "csv":
+            result = {pid: float(c) for pid, c in list(csv.reader(output.open()))[1:]}
+        else:
+            result = json.loads(output.read_text())
+        assert result == expected
+
+    def test_binary_with_revenues_rejected(self):
+        """Тест що комісії за періодами не пишуться в бінарний формат"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.bin", "--revenues", "matrix.csv",
+                        "--format", "binary"])
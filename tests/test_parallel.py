@@ -0,0 +1,65 @@
+import json
+import pytest
+from models.core import MLMTree, CommissionCalculator
+from models.columnar import ColumnarTree
+from models.parallel import ParallelCommissionCalculator
+from utils.generators import random_partners
+
+
+class TestParallel:
+    """Тести паралельного розрахунку по піддеревах"""
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_matches_commission_calculator(self, workers, fixed_point):
+        """Тест що результат ідентичний CommissionCalculator"""
+        tree = MLMTree(random_partners(5000, workers, digits=2, roots=10, window=50))
+
+        expected = CommissionCalculator(tree, fixed_point=fixed_point).calculate_commissions()
+        actual = ParallelCommissionCalculator(tree, workers, fixed_point=fixed_point).calculate_commissions()
+
+        assert actual == expected
+        assert list(actual) == list(expected)
+
+    def test_matches_on_dataset(self):
+        """Тест на реальному dataset.json"""
+        with open("dataset.json", encoding="utf-8") as f:
+            tree = MLMTree(json.load(f))
+
+        expected = CommissionCalculator(tree).calculate_commissions()
+
+        assert ParallelCommissionCalculator(tree, workers=2).calculate_commissions() == expected
+
+    def test_partition_covers_tree(self):
+        """Тест що кожен вузол або над зрізом, або рівно в одному піддереві"""
+        tree = MLMTree(random_partners(5000, 7, digits=2, roots=10, window=50))
+        calculator = ParallelCommissionCalculator(tree, workers=4)
+        tasks, above = calculator._partition(ColumnarTree.from_tree(tree))
+
+        offsets, child_index = tree.csr()
+        covered = list(above)
+        for roots in tasks:
+            stack = list(roots)
+            while stack:
+                i = stack.pop()
+                covered.append(i)
+                stack.extend(child_index[offsets[i]:offsets[i + 1]])
+
+        assert sorted(covered) == list(range(len(tree.ids)))
+        assert len(tasks) <= 4 * 8
+
+    def test_deep_chain_beyond_cut(self):
+        """Тест що ланцюжок глибший за max_cut_depth рахується цілою задачею"""
+        n = 3000
+        data = [{"id": i, "parent_id": i - 1 if i > 1 else None, "monthly_revenue": 30} for i in range(1, n + 1)]
+        tree = MLMTree(data)
+
+        calculator = ParallelCommissionCalculator(tree, workers=2, max_cut_depth=10)
+        commissions = calculator.calculate_commissions()
+
+        assert calculator.sums[0] == n - 1
+        assert commissions == CommissionCalculator(tree).calculate_commissions()
+
+    def test_empty_tree(self):
+        """Тест порожнього дерева"""
+        assert ParallelCommissionCalculator(MLMTree([]), workers=2).calculate_commissions() == {}
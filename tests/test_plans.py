@@ -0,0 +1,123 @@
+import json
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+import pytest
+from main import parse_args, run
+from models.core import MLMTree, CommissionCalculator
+from models.plans import FLAT_5, CommissionPlan, LevelCommissionCalculator
+from utils.generators import generate_partners
+
+
+def exact_level_commissions(tree, plan):
+    """Еталон O(N * глибина): кожен партнер додає свій денний дохід усім предкам на відстані до L"""
+    totals = {pid: Fraction(0) for pid in tree.ids}
+    for partner in tree.partners.values():
+        revenue = Fraction(str(partner.monthly_revenue)) / 30
+        ancestor, level = partner.parent_id, 1
+        while ancestor in totals:
+            if level <= plan.levels:
+                totals[ancestor] += plan.rates[level - 1] * revenue
+            elif plan.unlimited:
+                totals[ancestor] += plan.rates[-1] * revenue
+            else:
+                break
+            ancestor, level = tree.partners[ancestor].parent_id, level + 1
+
+    return {str(pid): float((Decimal(t.numerator) / Decimal(t.denominator)).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP)) for pid, t in totals.items()}
+
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 3000},
+    {"id": 3, "parent_id": 2, "monthly_revenue": 3000},
+    {"id": 4, "parent_id": 3, "monthly_revenue": 3000},
+    {"id": 5, "parent_id": 4, "monthly_revenue": 3000},
+]
+
+
+class TestPlans:
+    """Тести планів комісій зі ставками по рівнях"""
+
+    def test_parse(self):
+        """Тест розбору плану з відсотків"""
+        plan = CommissionPlan.parse("5,3,1x5")
+
+        assert plan.rates == (Fraction(1, 20), Fraction(3, 100)) + (Fraction(1, 100),) * 5
+        assert not plan.unlimited
+        assert CommissionPlan.parse("5+") == FLAT_5
+        assert CommissionPlan.parse("flat5") is FLAT_5
+        with pytest.raises(ValueError):
+            CommissionPlan.parse("5,three")
+
+    def test_chain_levels(self):
+        """Тест ставок по рівнях на ланцюжку з доходом 100 на день"""
+        tree = MLMTree(DATA)
+
+        capped = LevelCommissionCalculator(tree, CommissionPlan.parse("5,3")).calculate_commissions()
+        unlimited = LevelCommissionCalculator(tree, CommissionPlan.parse("5,3+")).calculate_commissions()
+
+        assert capped == {"1": 8.0, "2": 8.0, "3": 8.0, "4": 5.0, "5": 0.0}
+        assert unlimited == {"1": 14.0, "2": 11.0, "3": 8.0, "4": 5.0, "5": 0.0}
+
+    def test_flat_preset_is_current_calculator(self):
+        """Тест що пресет FLAT_5 дає рівно результат CommissionCalculator"""
+        tree = MLMTree(generate_partners("random", 3000, seed=4))
+
+        assert LevelCommissionCalculator(tree, FLAT_5).calculate_commissions() == \
+            CommissionCalculator(tree).calculate_commissions()
+
+    @pytest.mark.parametrize("spec", ["5,3,1x5", "5,3,1x5+", "7+", "2.5,0.5x3"])
+    @pytest.mark.parametrize("shape", ["random", "powerlaw", "chain"])
+    def test_matches_exact_reference(self, spec, shape):
+        """Тест що fixed_point збігається з раціональним еталоном, а float - з точністю до копійки"""
+        data = generate_partners(shape, 600, seed=9)
+        for p in data[::3]:
+            p["monthly_revenue"] += 0.01 * (p["id"] % 100)
+        tree = MLMTree(data)
+        plan = CommissionPlan.parse(spec)
+        expected = exact_level_commissions(tree, plan)
+
+        fixed = LevelCommissionCalculator(tree, plan, fixed_point=True).calculate_commissions()
+        floating = LevelCommissionCalculator(tree, plan).calculate_commissions()
+
+        assert fixed == expected
+        assert all(abs(floating[pid] - expected[pid]) <= 0.0100001 for pid in expected)
+
+    @pytest.mark.parametrize("spec", ["5,3,1x5", "flat5"])
+    def test_subset(self, spec):
+        """Тест що комісії вибраних партнерів, включно з вкладеними, збігаються з повним розрахунком"""
+        tree = MLMTree(generate_partners("powerlaw", 2000, seed=1))
+        calculator = LevelCommissionCalculator(tree, CommissionPlan.parse(spec))
+        full = calculator.calculate_commissions()
+        ids = [tree.ids[0], *tree.ids[5:400:37]]
+
+        assert dict(calculator.iter_commissions_for(ids)) == {str(pid): full[str(pid)] for pid in ids}
+
+    def test_cli_plan(self, tmp_path):
+        """Тест main.run з планом"""
+        output = tmp_path / "commissions.json"
+        plan = CommissionPlan.parse("5,3,1x5")
+
+        run("dataset.json", str(output), plan=plan)
+
+        tree = MLMTree(json.load(open("dataset.json")))
+        assert json.loads(output.read_text()) == LevelCommissionCalculator(tree, plan).calculate_commissions()
+
+    def test_cli_plan_with_revenues_rejected(self):
+        """Тест що план не губиться мовчки з --revenues"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.json", "--revenues", "matrix.csv",
+                        "--plan", "5,3"])
+
+    @pytest.mark.parametrize("spec", ["abc", "5,-3", "5x0"])
+    def test_cli_invalid_plan(self, spec, capsys):
+        """Тест що зламаний --plan - помилка аргументів, а не traceback"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.json", "--plan", spec])
+        assert "invalid --plan" in capsys.readouterr().err
+
+    def test_cli_plan_parsed(self):
+        """Тест що parse_args віддає вже розібраний план"""
+        assert parse_args(["--input", "dataset.json", "--output", "out.json", "--plan", "5,3"]).plan == \
+            CommissionPlan.parse("5,3")
@@ -0,0 +1,90 @@
+import json
+import math
+import pytest
+from main import main, parse_args
+from models.core import MLMTree, CommissionCalculator
+from models.reporting import CommissionReport
+from utils.generators import generate_partners
+
+
+def nearest_rank(values, q):
+    values = sorted(values)
+    return values[max(math.ceil(q / 100 * len(values)), 1) - 1]
+
+
+class TestCommissionReport:
+    """Тести звітів про найбільші комісії, поріг і перцентилі"""
+
+    def setup_method(self):
+        data = generate_partners("powerlaw", 5000, seed=3)
+        for p in data[::3]:
+            p["monthly_revenue"] += 0.37
+        self.data = data
+        self.tree = MLMTree(data)
+        self.commissions = CommissionCalculator(self.tree).calculate_commissions()
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_top(self, fixed_point):
+        """Тест що top збігається з повним сортуванням, рівні - у порядку входу"""
+        commissions = CommissionCalculator(self.tree, fixed_point).calculate_commissions()
+        expected = sorted(commissions.items(), key=lambda item: -item[1])[:100]
+
+        top = CommissionReport(self.tree, fixed_point).top(100)
+
+        assert [(str(pid), c) for pid, c in top] == expected
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    @pytest.mark.parametrize("threshold", [0.0, 0.01, 2.5, 12.34, 10**9])
+    def test_above(self, fixed_point, threshold):
+        """Тест порогу, включно з комісіями рівно на порозі"""
+        commissions = CommissionCalculator(self.tree, fixed_point).calculate_commissions()
+
+        above = CommissionReport(self.tree, fixed_point).above(threshold)
+
+        assert [(str(pid), c) for pid, c in above] == [(pid, c) for pid, c in commissions.items() if c >= threshold]
+
+    def test_threshold_boundary(self):
+        """Тест що сума, яка округлюється рівно до порогу, потрапляє у звіт"""
+        # Денний дохід нащадка 49.9 дає 2.495 -> 2.50 з HALF_UP
+        tree = MLMTree([
+            {"id": 1, "parent_id": None, "monthly_revenue": 0},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 1497},
+        ])
+
+        assert CommissionReport(tree).above(2.5) == [(1, 2.5)]
+        assert CommissionReport(tree).above(2.51) == []
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_percentiles(self, fixed_point):
+        """Тест перцентилів за найближчим рангом"""
+        commissions = list(CommissionCalculator(self.tree, fixed_point).calculate_commissions().values())
+        qs = [0, 1, 50, 90, 99, 99.9, 100]
+
+        result = CommissionReport(self.tree, fixed_point).percentiles(qs)
+
+        assert result == {q: nearest_rank(commissions, q) for q in qs}
+        with pytest.raises(ValueError):
+            CommissionReport(self.tree).percentiles([101])
+
+    def test_cli(self, tmp_path):
+        """Тест main з --top, --threshold і --percentiles"""
+        output = tmp_path / "report.json"
+
+        main(["--input", "dataset.json", "--output", str(output),
+              "--top", "3", "--threshold", "1", "--percentiles", "50,99"])
+
+        commissions = CommissionCalculator(MLMTree(json.load(open("dataset.json")))).calculate_commissions()
+        report = json.loads(output.read_text())
+        assert report["partners"] == len(commissions)
+        assert [(str(row["id"]), row["commission"]) for row in report["top"]] == \
+            sorted(commissions.items(), key=lambda item: -item[1])[:3]
+        assert report["threshold"]["count"] == sum(c >= 1 for c in commissions.values())
+        assert report["percentiles"] == {"50": nearest_rank(commissions.values(), 50),
+                                         "99": nearest_rank(commissions.values(), 99)}
+
+    @pytest.mark.parametrize("extra", [["--write-snapshot", "tree.snap"], ["--format", "csv"]],
+                             ids=["write-snapshot", "format"])
+    def test_cli_ignored_options_rejected(self, extra):
+        """Тест що опції, яких звіт не виконує, не губляться мовчки"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "report.json", "--top", "3", *extra])
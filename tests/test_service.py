@@ -0,0 +1,106 @@
+import asyncio
+import json
+import pytest
+from loadtest import run_load
+from main import load_tree
+from models.core import MLMTree, CommissionCalculator
+from service import CommissionService, start_server
+
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 2100},
+    {"id": 3, "parent_id": 1, "monthly_revenue": 1500},
+    {"id": 4, "parent_id": 2, "monthly_revenue": 900},
+]
+
+
+class TestService:
+    """Тести сервісу комісій з теплим деревом"""
+
+    def setup_method(self):
+        self.service = CommissionService(MLMTree(DATA))
+
+    def get(self, target):
+        status, payload = self.service.handle("GET", target)
+        assert status == 200, payload
+        return payload
+
+    def test_commission(self):
+        """Тест запиту комісії одного партнера"""
+        assert self.get("/commission/1") == {"id": 1, "commission": 7.5}
+        assert self.get("/commission/4") == {"id": 4, "commission": 0.0}
+
+    def test_top(self):
+        """Тест топу партнерів за комісією"""
+        assert self.get("/top?n=2") == [{"id": 1, "commission": 7.5}, {"id": 2, "commission": 1.5}]
+        assert len(self.get("/top?n=100")) == 4
+
+    def test_subtree(self):
+        """Тест сум денного доходу піддерева"""
+        assert self.get("/subtree/2") == {
+            "id": 2, "descendants_daily_revenue": 30.0, "subtree_daily_revenue": 100.0, "commission": 1.5}
+
+    def test_revenue_update_between_queries(self):
+        """Тест що зміна доходу оновлює комісії і топ"""
+        assert self.get("/top?n=1") == [{"id": 1, "commission": 7.5}]
+
+        status, payload = self.service.handle("POST", "/revenue", json.dumps({"id": 4, "monthly_revenue": 60000}).encode())
+
+        assert status == 200
+        assert payload == {"id": 4, "commission": 0.0}
+        assert self.get("/commission/2") == {"id": 2, "commission": 100.0}
+        assert self.get("/top?n=2") == [{"id": 1, "commission": 106.0}, {"id": 2, "commission": 100.0}]
+
+        tree = self.service.tree
+        expected = CommissionCalculator(MLMTree(
+            {"id": p.id, "parent_id": p.parent_id, "monthly_revenue": p.monthly_revenue}
+            for p in tree.partners.values())).calculate_commissions()
+        assert self.service.calculator.commissions == expected
+
+    @pytest.mark.parametrize("method, target, body, status", [
+        ("GET", "/commission/99", b"", 404),
+        ("GET", "/commission/abc", b"", 404),
+        ("GET", "/top?n=x", b"", 400),
+        ("GET", "/nowhere", b"", 404),
+        ("DELETE", "/commission/1", b"", 405),
+        ("POST", "/revenue", b"not json", 400),
+        ("POST", "/revenue", b'{"id": 1, "monthly_revenue": "lots"}', 400),
+        ("POST", "/revenue", b'{"id": 99, "monthly_revenue": 10}', 404),
+    ])
+    def test_errors(self, method, target, body, status):
+        """Тест кодів помилок"""
+        code, payload = self.service.handle(method, target, body)
+
+        assert code == status
+        assert "error" in payload
+
+    @pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", "1e400", "1" + "0" * 400],
+                             ids=["nan", "inf", "-inf", "float-overflow", "int-overflow"])
+    def test_non_finite_revenue_rejected(self, value):
+        """Тест що NaN, нескінченність і завеликі числа відхиляються, не змінюючи комісій"""
+        before = dict(self.service.calculator.commissions)
+        body = ('{"id": 4, "monthly_revenue": %s}' % value).encode()
+
+        status, payload = self.service.handle("POST", "/revenue", body)
+
+        assert status == 400
+        assert "finite" in payload["error"]
+        assert self.service.calculator.commissions == before
+        assert json.dumps(self.get("/top?n=4"), allow_nan=False)
+
+    def test_over_unix_socket(self, tmp_path):
+        """Тест HTTP поверх Unix сокета конкурентними клієнтами з loadtest"""
+        tree = load_tree("dataset.json")
+        service = CommissionService(tree)
+        path = str(tmp_path / "mlm.sock")
+
+        async def scenario():
+            server = await start_server(service, unix_path=path)
+            async with server:
+                return await run_load(list(tree.ids), clients=4, requests=50, unix_path=path)
+
+        latencies, elapsed = asyncio.run(scenario())
+
+        assert sum(len(v) for v in latencies.values()) == 200
+        assert elapsed > 0
@@ -0,0 +1,135 @@
+import json
+from array import array
+import pytest
+import main
+from main import load_tree, run
+from models.core import MLMTree, CommissionCalculator
+from utils.generators import generate_partners
+from utils.shards import expand_shards, read_shard, read_shards
+
+
+def write_shards(directory, data, count):
+    """Розкладає партнерів по файлах; батьки часто опиняються в іншому шарді"""
+    directory.mkdir()
+    size = -(-len(data) // count)
+    for k in range(count):
+        part = data[k * size:(k + 1) * size]
+        if k % 2:
+            (directory / f"part-{k:02d}.jsonl").write_text("".join(json.dumps(p) + "\n" for p in part))
+        else:
+            (directory / f"part-{k:02d}.json").write_text(json.dumps(part))
+    return directory
+
+
+class TestShards:
+    """Тести паралельного читання вивантаження з кількох файлів"""
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_same_tree_as_single_file(self, tmp_path, workers):
+        """Тест що шарди дають те саме дерево, що й один файл"""
+        data = list(generate_partners("random", 3000, seed=2))
+        directory = write_shards(tmp_path / "export", data, 7)
+
+        tree = load_tree(str(directory), workers=workers)
+        expected = MLMTree(data)
+
+        assert tree.ids == expected.ids
+        assert list(tree.parent_index) == list(expected.parent_index)
+        assert list(tree.order_index) == list(expected.order_index)
+        assert CommissionCalculator(tree).calculate_commissions() == \
+            CommissionCalculator(expected).calculate_commissions()
+
+    def test_glob_and_order(self, tmp_path):
+        """Тест glob шаблону і порядку файлів за іменем"""
+        directory = write_shards(tmp_path / "export", list(generate_partners("chain", 30)), 3)
+        (directory / "notes.txt").write_text("not a shard")
+
+        paths = expand_shards(str(directory / "part-*"))
+
+        assert [p.rsplit("/", 1)[1] for p in paths] == ["part-00.json", "part-01.jsonl", "part-02.json"]
+        assert expand_shards(str(directory)) == paths
+        with pytest.raises(FileNotFoundError):
+            expand_shards(str(tmp_path / "missing-*.json"))
+
+    def test_duplicates_across_shards(self, tmp_path):
+        """Тест що при дублікатах між шардами діє останній файл"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 2000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 600},
+        ]
+        directory = write_shards(tmp_path / "export", data, 2)
+
+        columns = read_shards(expand_shards(str(directory)), workers=2)
+        tree = MLMTree.from_columns(*columns)
+
+        assert tree.ids == [1, 2]
+        assert tree.partners[2].monthly_revenue == 600
+
+    def test_cli(self, tmp_path):
+        """Тест main.run з каталогом шардів і перевіркою входу"""
+        data = json.load(open("dataset.json"))
+        directory = write_shards(tmp_path / "export", data, 4)
+        output = tmp_path / "commissions.json"
+
+        run(str(directory), str(output), report_file=str(tmp_path / "report.json"), workers=2)
+
+        assert json.loads(output.read_text()) == CommissionCalculator(MLMTree(data)).calculate_commissions()
+        assert json.loads((tmp_path / "report.json").read_text())["ok"]
+
+    def test_cli_revenues_workers(self, tmp_path, monkeypatch):
+        """Тест що --workers доходить до розбору шардів і з --revenues"""
+        data = json.load(open("dataset.json"))
+        directory = write_shards(tmp_path / "export", data, 4)
+        revenues = tmp_path / "revenues.csv"
+        revenues.write_text("id,p1\n" + "".join(f"{p['id']},{p['monthly_revenue']}\n" for p in data))
+        calls = []
+
+        def spy(paths, workers=None):
+            calls.append(workers)
+            return read_shards(paths, workers)
+
+        monkeypatch.setattr(main, "read_shards", spy)
+        main.main(["--input", str(directory), "--output", str(tmp_path / "out.json"), "--revenues", str(revenues),
+                   "--workers", "3"])
+
+        result = json.loads((tmp_path / "out.json").read_text())
+        assert calls == [3]
+        assert {pid: c["p1"] for pid, c in result.items()} == CommissionCalculator(MLMTree(data)).calculate_commissions()
+
+    def test_compact_columns(self, tmp_path):
+        """Тест що цілі колонки передаються масивами, а рядкові id - списками"""
+        path = tmp_path / "part.jsonl"
+        rows = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 12.5},
+            {"id": 3, "parent_id": None, "monthly_revenue": 600},
+        ]
+        path.write_text("".join(json.dumps(p) + "\n" for p in rows))
+
+        ids, parents, roots, revenues = read_shard(str(path))
+
+        assert ids == array("q", [1, 2, 3]) and parents == array("q", [0, 1, 0])
+        assert roots == [0, 2]
+        assert revenues == array("d", [3000, 12.5, 600])
+
+        path.write_text(json.dumps([{"id": "a", "parent_id": None, "monthly_revenue": 1},
+                                    {"id": "b", "parent_id": "a", "monthly_revenue": 2}]))
+        ids, parents, roots, revenues = read_shard(str(path))
+
+        assert (ids, parents, roots, revenues) == (["a", "b"], [None, "a"], [0], array("q", [1, 2]))
+
+    def test_mixed_id_types_across_shards(self, tmp_path):
+        """Тест що шарди з числовими і рядковими id склеюються з коренями на місці"""
+        data = [
+            {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+            {"id": 2, "parent_id": 1, "monthly_revenue": 2000},
+            {"id": "x", "parent_id": None, "monthly_revenue": 900},
+            {"id": "y", "parent_id": 2, "monthly_revenue": 300},
+        ]
+        directory = write_shards(tmp_path / "export", data, 2)
+
+        tree = MLMTree.from_columns(*read_shards(expand_shards(str(directory)), workers=2))
+
+        assert tree.ids == [1, 2, "x", "y"]
+        assert [tree.partners[pid].parent_id for pid in tree.ids] == [None, 1, None, 2]
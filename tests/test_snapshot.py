@@ -0,0 +1,111 @@
+import pytest
+from main import load_partners, load_tree
+from models.core import MLMTree, CommissionCalculator
+from models.columnar import ColumnarTree, VectorizedCommissionCalculator
+from models.parallel import ParallelCommissionCalculator
+from utils.snapshot import is_snapshot, write_snapshot
+from utils.generators import random_partners
+
+
+class TestSnapshot:
+    """Тести бінарного знімка дерева"""
+
+    def test_roundtrip_dataset(self, tmp_path):
+        """Тест що дерево зі знімка дає ті ж комісії, що й з JSON"""
+        path = tmp_path / "tree.snap"
+        tree = MLMTree(load_partners("dataset.json"))
+        write_snapshot(tree, path)
+
+        loaded = MLMTree.from_snapshot(path)
+
+        assert is_snapshot(path)
+        assert not is_snapshot("dataset.json")
+        assert list(loaded.ids) == tree.ids
+        assert list(loaded.monthly_revenue) == tree.monthly_revenue
+        assert all(type(v) is int for v in loaded.monthly_revenue)
+        assert CommissionCalculator(loaded).calculate_commissions() == CommissionCalculator(tree).calculate_commissions()
+
+    def test_columns_are_memory_mapped(self, tmp_path):
+        """Тест що колонки не копіюються в пам'ять процесу"""
+        path = tmp_path / "tree.snap"
+        write_snapshot(MLMTree(random_partners(100, 1, id_step=7)), path)
+
+        tree = MLMTree.from_snapshot(path)
+
+        assert isinstance(tree.ids, memoryview)
+        assert tree.ids.readonly
+        assert tree._index is None  # Словник id -> індекс ще не будувався
+
+    def test_orphans_and_float_revenue(self, tmp_path):
+        """Тест що сироти, дублікати і дробові доходи переживають знімок"""
+        data = random_partners(500, 2, id_step=7) + [
+            {"id": 7, "parent_id": None, "monthly_revenue": 12.5},  # Дублікат кореня
+            {"id": 9001, "parent_id": 9999, "monthly_revenue": 900},  # Батька не існує
+            {"id": 9002, "parent_id": 9001, "monthly_revenue": 600},
+        ]
+        path = tmp_path / "tree.snap"
+        write_snapshot(MLMTree(data), path)
+
+        tree = MLMTree.from_snapshot(path)
+
+        assert tree.partners[9001].parent_id == 9999
+        assert tree.partners[7].monthly_revenue == 12.5
+        assert CommissionCalculator(tree).calculate_commissions() == CommissionCalculator(MLMTree(data)).calculate_commissions()
+
+        # Партнер, доданий пізніше, приймає сиріт так само, як при повній побудові
+        calculator = CommissionCalculator(tree)
+        calculator.calculate_commissions()
+        calculator.add_partner(9999, 7, 300)
+        expected = CommissionCalculator(MLMTree(data + [{"id": 9999, "parent_id": 7, "monthly_revenue": 300}]))
+
+        assert calculator.commissions == expected.calculate_commissions()
+
+    def test_edits_copy_on_write(self, tmp_path):
+        """Тест що зміни не пишуть у файл знімка"""
+        data = random_partners(200, 3, id_step=7)
+        path = tmp_path / "tree.snap"
+        write_snapshot(MLMTree(data), path)
+
+        calculator = CommissionCalculator(MLMTree.from_snapshot(path))
+        calculator.calculate_commissions()
+        calculator.update_revenue(14, 5000)
+        calculator.move_partner(21, 7)
+
+        assert calculator.tree.partners[14].monthly_revenue == 5000
+        assert MLMTree.from_snapshot(path).partners[14].monthly_revenue == data[1]["monthly_revenue"]
+        assert calculator.tree.partners[21].parent_id == 7
+
+    def test_other_calculators(self, tmp_path):
+        """Тест що колонковий і паралельний калькулятори читають знімок"""
+        data = random_partners(2000, 4, id_step=7)
+        path = tmp_path / "tree.snap"
+        write_snapshot(MLMTree(data), path)
+
+        tree = MLMTree.from_snapshot(path)
+        expected = CommissionCalculator(MLMTree(data)).calculate_commissions()
+
+        assert VectorizedCommissionCalculator(ColumnarTree.from_tree(tree)).calculate_commissions() == expected
+        assert ParallelCommissionCalculator(tree, workers=2).calculate_commissions() == expected
+
+    def test_load_tree_detects_format(self, tmp_path):
+        """Тест що main.load_tree приймає і JSON, і знімок"""
+        path = tmp_path / "tree.snap"
+        write_snapshot(load_tree("dataset.json"), path)
+
+        assert isinstance(load_tree(str(path)).ids, memoryview)
+        assert isinstance(load_tree("dataset.json").ids, list)
+
+    def test_non_integer_ids_rejected(self, tmp_path):
+        """Тест що рядкові id не вміщуються в колонку int64"""
+        tree = MLMTree([{"id": "a", "parent_id": None, "monthly_revenue": 100}])
+
+        with pytest.raises(ValueError, match="64-bit integers"):
+            write_snapshot(tree, tmp_path / "tree.snap")
+
+    def test_not_a_snapshot(self, tmp_path):
+        """Тест що чужий файл не відкривається як знімок"""
+        path = tmp_path / "tree.snap"
+        path.write_bytes(b"not a snapshot at all, just some bytes here....................")
+
+        with pytest.raises(ValueError, match="not a partner snapshot"):
+            MLMTree.from_snapshot(path)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import sqlite3
+import pytest
+from main import main, parse_args
+from models.core import MLMTree, CommissionCalculator
+from utils.generators import generate_partners
+from utils.sqlite_store import (cross_check, cte_commissions, cte_subtree_sums, import_partners, is_sqlite,
+                                iter_rows, read_commissions, read_tree, write_commissions)
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 1500.0},
+    {"id": "3", "parent_id": 2, "monthly_revenue": 12.34},
+    {"id": 4, "parent_id": "missing", "monthly_revenue": 900},
+    {"id": 5, "parent_id": 4, "monthly_revenue": 600},
+    {"id": 2, "parent_id": 4, "monthly_revenue": 2100},
+]
+
+
+class TestSqliteStore:
+    """Тести сховища партнерів і комісій у SQLite"""
+
+    def test_roundtrip(self, tmp_path):
+        """Тест що дерево з бази дає ті самі комісії в тому самому порядку, що й з JSON"""
+        db = str(tmp_path / "partners.db")
+        data = generate_partners("powerlaw", 3000, seed=2) + DATA
+
+        assert import_partners(db, iter(data), batch_size=500) == len(data)
+        tree = read_tree(db, batch_size=700)
+
+        assert is_sqlite(db)
+        assert list(tree.ids) == list(MLMTree(data).ids)
+        assert list(CommissionCalculator(tree).calculate_commissions().items()) == \
+            list(CommissionCalculator(MLMTree(data)).calculate_commissions().items())
+
+    def test_types_preserved(self, tmp_path):
+        """Тест що int, float і рядкові id зберігаються без перетворення"""
+        db = str(tmp_path / "partners.db")
+        import_partners(db, DATA)
+        tree = read_tree(db)
+
+        assert tree.ids == [1, 2, "3", 4, 5]
+        assert [type(v) for v in tree.monthly_revenue] == [int, int, float, int, int]
+
+    def test_recursive_cte(self, tmp_path):
+        """Тест що WITH RECURSIVE дає ті самі суми нащадків з дублікатами і сиротами"""
+        db = str(tmp_path / "partners.db")
+        # Доходи кратні 30, тож денні суми точні в будь-якому порядку додавань
+        data = [dict(p, monthly_revenue=p["monthly_revenue"] * 30) for p in generate_partners("random", 2000, seed=3)]
+        data += [dict(p, monthly_revenue=300) for p in DATA]
+        import_partners(db, data)
+
+        expected = CommissionCalculator(MLMTree(data)).calculate_commissions()
+        sums = cte_subtree_sums(db)
+
+        assert [pid for pid, _ in sums] == list(MLMTree(data).ids)
+        assert cte_commissions(db) == expected
+        assert cross_check(db) == []
+
+    def test_cross_check_float_revenue(self, tmp_path):
+        """Тест що дробові доходи розходяться не більше ніж на похибку float"""
+        db = str(tmp_path / "partners.db")
+        import_partners(db, generate_partners("kary", 3000, seed=1) + DATA)
+
+        assert cross_check(db) == []
+
+    def test_cycle(self, tmp_path):
+        """Тест що цикл у таблиці дає ValueError, а не нескінченну рекурсію"""
+        db = str(tmp_path / "partners.db")
+        import_partners(db, [
+            {"id": 1, "parent_id": None, "monthly_revenue": 100},
+            {"id": 2, "parent_id": 3, "monthly_revenue": 100},
+            {"id": 3, "parent_id": 2, "monthly_revenue": 100},
+        ])
+
+        with pytest.raises(ValueError, match="Cycle detected"):
+            cte_subtree_sums(db)
+
+    def test_write_commissions(self, tmp_path):
+        """Тест що запис замінює попередні комісії"""
+        db = str(tmp_path / "out.db")
+        write_commissions(db, [(1, 5.0), ("x", 0.25)])
+        write_commissions(db, iter([(1, 2.5), (2, 0.0)]), batch_size=1)
+
+        assert read_commissions(db) == {"1": 2.5, "2": 0.0}
+
+    def test_cli(self, tmp_path):
+        """Тест main з базою на вході і --format sqlite на виході"""
+        db = str(tmp_path / "partners.db")
+        output = str(tmp_path / "commissions.db")
+        data = json.load(open("dataset.json"))
+        import_partners(db, data)
+
+        main(["--input", db, "--output", output, "--format", "sqlite", "--validate", str(tmp_path / "report.json")])
+
+        assert read_commissions(output) == CommissionCalculator(MLMTree(data)).calculate_commissions()
+
+    def test_input_opened_read_only(self, tmp_path):
+        """Тест що читання бази не змінює режим журналу і не створює таблиць"""
+        db = tmp_path / "partners.db"
+        connection = sqlite3.connect(db)
+        with connection:
+            connection.execute("CREATE TABLE partners (id, parent_id, monthly_revenue)")
+            connection.executemany("INSERT INTO partners VALUES (?, ?, ?)",
+                                   [(p["id"], p["parent_id"], p["monthly_revenue"]) for p in DATA])
+        connection.close()
+        digest = hashlib.sha256(db.read_bytes()).hexdigest()
+
+        tree = read_tree(str(db))
+        assert [p["id"] for p in iter_rows(str(db))] == [p["id"] for p in DATA]
+        assert cte_commissions(str(db)) == CommissionCalculator(tree).calculate_commissions()
+        assert cross_check(str(db)) == []
+
+        assert hashlib.sha256(db.read_bytes()).hexdigest() == digest
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["partners.db"]
+        connection = sqlite3.connect(db)
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+        assert connection.execute("SELECT name FROM sqlite_master").fetchall() == [("partners",)]
+        connection.close()
+
+    def test_missing_input(self, tmp_path):
+        """Тест що відсутня база - помилка, а не нова порожня база"""
+        with pytest.raises(sqlite3.OperationalError):
+            read_tree(str(tmp_path / "missing.db"))
+        assert not (tmp_path / "missing.db").exists()
+
+    def test_cli_revenues_rejected(self):
+        """Тест що комісії за періодами не пишуться в таблицю commissions"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.db", "--revenues", "matrix.csv",
+                        "--format", "sqlite"])
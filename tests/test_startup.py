@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модулі, які звичайний запуск main.py не повинен імпортувати. orjson чи
+# msgspec тут немає: JSON вхід і вихід за замовчуванням іде через utils.codec
+HEAVY = ("numpy", "concurrent.futures", "multiprocessing", "logging", "cProfile", "csv",
+         "fractions", "pickle", "sqlite3", "models.columnar", "models.plans", "models.validation")
+
+# Бюджет сумарного часу імпортів холодного старту, з запасом на повільний CI
+IMPORT_BUDGET_US = 150_000
+
+
+def import_times(*args):
+    """Запускає main.py з -X importtime і повертає {модуль: (власний, сумарний час у мкс, верхній рівень)}"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "main.py", *args],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative), not name[1:].startswith(" "))
+    return times
+
+
+class TestStartup:
+    """Тести часу холодного старту main.py"""
+
+    def test_plain_run_skips_heavy_modules(self, tmp_path):
+        """Тест що звичайний запуск не імпортує NumPy, пул процесів і опційні частини"""
+        output = tmp_path / "commissions.json"
+
+        times = import_times("--input", "dataset.json", "--output", str(output))
+
+        assert json.loads(output.read_text())
+        assert [name for name in times if name.split(".")[0] in HEAVY or name in HEAVY] == []
+        assert "utils.codec" in times
+
+    def test_import_budget(self, tmp_path):
+        """Тест що сумарний час імпортів холодного старту в межах бюджету"""
+        times = import_times("--input", "dataset.json", "--output", str(tmp_path / "commissions.json"))
+
+        total = sum(cumulative for _, cumulative, top in times.values() if top)
+        assert total < IMPORT_BUDGET_US, sorted(times.items(), key=lambda item: -item[1][1])[:10]
+
+    def test_options_import_on_demand(self, tmp_path):
+        """Тест що опції підтягують свої модулі"""
+        times = import_times("--input", "dataset.json", "--output", str(tmp_path / "out.csv"),
+                             "--format", "csv", "--plan", "5,3", "--metrics-log")
+
+        assert {"csv", "models.plans", "logging"} <= set(times)
+        assert "numpy" not in times
@@ -0,0 +1,76 @@
+import io
+import json
+import pytest
+from main import load_partners, save_commissions
+from models.core import MLMTree, CommissionCalculator
+from utils.streaming import iter_json_array, iter_json_lines, iter_partners, write_json_object
+
+
+class TestStreaming:
+    """Тести потокового читання і запису"""
+
+    def test_json_array_small_chunks(self):
+        """Тест що розбір не залежить від того, де обірвався шматок"""
+        with open("dataset.json", encoding="utf-8") as f:
+            text = f.read()
+        expected = json.loads(text)
+
+        # chunk_size=1 обриває кожен об'єкт і кожне число посередині
+        for chunk_size in (1, 7, 64):
+            assert list(iter_json_array(io.StringIO(text), chunk_size)) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        ("[]", []),
+        ("  [ ]  ", []),
+        ('[{"id": 1}]', [{"id": 1}]),
+        ('\n[\n 1 , 22,333 ]', [1, 22, 333]),
+    ])
+    def test_json_array_edge_cases(self, text, expected):
+        """Тест порожніх масивів, пробілів і чисел на межі шматка"""
+        assert list(iter_json_array(io.StringIO(text), chunk_size=2)) == expected
+
+    @pytest.mark.parametrize("text", ["", "{}", '[{"id": 1}', '[{"id": 1} {"id": 2}]', '[{"id": '])
+    def test_json_array_invalid(self, text):
+        """Тест що зламаний JSON викликає помилку"""
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array(io.StringIO(text), chunk_size=3))
+
+    def test_json_lines(self):
+        """Тест JSON Lines з порожніми рядками"""
+        text = '{"id": 1}\n\n{"id": 2}\n'
+
+        assert list(iter_json_lines(io.StringIO(text))) == [{"id": 1}, {"id": 2}]
+
+    def test_iter_partners_detects_format(self, tmp_path):
+        """Тест що iter_partners однаково читає масив і JSON Lines"""
+        partners = load_partners("dataset.json")
+        jsonl = tmp_path / "partners.jsonl"
+        jsonl.write_text("\n".join(json.dumps(p) for p in partners), encoding="utf-8")
+
+        assert list(iter_partners(str(jsonl))) == partners
+        assert list(iter_partners("dataset.json")) == partners
+
+    def test_tree_from_stream(self):
+        """Тест що дерево з потоку дає ті ж комісії"""
+        expected = CommissionCalculator(MLMTree(load_partners("dataset.json"))).calculate_commissions()
+        streamed = CommissionCalculator(MLMTree(iter_partners("dataset.json")))
+
+        assert dict(streamed.iter_commissions()) == expected
+
+    @pytest.mark.parametrize("data", [{}, {"1": 7.5}, {"1": 1505.92, "2": 0.0, "3": 1e-05}])
+    def test_write_matches_json_dump(self, data):
+        """Тест що потоковий запис побайтово збігається з json.dump(indent=2)"""
+        out = io.StringIO()
+        write_json_object(iter(data.items()), out)
+
+        assert out.getvalue() == json.dumps(data, indent=2)
+
+    def test_save_commissions_from_generator(self, tmp_path):
+        """Тест збереження комісій з генератора"""
+        calculator = CommissionCalculator(MLMTree(load_partners("dataset.json")))
+        path = tmp_path / "commissions.json"
+
+        save_commissions(calculator.iter_commissions(), str(path))
+
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f) == calculator.calculate_commissions()
@@ -0,0 +1,69 @@
+import json
+import pytest
+from main import load_ids, parse_args, run
+from models.core import MLMTree, CommissionCalculator
+from utils.generators import generate_partners
+
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 2100},
+    {"id": 3, "parent_id": 1, "monthly_revenue": 1500},
+    {"id": 4, "parent_id": 2, "monthly_revenue": 900},
+    {"id": 5, "parent_id": 4, "monthly_revenue": 600},
+    {"id": 6, "parent_id": 3, "monthly_revenue": 300},
+]
+
+
+class TestSubsetCommissions:
+    """Тести комісій лише для вибраних партнерів"""
+
+    def test_touches_only_requested_subtrees(self):
+        """Тест що memo містить лише вузли піддерев запитаних партнерів"""
+        calculator = CommissionCalculator(MLMTree(DATA))
+
+        result = dict(calculator.iter_commissions_for([4, 2]))
+
+        assert result == {"4": 1.0, "2": 2.5}
+        assert set(calculator.memo) == {2, 4, 5}
+        assert calculator.commissions is None
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_matches_full_run(self, fixed_point):
+        """Тест що вибрані комісії ідентичні повному розрахунку"""
+        tree = MLMTree(generate_partners("powerlaw", 5000, seed=1))
+        full = CommissionCalculator(tree, fixed_point=fixed_point).calculate_commissions()
+        ids = tree.ids[::97]
+
+        subset = dict(CommissionCalculator(tree, fixed_point=fixed_point).iter_commissions_for(ids))
+
+        assert subset == {str(pid): full[str(pid)] for pid in ids}
+
+    def test_unknown_id(self):
+        """Тест що невідомий партнер дає KeyError"""
+        with pytest.raises(KeyError):
+            list(CommissionCalculator(MLMTree(DATA)).iter_commissions_for([99]))
+
+    def test_cli_ids(self, tmp_path):
+        """Тест --ids і --ids-file у конвеєрі main.run"""
+        ids_file = tmp_path / "ids.txt"
+        ids_file.write_text("3\n\n2\n")
+        output = tmp_path / "commissions.json"
+
+        ids = load_ids("1,3", str(ids_file))
+        run("dataset.json", str(output), ids=ids)
+
+        full = CommissionCalculator(MLMTree(json.load(open("dataset.json")))).calculate_commissions()
+        assert ids == ["1", "3", "2"]
+        assert json.loads(output.read_text()) == {pid: full[pid] for pid in ids}
+
+        with pytest.raises(ValueError):
+            run("dataset.json", str(output), ids=["nobody"])
+
+    @pytest.mark.parametrize("option", [["--ids", "1"], ["--ids-file", "ids.txt"]])
+    def test_cli_ids_with_revenues_rejected(self, option, capsys):
+        """Тест що --ids з --revenues не ігнорується мовчки"""
+        with pytest.raises(SystemExit):
+            parse_args(["--input", "dataset.json", "--output", "out.json", "--revenues", "revenues.csv", *option])
+
+        assert "--ids" in capsys.readouterr().err
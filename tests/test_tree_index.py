@@ -0,0 +1,91 @@
+import random
+import numpy as np
+import pytest
+from models.core import MLMTree
+from models.tree_index import TreeIndex
+from utils.generators import generate_partners
+
+
+def descendants(tree, i):
+    offsets, child_index = tree.csr()
+    stack, found = list(child_index[offsets[i]:offsets[i + 1]]), []
+    while stack:
+        k = stack.pop()
+        found.append(k)
+        stack.extend(child_index[offsets[k]:offsets[k + 1]])
+    return found
+
+
+def ancestors(tree, i):
+    chain = []
+    while i >= 0:
+        chain.append(i)
+        i = tree.parent_index[i]
+    return chain
+
+
+class TestTreeIndex:
+    """Тести індексу дерева для запитів по піддеревах і предках"""
+
+    def setup_method(self):
+        data = generate_partners("random", 800, seed=4)
+        # Сирота - корінь окремого дерева
+        data.append({"id": "orphan", "parent_id": "missing", "monthly_revenue": 77})
+        data.append({"id": "leaf", "parent_id": "orphan", "monthly_revenue": 5})
+        self.tree = MLMTree(data)
+        self.index = TreeIndex(self.tree)
+        self.pairs = [(random.Random(k).randrange(len(data)), random.Random(-k).randrange(len(data)))
+                      for k in range(300)]
+
+    def test_subtree_revenue(self):
+        """Тест доходу піддерева з партнером і без нього"""
+        tree, ids = self.tree, self.tree.ids
+        for i, _ in self.pairs:
+            below = sum(tree.monthly_revenue[k] for k in descendants(tree, i))
+            assert self.index.subtree_revenue(ids[i], include_self=False) == pytest.approx(below)
+            assert self.index.subtree_revenue(ids[i]) == pytest.approx(below + tree.monthly_revenue[i])
+
+    def test_in_downline(self):
+        """Тест перевірки "A в мережі B" проти обходу мережі B"""
+        tree, ids = self.tree, self.tree.ids
+        for i, j in self.pairs:
+            assert self.index.in_downline(ids[i], ids[j]) == (i in descendants(tree, j))
+            assert not self.index.in_downline(ids[i], ids[i])
+
+    def test_lca(self):
+        """Тест найнижчого спільного спонсора, включно з предком і різними деревами"""
+        tree, ids = self.tree, self.tree.ids
+        for i, j in self.pairs + [(0, 5), (5, 0)]:
+            common = set(ancestors(tree, j))
+            expected = next((k for k in ancestors(tree, i) if k in common), None)
+            assert self.index.lca(ids[i], ids[j]) == (ids[expected] if expected is not None else None)
+        assert self.index.lca("leaf", ids[3]) is None
+        assert self.index.depth("leaf") == 1
+
+    def test_update_revenue(self):
+        """Тест змін доходу через дерево Фенвіка"""
+        tree, ids = self.tree, self.tree.ids
+        rnd = random.Random(7)
+        revenue = list(tree.monthly_revenue)
+        for i, j in self.pairs[:100]:
+            revenue[i] = rnd.randrange(10_000)
+            self.index.update_revenue(ids[i], revenue[i])
+            expected = revenue[j] + sum(revenue[k] for k in descendants(tree, j))
+            assert self.index.subtree_revenue(ids[j]) == pytest.approx(expected)
+        # Дерево не змінюється
+        assert list(tree.monthly_revenue) != revenue
+
+    def test_period_revenue(self):
+        """Тест доходу піддерева за проміжок періодів"""
+        tree = self.tree
+        periods = ["2024-01", "2024-02", "2024-03", "2024-04"]
+        matrix = np.random.default_rng(1).integers(0, 1000, size=(len(tree.ids), len(periods))).astype(float)
+        index = TreeIndex(tree, matrix, periods)
+
+        for i, _ in self.pairs[:50]:
+            rows = [i, *descendants(tree, i)]
+            assert index.period_revenue(tree.ids[i], "2024-02", "2024-03") == matrix[rows, 1:3].sum()
+            assert index.period_revenue(tree.ids[i], "2024-04", "2024-04", include_self=False) == \
+                matrix[rows[1:], 3].sum()
+        with pytest.raises(ValueError):
+            self.index.period_revenue(tree.ids[0], "2024-01", "2024-02")
@@ -0,0 +1,121 @@
+import json
+import pytest
+from main import main, run
+from utils.snapshot import write_snapshot
+from models.core import MLMTree
+from models.validation import validate_partners
+from utils.generators import generate_partners
+
+
+def record(pid, parent_id):
+    return {"id": pid, "parent_id": parent_id, "monthly_revenue": 100}
+
+
+class TestValidation:
+    """Тести перевірки входу одним проходом"""
+
+    def test_valid_tree(self):
+        """Тест що коректне дерево не має зауважень"""
+        report = validate_partners(generate_partners("random", 2000, seed=5))
+
+        assert report.ok
+        assert report.partners == report.records == 2000
+        assert not report.cycles and not report.detached
+
+    def test_reports_every_problem(self):
+        """Тест що звіт містить усі цикли, сиріт і дублікати, а не перший"""
+        data = [
+            record(1, None),
+            record(2, 1),
+            record(3, 4), record(4, 5), record(5, 3),   # цикл 3 -> 4 -> 5
+            record(6, 3), record(7, 6),                 # висять під циклом
+            record(8, 8),                               # сам собі батько
+            record(9, 100), record(10, 200),            # сироти
+            record(2, 1), record(2, 1), record(9, 100),  # дублікати
+        ]
+
+        report = validate_partners(data)
+
+        assert not report.ok
+        assert report.partners == 10 and report.records == 13
+        assert report.duplicates == {2: 3, 9: 2}
+        assert report.orphans == {9: 100, 10: 200}
+        assert sorted(sorted(c) for c in report.cycles) == [[3, 4, 5], [8]]
+        assert sorted(report.detached) == [6, 7]
+
+    def test_cycle_order_follows_parents(self):
+        """Тест що цикл перелічено від вузла до його предків"""
+        report = validate_partners([record(1, 3), record(2, 1), record(3, 2)])
+
+        cycle = report.cycles[0]
+        assert len(cycle) == 3
+        parents = {1: 3, 2: 1, 3: 2}
+        assert all(parents[cycle[k]] == cycle[(k + 1) % 3] for k in range(3))
+
+    def test_last_duplicate_wins(self):
+        """Тест що дублікат, який розриває цикл, враховується як у MLMTree"""
+        data = [record(1, 2), record(2, 1), record(1, None)]
+
+        report = validate_partners(data)
+
+        assert report.cycles == []
+        MLMTree(data)
+
+    def test_long_chain_cycle(self):
+        """Тест що довгий цикл не впирається в рекурсію"""
+        n = 200_000
+        data = [record(i, (i + 1) % n) for i in range(n)]
+
+        report = validate_partners(data)
+
+        assert len(report.cycles) == 1 and len(report.cycles[0]) == n
+
+    def test_cli_report(self, tmp_path):
+        """Тест що --validate записує звіт і не рахує комісії при циклі"""
+        source = tmp_path / "partners.json"
+        report_file = tmp_path / "report.json"
+        output = tmp_path / "commissions.json"
+        source.write_text(json.dumps([record(1, None), record(2, 99), record(3, 4), record(4, 3)]))
+
+        with pytest.raises(ValueError, match="1 cycles"):
+            run(str(source), str(output), report_file=str(report_file))
+
+        report = json.loads(report_file.read_text())
+        assert report["orphans"] == [{"id": 2, "parent_id": 99}]
+        assert len(report["cycles"]) == 1
+        assert not output.exists()
+
+        run("dataset.json", str(output), report_file=str(report_file))
+        assert json.loads(report_file.read_text())["ok"]
+        assert output.exists()
+
+    def test_cli_revenues(self, tmp_path):
+        """Тест що --validate з --revenues теж перевіряє вхід і пише звіт"""
+        source = tmp_path / "partners.json"
+        revenues = tmp_path / "revenues.csv"
+        report_file = tmp_path / "report.json"
+        output = tmp_path / "commissions.json"
+        source.write_text(json.dumps([record(1, None), record(2, 99), record(3, 4), record(4, 3)]))
+        revenues.write_text("id,p1\n1,300\n")
+        args = ["--input", str(source), "--output", str(output), "--revenues", str(revenues),
+                "--validate", str(report_file)]
+
+        with pytest.raises(ValueError, match="1 cycles"):
+            main(args)
+
+        assert json.loads(report_file.read_text())["orphans"] == [{"id": 2, "parent_id": 99}]
+        assert not output.exists()
+
+    def test_snapshot_rejected(self, tmp_path, capsys):
+        """Тест що --validate для знімка дає помилку, а не мовчить"""
+        snapshot = tmp_path / "tree.snap"
+        write_snapshot(MLMTree(generate_partners("random", 50)), str(snapshot))
+
+        with pytest.raises(SystemExit):
+            main(["--input", str(snapshot), "--output", str(tmp_path / "out.json"),
+                  "--validate", str(tmp_path / "report.json")])
+        with pytest.raises(ValueError, match="snapshot"):
+            run(str(snapshot), str(tmp_path / "out.json"), report_file=str(tmp_path / "report.json"))
+
+        assert "--validate" in capsys.readouterr().err
+        assert not (tmp_path / "out.json").exists()
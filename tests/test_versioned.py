@@ -0,0 +1,140 @@
+import sys
+import threading
+import pytest
+from models.core import MLMTree, CommissionCalculator
+from models.versioned import VersionedCommissions
+from utils.generators import generate_partners
+
+DATA = [
+    {"id": 1, "parent_id": None, "monthly_revenue": 3000},
+    {"id": 2, "parent_id": 1, "monthly_revenue": 1500.0},
+    {"id": "3", "parent_id": 2, "monthly_revenue": 12.34},
+    {"id": 4, "parent_id": "missing", "monthly_revenue": 900},
+    {"id": 5, "parent_id": 4, "monthly_revenue": 600},
+    {"id": 2, "parent_id": 4, "monthly_revenue": 2100},
+]
+
+
+def expected_commissions(data, revenue, fixed_point=False):
+    tree = MLMTree(data)
+    tree.monthly_revenue = list(revenue)
+    return tuple(c for _, c in CommissionCalculator(tree, fixed_point).iter_commissions(str_ids=False))
+
+
+class TestVersionedCommissions:
+    """Тести версійних знімків комісій"""
+
+    def setup_method(self):
+        self.data = generate_partners("powerlaw", 3000, seed=4) + DATA
+        for p in self.data[::4]:
+            p["monthly_revenue"] += 0.37
+        self.tree = MLMTree(self.data)
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_matches_calculator(self, fixed_point):
+        """Тест що версія 0 біт-в-біт збігається з CommissionCalculator"""
+        if fixed_point:
+            for p in self.data:
+                p["monthly_revenue"] = round(p["monthly_revenue"], 2)
+            self.tree = MLMTree(self.data)
+        calculator = CommissionCalculator(self.tree, fixed_point)
+        expected = calculator.calculate_commissions()
+
+        snapshot = VersionedCommissions(self.tree, fixed_point).current
+
+        assert snapshot.version == 0
+        assert dict(snapshot.items()) == expected
+        assert list(snapshot.totals) == [calculator.memo[pid] for pid in self.tree.ids]
+        assert snapshot.commission(2) == expected["2"]
+        assert [(str(pid), c) for pid, c in snapshot.top(5)] == sorted(expected.items(), key=lambda item: -item[1])[:5]
+
+    def test_recompute(self):
+        """Тест що перерахунок публікує нову версію і не змінює старий знімок"""
+        store = VersionedCommissions(self.tree)
+        old = store.current
+        revenue = [r * 2 for r in self.tree.monthly_revenue]
+
+        new = store.recompute(revenue)
+
+        assert store.current is new
+        assert new.version == 1
+        assert new.commissions == expected_commissions(self.data, revenue)
+        assert old.commissions == expected_commissions(self.data, self.tree.monthly_revenue)
+        with pytest.raises(ValueError):
+            store.recompute(revenue[:-1])
+
+    def test_recompute_async(self):
+        """Тест фонового перерахунку"""
+        store = VersionedCommissions(self.tree)
+        revenue = [r + 30 for r in self.tree.monthly_revenue]
+
+        snapshot = store.recompute_async(revenue).result()
+        store.close()
+
+        assert store.current is snapshot
+        assert snapshot.commissions == expected_commissions(self.data, revenue)
+
+    @pytest.mark.parametrize("fixed_point", [False, True])
+    def test_update_revenue(self, fixed_point):
+        """Тест що копіювання з перерахунком предків дає ті самі комісії, що й повний перерахунок"""
+        store = VersionedCommissions(self.tree, fixed_point)
+        updates = {self.tree.ids[i]: 1234.56 for i in range(0, len(self.tree.ids), 97)}
+        updates[1] = 0
+        updates["3"] = 45.5
+
+        old = store.current
+        snapshot = store.update_revenue(updates)
+
+        full = VersionedCommissions(self.tree, fixed_point).recompute(updates)
+        assert snapshot.commissions == full.commissions
+        assert snapshot.totals == full.totals
+        assert old.version == 0 and snapshot.version == 1
+        assert old.revenue == tuple(self.tree.monthly_revenue)
+
+    def test_concurrent_readers(self):
+        """Стрес-тест: читачі бачать лише повні версії, і номери версій не спадають"""
+        versions = 12
+        base = [round(r, 2) for r in self.tree.monthly_revenue]
+        feeds = [[r * (k + 1) for r in base] for k in range(versions + 1)]
+        expected = [expected_commissions(self.data, feed) for feed in feeds]
+
+        store = VersionedCommissions(self.tree)
+        store.recompute(feeds[0])
+        position = self.tree.index[2]
+        done = threading.Event()
+        errors = []
+        seen = []
+
+        def reader():
+            last, reads = 0, 0
+            try:
+                while not done.is_set():
+                    snapshot = store.current
+                    assert snapshot.version >= last
+                    assert snapshot.commissions == expected[snapshot.version - 1]
+                    assert snapshot.commission(2) == expected[snapshot.version - 1][position]
+                    last = snapshot.version
+                    reads += 1
+            except AssertionError as e:
+                errors.append(e)
+            seen.append(reads)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            readers = [threading.Thread(target=reader) for _ in range(4)]
+            for thread in readers:
+                thread.start()
+            for feed in feeds[1:]:
+                store.recompute_async(feed).result()
+            done.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+            store.close()
+
+        assert errors == []
+        assert store.current.version == versions + 1
+        assert all(reads > 0 for reads in seen)
+
@@ -1,34 +1,284 @@
 """
-Декоратор для вимірювання часу виконання функцій.
+Інструментування фаз конвеєра: час, пам'ять і профілювання.
+
+Кожна фаза (phase або декоратор benchmark) по завершенні створює подію -
+словник з назвою фази, тривалістю, піком пам'яті і довільними мітками.
+Події отримують усі зареєстровані приймачі (add_sink):
+
+- LogSink - один рядок logfmt у logging
+- JsonLinesSink - JSON об'єкт на рядок у файлі
+- PrometheusSink - textfile для node_exporter з останнім значенням кожної фази
+
+Без приймачів фаза лише міряє час і нічого не виводить.
+
+Пік пам'яті Python-об'єктів (peak_traced_bytes) доступний, лише коли
+tracemalloc увімкнено (наприклад через python -X tracemalloc), бо
+трасування помітно сповільнює роботу. Пік RSS процесу (max_rss_bytes)
+береться з getrusage і доступний завжди на Unix.
+
+Щоб виміряти пік саме фази, phase скидає глобальний пік tracemalloc на
+вході. Тож код поза фазами, який міряє пік навколо них, має брати його з
+traced_peak (і скидати reset_traced_peak), а не з
+tracemalloc.get_traced_memory: traced_peak враховує і піки, стерті фазами.
+
+Модуль імпортується при кожному запуску main.py, тому logging, json,
+cProfile і signal імпортуються лише тими приймачами і профайлерами, яким
+вони потрібні.
 """
 
+import os
+import sys
 import time
+# Лише C-частина tracemalloc: сам модуль tracemalloc тягне pickle і linecache.
+# _tracemalloc - деталь CPython, тож в інших реалізаціях беремо публічний модуль
+try:
+    import _tracemalloc
+except ImportError:
+    import tracemalloc as _tracemalloc
+from contextlib import contextmanager
 from functools import wraps
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LOGGER_NAME = "mlm.metrics"
+
+_sinks = []
+# Відкриті фази, щоб вкладена фаза не губила пік tracemalloc зовнішньої
+_stack = []
+# Найбільший пік, який фази стерли reset_peak з останнього reset_traced_peak
+_wiped_peak = 0
+
+
+def add_sink(sink):
+    """Реєструє приймач подій - об'єкт з методом emit(event)."""
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    _sinks.remove(sink)
+
+
+def clear_sinks():
+    _sinks.clear()
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає кілобайти, macOS - байти
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def traced_peak():
+    """
+    Пік traced пам'яті з останнього reset_traced_peak.
+
+    Як tracemalloc.get_traced_memory()[1], але не губить піків, які
+    стерли фази, що почались і закінчились з того часу.
+    """
+    return max(_wiped_peak, _tracemalloc.get_traced_memory()[1])
+
+
+def reset_traced_peak():
+    """Скидає пік для traced_peak, як tracemalloc.reset_peak."""
+    global _wiped_peak
+    _wiped_peak = 0
+    _tracemalloc.reset_peak()
+
+
+@contextmanager
+def phase(name, **labels):
+    """
+    Міряє фазу конвеєра і передає подію всім приймачам.
+
+    Усередині блоку можна доповнити подію мітками:
+
+        with phase("build") as event:
+            ...
+            event["partners"] = len(ids)
+
+    Args:
+        name (str): Назва фази
+        **labels: Додаткові поля події
+    """
+    global _wiped_peak
+    event = {"phase": name, **labels}
+    frame = {"peak": 0}
+    tracing = _tracemalloc.is_tracing()
+    if tracing:
+        # reset_peak глобальний: пік до фази зберігаємо для зовнішньої фази
+        # і для traced_peak
+        outer_peak = _tracemalloc.get_traced_memory()[1]
+        _wiped_peak = max(_wiped_peak, outer_peak)
+        if _stack:
+            _stack[-1]["peak"] = max(_stack[-1]["peak"], outer_peak)
+        _tracemalloc.reset_peak()
+    _stack.append(frame)
+
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        event["seconds"] = time.perf_counter() - start
+        _stack.pop()
+        if tracing:
+            peak = max(frame["peak"], _tracemalloc.get_traced_memory()[1])
+            event["peak_traced_bytes"] = peak
+            if _stack:
+                _stack[-1]["peak"] = max(_stack[-1]["peak"], peak)
+        event["max_rss_bytes"] = _max_rss_bytes()
+        for sink in _sinks:
+            sink.emit(event)
+
 
-def benchmark(label="Execution time"):
+def benchmark(label=None):
     """
-    Декоратор що вимірює і виводить час виконання функції.
+    Декоратор, що загортає виклик функції у phase.
 
-    Можна використовувати з власною підписом або без неї.
+    Можна використовувати з власною назвою фази або без неї - тоді
+    назвою стає ім'я функції (наприклад CommissionCalculator.calculate_commissions).
     """
 
     def decorator(func):
+        name = label or func.__qualname__
+
         @wraps(func)  # Зберігає оригінальні метадані функції
         def wrapper(*args, **kwargs):
-            # Засікаємо час перед виконанням
-            start = time.perf_counter()
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
 
-            # Виконуємо оригінальну функцію
-            result = func(*args, **kwargs)
+    return decorator
 
-            # Засікаємо час після виконання
-            end = time.perf_counter()
 
-            print(f"{label}: {end - start:.4f} seconds")
+class LogSink:
+    """Пише кожну подію одним рядком key=value у logger mlm.metrics."""
 
-            return result
+    def __init__(self, log=None, level=None):
+        import logging
+        self.log = log or logging.getLogger(LOGGER_NAME)
+        self.level = logging.INFO if level is None else level
 
-        return wrapper
+    def emit(self, event):
+        fields = " ".join(f"{key}={value:.6f}" if isinstance(value, float) else f"{key}={value}"
+                          for key, value in event.items() if value is not None)
+        self.log.log(self.level, fields)
+
+
+class JsonLinesSink:
+    """Дописує кожну подію JSON об'єктом в окремий рядок файлу."""
+
+    def __init__(self, path):
+        import json
+        self.path = path
+        self._dumps = json.dumps
+
+    def emit(self, event):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(self._dumps(event) + "\n")
+
+
+class PrometheusSink:
+    """
+    Підтримує textfile у форматі Prometheus з останнім значенням кожної фази.
+
+    Файл перезаписується атомарно (через тимчасовий файл і os.replace),
+    тож node_exporter ніколи не читає його наполовину записаним.
+    """
 
-    return decorator
\ No newline at end of file
+    METRICS = (
+        ("seconds", "mlm_phase_seconds", "Wall time of the last run of the phase"),
+        ("peak_traced_bytes", "mlm_phase_peak_traced_bytes", "Peak traced Python memory during the phase"),
+        ("max_rss_bytes", "mlm_phase_max_rss_bytes", "Process peak RSS at the end of the phase"),
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.latest = {}
+
+    def emit(self, event):
+        self.latest[event["phase"]] = event
+        lines = []
+        for key, metric, help_text in self.METRICS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, e in self.latest.items():
+                if e.get(key) is not None:
+                    lines.append(f'{metric}{{phase="{name}"}} {e[key]}')
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+class _Sampler:
+    # Семплюючий профайлер: SIGPROF кожні interval секунд процесорного часу
+    # записує поточний стек. Результат - collapsed stacks для flamegraph.pl
+    # і speedscope, по рядку "f1;f2;f3 кількість".
+
+    def __init__(self, interval):
+        from collections import Counter
+        self.interval = interval
+        self.samples = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        import signal
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        import signal
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile(path, sampling=False, interval=0.001):
+    """
+    Профілює блок коду і зберігає результат у файл.
+
+    Args:
+        path (str): Куди записати профіль
+        sampling (bool): False - cProfile (файл для pstats/snakeviz),
+            True - семплюючий профайлер з collapsed stacks (лише Unix,
+            головний потік), з набагато меншими накладними витратами
+        interval (float): Період семплування в секундах процесорного часу
+    """
+    if sampling:
+        profiler = _Sampler(interval)
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+    if sampling:
+        profiler.start()
+    else:
+        profiler.enable()
+    try:
+        yield profiler
+    finally:
+        if sampling:
+            profiler.stop()
+            profiler.dump(path)
+        else:
+            profiler.disable()
+            profiler.dump_stats(path)
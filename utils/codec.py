@@ -0,0 +1,69 @@
+"""
+JSON кодек з необов'язковим швидким бекендом.
+
+Якщо встановлено orjson або msgspec, loads і dumps використовують його,
+інакше - стандартний json. dumps усіх бекендів пише компактний UTF-8 без
+пробілів; записи відрізняються хіба що формою дуже великих чи малих
+float (1e+16 проти 1e16), а розібрані значення однакові.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def available_backends():
+    """Бекенди, які можна використати в цьому середовищі."""
+    installed = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+    return [name for name in BACKENDS if installed[name]]
+
+
+def set_backend(name=None):
+    """
+    Вибирає бекенд для loads і dumps; DecodeError - виняток його loads.
+
+    Args:
+        name (str | None): Один з BACKENDS; None - найшвидший встановлений
+
+    Raises:
+        ValueError: Якщо бекенд невідомий або не встановлений
+    """
+    global backend, loads, dumps, DecodeError
+    if name is None:
+        name = available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"JSON backend {name} is not available, choose from {available_backends()}")
+
+    if name == "orjson":
+        loads = orjson.loads
+
+        def dumps(obj):
+            return orjson.dumps(obj).decode()
+        DecodeError = orjson.JSONDecodeError
+    elif name == "msgspec":
+        loads = msgspec.json.decode
+        _msgspec_encode = msgspec.json.Encoder().encode
+
+        def dumps(obj):
+            return _msgspec_encode(obj).decode()
+        DecodeError = msgspec.DecodeError
+    else:
+        loads = json.loads
+        dumps = _encoder.encode
+        DecodeError = json.JSONDecodeError
+    backend = name
+
+
+set_backend()
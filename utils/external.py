@@ -0,0 +1,135 @@
+"""
+Зовнішнє сортування кортежів з обмеженою пам'яттю.
+
+ExternalSorter накопичує записи в буфері фіксованого розміру, а коли він
+заповнюється, сортує його і скидає на диск як відсортований прогін. При
+читанні прогони зливаються heapq.merge; якщо прогонів більше, ніж можна
+тримати відкритими з блоком у пам'яті, вони зливаються в кілька проходів.
+
+Файли на диску - послідовність pickle блоків, кожен не більший за
+заданий розмір, тож читання будь-якого файлу тримає в пам'яті лише один блок.
+"""
+
+import heapq
+import math
+import os
+import pickle
+from itertools import islice
+
+# Оцінка пам'яті на один запис у буфері разом з ключем сортування і
+# вказівником у списку. Використовується, щоб перевести бюджет у байтах
+# у кількість записів.
+ITEM_BYTES = 400
+
+# Менші блоки роблять злиття надто дрібним і повільним
+MIN_BLOCK = 64
+# Найменший буфер сортувальника: хоча б кілька блоків для злиття
+MIN_ITEMS = 4 * MIN_BLOCK
+
+
+def write_items(path, items, block):
+    """Записує ітерований набір записів у файл блоками по block записів."""
+    items = iter(items)
+    count = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = list(islice(items, block))
+            if not chunk:
+                break
+            pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+            count += len(chunk)
+    return count
+
+
+def read_items(path):
+    """Читає записи з файлу write_items, тримаючи в пам'яті один блок."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+class ExternalSorter:
+    """
+    Сортує записи, яких може бути більше, ніж вміщує пам'ять.
+
+    Сортування стабільне: записи з однаковим ключем виходять у порядку
+    додавання, як у list.sort.
+
+    Args:
+        directory (str): Каталог для тимчасових прогонів
+        max_items (int): Скільки записів може одночасно бути в пам'яті
+        key (callable | None): Ключ сортування
+    """
+
+    _counter = 0
+
+    def __init__(self, directory, max_items, key=None):
+        self.directory = directory
+        self.max_items = max(max_items, MIN_ITEMS)
+        # Прогони пишуться блоками по block записів, тож злиття fan_in
+        # прогонів тримає в пам'яті не більше fan_in * block <= max_items
+        self.block = max(MIN_BLOCK, math.isqrt(self.max_items))
+        self.fan_in = max(2, self.max_items // self.block - 1)
+        self.key = key
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def _path(self):
+        ExternalSorter._counter += 1
+        return os.path.join(self.directory, f"run-{os.getpid()}-{ExternalSorter._counter}.bin")
+
+    def add(self, item):
+        self.buffer.append(item)
+        self.count += 1
+        if len(self.buffer) >= self.max_items:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def _spill(self):
+        self.buffer.sort(key=self.key)
+        path = self._path()
+        write_items(path, self.buffer, self.block)
+        self.buffer = []
+        self.runs.append(path)
+
+    def _merge(self, paths):
+        return heapq.merge(*(read_items(p) for p in paths), key=self.key)
+
+    def __iter__(self):
+        """Віддає записи у відсортованому порядку; прогони видаляються після читання."""
+        if not self.runs:
+            self.buffer.sort(key=self.key)
+            buffer, self.buffer = self.buffer, []
+            yield from buffer
+            return
+
+        if self.buffer:
+            self._spill()
+        fan_in = self.fan_in
+        runs = self.runs
+        self.runs = []
+        while len(runs) > fan_in:
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                path = self._path()
+                write_items(path, self._merge(group), self.block)
+                for p in group:
+                    os.remove(p)
+                merged.append(path)
+            runs = merged
+
+        try:
+            yield from self._merge(runs)
+        finally:
+            for p in runs:
+                if os.path.exists(p):
+                    os.remove(p)
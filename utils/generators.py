@@ -0,0 +1,110 @@
+"""
+Генератори фейкових дерев партнерів різної форми для бенчмарків і тестів.
+
+Кожен генератор повертає список словників у форматі вхідного JSON.
+Перший партнер - корінь, кожен наступний має батька серед попередніх,
+тож порядок записів - батьки раніше за дітей.
+"""
+
+import random
+
+
+def _parent_chain(n, rng):
+    # Лінійний ланцюжок: глибина N - 1
+    return [None] + list(range(1, n))
+
+
+def _parent_star(n, rng):
+    # Усі під одним коренем: глибина 1, один вузол з N - 1 дітьми
+    return [None] + [1] * (n - 1)
+
+
+def _parent_kary(n, rng, k=4):
+    # Збалансоване k-арне дерево: глибина log_k(N)
+    return [None] + [(i - 2) // k + 1 for i in range(2, n + 1)]
+
+
+def _parent_random(n, rng):
+    # Випадковий батько серед попередніх: глибина O(log N), як у старому benchmark_test.py
+    return [None] + [rng.randint(1, i - 1) for i in range(2, n + 1)]
+
+
+def _parent_powerlaw(n, rng):
+    # Переважне приєднання: шанс отримати нового реферала пропорційний
+    # кількості вже наявних + 1. Кілька "зірок" з тисячами дітей і довгий хвіст.
+    pool = [1]
+    parents = [None]
+    for i in range(2, n + 1):
+        parent = pool[rng.randrange(len(pool))]
+        parents.append(parent)
+        pool.append(parent)
+        pool.append(i)
+    return parents
+
+
+SHAPES = {
+    "chain": _parent_chain,
+    "star": _parent_star,
+    "kary": _parent_kary,
+    "powerlaw": _parent_powerlaw,
+    "random": _parent_random,
+}
+
+
+def generate_partners(shape, n, seed=0):
+    """
+    Створює фейкових партнерів заданої форми дерева.
+
+    Args:
+        shape (str): Одна з SHAPES - chain, star, kary, powerlaw, random
+        n (int): Кількість партнерів
+        seed (int): Зерно генератора, щоб прогони були відтворюваними
+
+    Returns:
+        list: Словники з id, parent_id і monthly_revenue
+    """
+    rng = random.Random(seed)
+    parents = SHAPES[shape](n, rng)[:n]
+    return [
+        {"id": i, "parent_id": parent_id, "monthly_revenue": rng.randint(1000, 10000)}
+        for i, parent_id in enumerate(parents, start=1)
+    ]
+
+
+def random_partners(n, seed=0, fractional=True, digits=None, roots=1, window=20, id_step=1):
+    """
+    Випадкове дерево для тестів порівняння калькуляторів.
+
+    Батько кожного партнера - один з window попередніх, тож дерево
+    глибоке і з різною кількістю дітей.
+
+    Args:
+        n (int): Кількість партнерів
+        seed (int): Зерно генератора
+        fractional (bool): Частина доходів - дробові float, щоб перевірити
+            порядок додавань; інакше всі доходи цілі
+        digits (int): До скількох знаків округлювати дробові доходи
+            (2 - цілі копійки для fixed_point)
+        roots (int): Кількість коренів, рівномірно по вхідних записах
+        window (int): З кількох попередніх партнерів вибирається батько
+        id_step (int): Крок id, щоб id не збігались з індексами
+
+    Returns:
+        list: Словники з id, parent_id і monthly_revenue
+    """
+    rng = random.Random(seed)
+    every = -(-n // roots)
+    partners = []
+    for i in range(1, n + 1):
+        parent = None if (i - 1) % every == 0 else rng.randint(max(1, i - window), i - 1)
+        if fractional:
+            whole, amount = rng.randint(1, 10000), rng.uniform(1, 10000)
+            revenue = rng.choice([whole, amount if digits is None else round(amount, digits)])
+        else:
+            revenue = rng.randint(1, 10000)
+        partners.append({
+            "id": i * id_step,
+            "parent_id": parent and parent * id_step,
+            "monthly_revenue": revenue,
+        })
+    return partners
@@ -0,0 +1,137 @@
+"""
+Читання вивантаження партнерів, розбитого на кілька файлів-шардів.
+
+Кожен шард (JSON масив або JSON Lines) розбирається в окремому процесі в
+три колонки: id, parent_id і monthly_revenue. Цілі id і батьки вертаються
+як array('q'), доходи - як array('q') чи array('d') (як у utils/snapshot.py),
+тож pickle передає з процесу суцільні байти, а не об'єкт на кожне значення.
+Рядкові id лишаються списками. Головний процес склеює колонки в порядку
+імен файлів, а зв'язки між шардами (батько в іншому файлі) розв'язуються
+одним проходом при побудові MLMTree.
+"""
+
+import glob
+import os
+from array import array
+
+from utils.streaming import iter_partners
+
+SHARD_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+
+def is_shard_pattern(path):
+    """Чи вказує --input на каталог або glob шаблон, а не на один файл."""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def expand_shards(path):
+    """
+    Повертає відсортований список файлів-шардів.
+
+    Args:
+        path (str): Каталог (беруться всі .json/.jsonl/.ndjson) або glob шаблон
+
+    Raises:
+        FileNotFoundError: Якщо жодного файлу не знайдено
+    """
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(SHARD_SUFFIXES)]
+    else:
+        paths = [p for p in glob.glob(path) if os.path.isfile(p)]
+    if not paths:
+        raise FileNotFoundError(f"No partner shards found at {path}")
+    return sorted(paths)
+
+
+def _int_column(values):
+    # Рядкові, дробові чи завеликі для int64 значення лишаються списком
+    try:
+        return array("q", values)
+    except (TypeError, OverflowError):
+        return values
+
+
+def _revenue_column(values):
+    # Як у utils/snapshot.py: int64, якщо всі доходи цілі, інакше float64.
+    # Нечислові чи завеликі значення лишаються списком
+    for typecode in ("q", "d"):
+        try:
+            return array(typecode, values)
+        except (TypeError, OverflowError):
+            pass
+    return values
+
+
+def _none_positions(values):
+    # list.index шукає в C, а коренів у шарді одиниці
+    positions, i = [], -1
+    try:
+        while True:
+            i = values.index(None, i + 1)
+            positions.append(i)
+    except ValueError:
+        return positions
+
+
+def read_shard(path):
+    """
+    Розбирає один шард у компактні колонки.
+
+    Returns:
+        tuple: (ids, parent_ids, roots, monthly_revenue). Цілі id і батьки -
+            array('q'), інакше списки. roots - позиції коренів (parent_id =
+            None), які в масиві батьків записані як 0
+    """
+    ids, parent_ids, revenues = [], [], []
+    for p in iter_partners(path):
+        ids.append(p["id"])
+        parent_ids.append(p["parent_id"])
+        revenues.append(p["monthly_revenue"])
+
+    roots = _none_positions(parent_ids)
+    for i in roots:
+        parent_ids[i] = 0
+    parents = _int_column(parent_ids)
+    if parents is parent_ids:
+        for i in roots:
+            parent_ids[i] = None
+    return _int_column(ids), parents, roots, _revenue_column(revenues)
+
+
+def read_shards(paths, workers=None):
+    """
+    Розбирає шарди паралельно і склеює колонки в порядку paths.
+
+    Порядок шардів зберігається, тож при дублікатах id між шардами діє
+    запис з останнього файлу - як якби всі файли були одним.
+
+    Args:
+        paths (list): Файли-шарди
+        workers (int | None): Кількість процесів, за замовчуванням os.cpu_count()
+
+    Returns:
+        tuple: (ids, parent_ids, monthly_revenue)
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return _concat(map(read_shard, paths))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as executor:
+        return _concat(executor.map(read_shard, paths))
+
+
+def _as_list(column):
+    # tolist() створює об'єкти в C, помітно швидше за list.extend(array)
+    return column.tolist() if isinstance(column, array) else column
+
+
+def _concat(parts):
+    ids, parent_ids, revenues = [], [], []
+    for shard_ids, shard_parents, roots, shard_revenues in parts:
+        offset = len(parent_ids)
+        ids.extend(_as_list(shard_ids))
+        parent_ids.extend(_as_list(shard_parents))
+        revenues.extend(_as_list(shard_revenues))
+        for i in roots:
+            parent_ids[offset + i] = None
+    return ids, parent_ids, revenues
@@ -0,0 +1,112 @@
+"""
+Бінарний колонковий знімок дерева партнерів.
+
+Файл складається із заголовка і секцій фіксованої ширини по 8 байт на
+значення, в нативному порядку байтів:
+
+- ids (int64) - ідентифікатори партнерів
+- parent_index (int64) - індекс батька або -1
+- monthly_revenue (int64 або float64, тип у заголовку)
+- offsets, child_index (int64) - діти у форматі CSR, як MLMTree.csr()
+- order (int64) - порядок обходу в ширину, батьки раніше за дітей
+- orphans (int64 пари) - індекс і parent_id партнерів з неіснуючим батьком
+
+Знімок відкривається через mmap: секції стають memoryview прямо на
+сторінки файлу, тож кілька процесів ділять одну копію в пам'яті.
+"""
+
+import mmap
+import struct
+from array import array
+
+MAGIC = b"MLMSNAP1"
+
+# magic, перевірка порядку байтів, тип доходу, n, кількість ребер, сиріт
+_HEADER = struct.Struct("=8sq1s7xqqq")
+_BYTE_ORDER_MARK = 0x0102030405060708
+
+
+def _int64_column(values, name):
+    for v in values:
+        if type(v) is not int or not -(1 << 63) <= v < (1 << 63):
+            raise ValueError(f"Snapshot {name} must be 64-bit integers, got {v!r}")
+    return values
+
+
+def write_snapshot(tree, path):
+    """
+    Записує MLMTree у бінарний знімок.
+
+    Ідентифікатори (і parent_id сиріт) мають бути цілими 64-бітними
+    числами. Дохід зберігається як int64, якщо всі доходи цілі, інакше
+    як float64.
+
+    Args:
+        tree (MLMTree): Дерево партнерів
+        path (str): Куди записати знімок
+    """
+    ids = array("q", _int64_column(tree.ids, "ids"))
+    revenue_type = "q" if all(type(v) is int for v in tree.monthly_revenue) else "d"
+    revenue = array(revenue_type, tree.monthly_revenue)
+    offsets, child_index = tree.csr()
+    order = array("q", tree.order_index)
+    orphan_parent = tree._orphan_parent
+    orphans = array("q")
+    for i, parent_id in sorted(orphan_parent.items()):
+        orphans.append(i)
+        orphans.append(_int64_column([parent_id], "parent ids")[0])
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, _BYTE_ORDER_MARK, revenue_type.encode(),
+                             len(ids), len(child_index), len(orphan_parent)))
+        for column in (ids, array("q", tree.parent_index), revenue,
+                       array("q", offsets), array("q", child_index), order, orphans):
+            column.tofile(f)
+
+
+def is_snapshot(path):
+    """Перевіряє за сигнатурою, чи файл є знімком."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def open_snapshot(path):
+    """
+    Відкриває знімок без копіювання даних.
+
+    Returns:
+        dict: Колонки ids, parent_index, monthly_revenue, offsets,
+        child_index, order (memoryview на mmap), orphans (dict індекс ->
+        parent_id) і сам mmap під ключем "mmap"
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < _HEADER.size or mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a partner snapshot")
+    _, mark, revenue_type, n, edges, orphan_count = _HEADER.unpack_from(mm)
+    if mark != _BYTE_ORDER_MARK:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+
+    buf = memoryview(mm)
+    pos = _HEADER.size
+
+    def section(typecode, length):
+        nonlocal pos
+        start, pos = pos, pos + 8 * length
+        if pos > len(mm):
+            raise ValueError(f"{path} is truncated")
+        return buf[start:pos].cast(typecode)
+
+    columns = {
+        "ids": section("q", n),
+        "parent_index": section("q", n),
+        "monthly_revenue": section(revenue_type.decode(), n),
+        "offsets": section("q", n + 1),
+        "child_index": section("q", edges),
+        "order": section("q", n),
+    }
+    pairs = section("q", 2 * orphan_count)
+    columns["orphans"] = dict(zip(pairs[::2], pairs[1::2]))
+    columns["mmap"] = mm
+    return columns
@@ -0,0 +1,245 @@
+"""
+Зберігання партнерів і комісій у локальній базі SQLite.
+
+Таблиця partners (id, parent_id, monthly_revenue) читається в MLMTree
+порціями через fetchmany у порядку rowid, тобто в порядку вставки. Тож
+дублікати id і сироти поводяться так само, як у JSON вході. Стовпці без
+оголошеного типу зберігають значення як є: 3000 лишається int, а 3000.0 -
+float. Завдяки цьому комісії з бази біт-в-біт такі самі, як з JSON.
+
+Запис іде пакетами через executemany в одній транзакції. sqlite3 готує
+запит один раз і повторно використовує його для кожного рядка пакета. База,
+в яку пишемо, працює в режимі WAL, щоб читачі не блокували запис комісій.
+Вхідна база відкривається лише для читання (connect_readonly): читання не
+змінює її режим журналу і не створює в ній таблиць.
+
+cte_subtree_sums рахує ті самі суми нащадків рекурсивним запитом
+WITH RECURSIVE прямо в SQLite. Результат використовується для перехресної
+перевірки (cross_check) і порівняння швидкості в benchmark_test.py.
+
+sqlite3 імпортується лише при відкритті бази.
+"""
+
+from itertools import islice
+
+from models.core import MLMTree, CommissionCalculator, daily_revenue, round_commission
+from utils.benchmark import phase
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+BATCH_SIZE = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partners (id, parent_id, monthly_revenue);
+CREATE TABLE IF NOT EXISTS commissions (id PRIMARY KEY, commission REAL) WITHOUT ROWID;
+"""
+
+
+def is_sqlite(path):
+    """Перевіряє за сигнатурою, чи файл є базою SQLite."""
+    with open(path, "rb") as f:
+        return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+
+def connect(path):
+    """Відкриває базу в режимі WAL і створює таблиці, яких бракує."""
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def connect_readonly(path):
+    """Відкриває наявну базу лише для читання, без PRAGMA і створення таблиць."""
+    import sqlite3
+    from pathlib import Path
+
+    # URI з mode=ro: відсутній файл - помилка, а не нова порожня база
+    return sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def import_partners(path, partners, batch_size=BATCH_SIZE):
+    """
+    Записує партнерів у таблицю partners пакетами.
+
+    Args:
+        path (str): Файл бази
+        partners (Iterable): Словники партнерів, наприклад iter_partners
+        batch_size (int): Рядків в одному executemany
+
+    Returns:
+        int: Кількість записаних рядків
+    """
+    rows = ((p["id"], p["parent_id"], p["monthly_revenue"]) for p in partners)
+    count = 0
+    connection = connect(path)
+    try:
+        with phase("sqlite_import") as event, connection:
+            for batch in _batches(rows, batch_size):
+                connection.executemany("INSERT INTO partners VALUES (?, ?, ?)", batch)
+                count += len(batch)
+            event["partners"] = count
+    finally:
+        connection.close()
+    return count
+
+
+def iter_rows(path, batch_size=BATCH_SIZE):
+    """Віддає партнерів з таблиці partners словниками, як utils.streaming.iter_partners."""
+    connection = connect_readonly(path)
+    try:
+        cursor = connection.execute("SELECT id, parent_id, monthly_revenue FROM partners ORDER BY rowid")
+        while rows := cursor.fetchmany(batch_size):
+            for pid, parent_id, revenue in rows:
+                yield {"id": pid, "parent_id": parent_id, "monthly_revenue": revenue}
+    finally:
+        connection.close()
+
+
+def read_tree(path, batch_size=BATCH_SIZE):
+    """
+    Будує MLMTree з таблиці partners, читаючи її порціями.
+
+    Args:
+        path (str): Файл бази
+        batch_size (int): Рядків в одному fetchmany
+    """
+    ids, parent_ids, revenues = [], [], []
+    connection = connect_readonly(path)
+    try:
+        with phase("sqlite_read") as event:
+            cursor = connection.execute("SELECT id, parent_id, monthly_revenue FROM partners ORDER BY rowid")
+            while rows := cursor.fetchmany(batch_size):
+                for pid, parent_id, revenue in rows:
+                    ids.append(pid)
+                    parent_ids.append(parent_id)
+                    revenues.append(revenue)
+            event["partners"] = len(ids)
+    finally:
+        connection.close()
+    return MLMTree.from_columns(ids, parent_ids, revenues)
+
+
+def write_commissions(path, items, batch_size=BATCH_SIZE):
+    """
+    Записує пари (id, комісія) у таблицю commissions, замінюючи попередні.
+
+    Returns:
+        int: Кількість записаних рядків
+    """
+    count = 0
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM commissions")
+            for batch in _batches(items, batch_size):
+                connection.executemany("INSERT OR REPLACE INTO commissions VALUES (?, ?)", batch)
+                count += len(batch)
+    finally:
+        connection.close()
+    return count
+
+
+def read_commissions(path):
+    """Читає таблицю commissions як словник {str id: комісія}, як calculate_commissions."""
+    connection = connect_readonly(path)
+    try:
+        return {str(pid): commission for pid, commission in connection.execute("SELECT id, commission FROM commissions")}
+    finally:
+        connection.close()
+
+
+# Дублікати id розв'язуються як у MLMTree: місце першої появи, дані останнього
+# запису. Сироти (батька немає в таблиці) стають коренями.
+_NODES = """
+CREATE TEMP TABLE nodes (id PRIMARY KEY, parent_id, monthly_revenue, position) WITHOUT ROWID;
+INSERT INTO nodes
+    SELECT p.id, CASE WHEN p.parent_id IN (SELECT id FROM partners) THEN p.parent_id END,
+           p.monthly_revenue, f.position
+    FROM partners p JOIN (SELECT MIN(rowid) AS position, MAX(rowid) AS last FROM partners GROUP BY id) f
+    ON p.rowid = f.last;
+CREATE INDEX temp.nodes_parent ON nodes (parent_id);
+"""
+
+_REACHABLE = """
+WITH RECURSIVE reach(id) AS (
+    SELECT id FROM nodes WHERE parent_id IS NULL
+    UNION ALL
+    SELECT n.id FROM nodes n JOIN reach r ON n.parent_id = r.id
+)
+SELECT (SELECT COUNT(*) FROM reach), (SELECT COUNT(*) FROM nodes)
+"""
+
+# Кожен вузол несе свій денний дохід вгору до кожного предка
+_SUBTREE_SUMS = """
+WITH RECURSIVE up(ancestor, revenue) AS (
+    SELECT parent_id, monthly_revenue / 30.0 FROM nodes WHERE parent_id IS NOT NULL
+    UNION ALL
+    SELECT n.parent_id, up.revenue FROM up JOIN nodes n ON n.id = up.ancestor WHERE n.parent_id IS NOT NULL
+)
+SELECT n.id, COALESCE(s.total, 0)
+FROM nodes n LEFT JOIN (SELECT ancestor, SUM(revenue) AS total FROM up GROUP BY ancestor) s ON s.ancestor = n.id
+ORDER BY n.position
+"""
+
+
+def cte_subtree_sums(path):
+    """
+    Денні суми нащадків кожного партнера, пораховані запитом WITH RECURSIVE.
+
+    Запит породжує рядок на кожну пару (предок, нащадок), тож коштує
+    O(N * глибина). Суми float додаються в іншому порядку, ніж у
+    CommissionCalculator, і можуть відрізнятися в останніх знаках.
+
+    Returns:
+        list: Пари (id, сума) у порядку першої появи id
+
+    Raises:
+        ValueError: Якщо у таблиці є цикли
+    """
+    connection = connect_readonly(path)
+    try:
+        with phase("sqlite_cte") as event:
+            connection.executescript(_NODES)
+            reached, total = connection.execute(_REACHABLE).fetchone()
+            if reached != total:
+                raise ValueError(f"Cycle detected: {total - reached} partners are not reachable from any root")
+            sums = connection.execute(_SUBTREE_SUMS).fetchall()
+            event["partners"] = len(sums)
+    finally:
+        connection.close()
+    return sums
+
+
+def cte_commissions(path):
+    """Комісії з сум cte_subtree_sums, округлені як у CommissionCalculator."""
+    return {str(pid): round_commission(total) for pid, total in cte_subtree_sums(path)}
+
+
+def cross_check(path, rel_tol=1e-9):
+    """
+    Порівнює суми нащадків CommissionCalculator з рекурсивним запитом.
+
+    Returns:
+        list: Трійки (id, сума калькулятора, сума SQL), що розходяться
+            більше ніж на rel_tol; порожній список - результати збігаються
+    """
+    calculator = CommissionCalculator(read_tree(path))
+    for _ in calculator.iter_commissions(str_ids=False):
+        pass
+    memo = calculator.memo
+    mismatches = []
+    for pid, total in cte_subtree_sums(path):
+        expected = memo[pid]
+        if abs(expected - total) > rel_tol * max(abs(expected), daily_revenue(1)):
+            mismatches.append((pid, expected, total))
+    return mismatches
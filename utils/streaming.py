@@ -0,0 +1,308 @@
+"""
+Потокове читання партнерів і запис комісій.
+
+Дозволяє обробляти файли, більші за доступну пам'ять під розібраний список:
+партнери читаються по одному і одразу йдуть у побудову дерева.
+
+Підтримуються два формати входу:
+- JSON масив об'єктів (як dataset.json)
+- JSON Lines - один об'єкт на рядок (.jsonl / .ndjson)
+
+Обидва формати розбираються швидким бекендом utils.codec, якщо він є.
+Швидкі бекенди не вміють розбирати масив частинами, тож з кожного
+прочитаного шматка масиву береться префікс із цілих об'єктів і
+розбирається одним викликом як окремий масив; решта елементів (не
+об'єкти, числа поза межами int64, NaN) розбирається стандартним json.
+
+Комісії записуються в одному з OUTPUT_FORMATS: json (з відступами),
+compact (JSON без пробілів), csv або binary (колонки int64 id і float64
+комісій, див. write_binary).
+"""
+
+import json
+import struct
+from array import array
+from itertools import islice
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Інкрементально розбирає JSON масив з файлу, не завантажуючи його цілком.
+
+    Args:
+        f: Текстовий файл, що містить JSON масив
+        chunk_size (int): Скільки символів читати за раз
+
+    Yields:
+        Елементи масиву по одному
+    """
+    from utils import codec
+    loads = codec.loads
+    buf = ""
+    pos = 0
+    eof = False
+    # До цієї позиції швидкий бекенд уже не впорався, тож розбираємо поелементно
+    slow_until = 0
+
+    def fill():
+        # Дочитуємо наступний шматок, відкидаючи вже розібрану частину буфера
+        nonlocal buf, pos, eof, slow_until
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        slow_until = max(slow_until - pos, 0)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise json.JSONDecodeError("Expecting '['", buf, pos)
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == "]":
+        return
+
+    while True:
+        skip_whitespace()
+        items = None
+        if pos >= slow_until:
+            cut = _objects_end(buf, pos)
+            if cut > pos:
+                try:
+                    items = loads("[" + buf[pos:cut] + "]")
+                    pos = cut
+                except codec.DecodeError:
+                    slow_until = cut
+        if items is None:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+                # Число в кінці буфера могло бути обрізане - дочитуємо і пробуємо знову
+                complete = end < len(buf) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                fill()
+                continue
+            pos = end
+            items = (item,)
+
+        yield from items
+
+        skip_whitespace()
+        if pos >= len(buf):
+            raise json.JSONDecodeError("Unterminated array", buf, pos)
+        if buf[pos] == "]":
+            return
+        if buf[pos] != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+        pos += 1
+
+
+def _objects_end(buf, pos):
+    # Кінець останнього об'єкта в buf[pos:], за яким уже видно ',' або ']'.
+    # Якщо ця '}' насправді всередині рядка, префікс не розбереться як масив
+    # і його розбере стандартний json
+    end = len(buf)
+    while True:
+        end = buf.rfind("}", pos, end)
+        if end < 0:
+            return -1
+        after = end + 1
+        while after < len(buf) and buf[after] in _WHITESPACE:
+            after += 1
+        if after < len(buf) and buf[after] in ",]":
+            return end + 1
+
+
+def iter_json_lines(f):
+    """
+    Читає JSON Lines - по одному об'єкту на рядок, порожні рядки пропускаються.
+
+    Args:
+        f: Текстовий файл
+
+    Yields:
+        Розібрані об'єкти
+    """
+    from utils import codec
+    loads = codec.loads
+    for line in f:
+        if line.strip():
+            yield loads(line)
+
+
+def iter_partners(filepath):
+    """
+    Потоково читає партнерів з JSON масиву або JSON Lines.
+
+    Формат визначається за першим значущим символом файлу: '[' - масив,
+    інакше - JSON Lines.
+
+    Args:
+        filepath (str): Шлях до файлу з партнерами
+
+    Yields:
+        dict: Дані одного партнера
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first in _WHITESPACE:
+            first = f.read(1)
+        f.seek(0)
+
+        if first == "[":
+            yield from iter_json_array(f)
+        else:
+            yield from iter_json_lines(f)
+
+
+def _json_key(key, dumps):
+    # Цілі id не потребують екранування
+    return f'"{key}"' if type(key) is int else dumps(str(key))
+
+
+def _json_value(value, dumps):
+    # repr(float) збігається з json для скінченних чисел і вдвічі швидший
+    return repr(value) if type(value) is float else dumps(value)
+
+
+def write_json_object(items, f):
+    """
+    Потоково записує пари (ключ, значення) як JSON об'єкт.
+
+    Вивід збігається з json.dump(dict(items), f, indent=2) для пласких
+    словників з ASCII ключами, але не потребує всього словника в пам'яті.
+    Ключі і значення кодує utils.codec, як і в write_json_compact; вкладені
+    словники (комісії за періодами) пишуться компактно в один рядок.
+
+    Args:
+        items: Ітерований набір пар (ключ, значення)
+        f: Текстовий файл для запису
+    """
+    from utils import codec
+    dumps = codec.dumps
+    items = iter(items)
+    separator = "{\n  "
+    while True:
+        batch = list(islice(items, CHUNK_SIZE))
+        if not batch:
+            break
+        f.write(separator)
+        f.write(",\n  ".join(f"{_json_key(k, dumps)}: {_json_value(v, dumps)}" for k, v in batch))
+        separator = ",\n  "
+    f.write("{}" if separator == "{\n  " else "\n}")
+
+
+def write_json_compact(items, f, batch_size=CHUNK_SIZE):
+    """
+    Записує пари (ключ, значення) компактним JSON об'єктом без пробілів.
+
+    Пари пишуться пачками по batch_size, щоб не викликати write на кожен рядок.
+    """
+    from utils import codec
+    dumps = codec.dumps
+    items = iter(items)
+    f.write("{")
+    separator = ""
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+        f.write(separator)
+        f.write(",".join(f"{_json_key(k, dumps)}:{_json_value(v, dumps)}" for k, v in batch))
+        separator = ","
+    f.write("}")
+
+
+def write_csv(items, f):
+    """
+    Записує пари (id, комісія) як CSV з заголовком id,commission.
+
+    Якщо значення - словники період -> комісія (MultiPeriodCommissionCalculator),
+    кожен період стає окремим стовпцем, назви беруться з першого рядка.
+    """
+    import csv
+    items = iter(items)
+    first = next(items, None)
+    writer = csv.writer(f, lineterminator="\n")
+    if first is None:
+        writer.writerow(("id", "commission"))
+        return
+    if isinstance(first[1], dict):
+        periods = list(first[1])
+        writer.writerow(("id", *periods))
+        writer.writerow((first[0], *first[1].values()))
+        writer.writerows((pid, *(row[p] for p in periods)) for pid, row in items)
+    else:
+        writer.writerow(("id", "commission"))
+        writer.writerow(first)
+        writer.writerows(items)
+
+
+BINARY_MAGIC = b"MLMCOMM1"
+# magic, перевірка порядку байтів, кількість рядків
+_BINARY_HEADER = struct.Struct("=8sqq")
+_BYTE_ORDER_MARK = 0x0102030405060708
+
+
+def write_binary(items, f):
+    """
+    Записує пари (id, комісія) у бінарний файл.
+
+    Після заголовка йдуть дві колонки в нативному порядку байтів: id (int64)
+    і комісії (float64). Id мають бути цілими числами; рядкові id, що
+    записані цифрами (як з iter_commissions), переводяться в int.
+
+    Args:
+        items: Ітерований набір пар (id, комісія)
+        f: Бінарний файл для запису
+    """
+    ids, commissions = array("q"), array("d")
+    for pid, commission in items:
+        ids.append(pid if type(pid) is int else int(pid))
+        commissions.append(commission)
+    f.write(_BINARY_HEADER.pack(BINARY_MAGIC, _BYTE_ORDER_MARK, len(ids)))
+    ids.tofile(f)
+    commissions.tofile(f)
+
+
+def read_binary(f):
+    """
+    Читає файл, записаний write_binary.
+
+    Returns:
+        tuple: (array("q") id, array("d") комісій)
+    """
+    magic, mark, n = _BINARY_HEADER.unpack(f.read(_BINARY_HEADER.size))
+    if magic != BINARY_MAGIC or mark != _BYTE_ORDER_MARK:
+        raise ValueError("Not a commissions file or written with a different byte order")
+    ids, commissions = array("q"), array("d")
+    ids.fromfile(f, n)
+    commissions.fromfile(f, n)
+    return ids, commissions
+
+
+# Формат -> (функція запису, чи файл бінарний)
+OUTPUT_FORMATS = {
+    "json": (write_json_object, False),
+    "compact": (write_json_compact, False),
+    "csv": (write_csv, False),
+    "binary": (write_binary, True),
+}